@@ -0,0 +1,26 @@
+from pathlib import Path
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from external.address.autocomplete import build_suggestions
+
+
+class Command(BaseCommand):
+    help = "이미 만든 로컬 주소 색인 파일에 자동완성 목록(suggest 테이블)을 다시 만든다. import_juso는 자동으로 만든다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="색인 파일 경로. 기본값은 settings.JUSO_INDEX['PATH']")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"] or settings.JUSO_INDEX["PATH"])
+        if not path.exists():
+            raise CommandError(f"{path} 파일이 없습니다. import_juso로 먼저 색인을 만드세요.")
+        conn = sqlite3.connect(path)
+        try:
+            with conn:
+                count = build_suggestions(conn)
+        finally:
+            conn.close()
+        self.stdout.write(self.style.SUCCESS(f"자동완성 항목 {count}건을 {path} 에 만들었습니다."))
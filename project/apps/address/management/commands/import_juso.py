@@ -0,0 +1,60 @@
+from pathlib import Path
+import io, zipfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from external.address.juso_index import build_index, to_juso
+
+
+class Command(BaseCommand):
+    help = "도로명주소 전체분(도로명주소 한글) 파일로 로컬 주소 검색 색인을 만든다. 파일 / 폴더 / zip을 받는다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="rnaddrkor_*.txt 파일, 그 파일이 있는 폴더, 혹은 zip 파일")
+        parser.add_argument("--encoding", default="cp949")
+        parser.add_argument("--output", default=None, help="색인 파일 경로. 기본값은 settings.JUSO_INDEX['PATH']")
+
+    # 입력 경로에서 (이름, 줄 iterator)를 순서대로 꺼낸다.
+    def _sources(self, paths, encoding):
+        for raw in paths:
+            path = Path(raw)
+            if path.is_dir():
+                yield from self._sources(sorted(str(p) for p in path.iterdir() if p.suffix in (".txt", ".zip")), encoding)
+            elif path.suffix == ".zip":
+                with zipfile.ZipFile(path) as archive:
+                    for name in sorted(archive.namelist()):
+                        if name.endswith(".txt"):
+                            with archive.open(name) as f:
+                                yield name, io.TextIOWrapper(f, encoding=encoding, errors="replace")
+            elif path.exists():
+                with open(path, encoding=encoding, errors="replace") as f:
+                    yield path.name, f
+            else:
+                raise CommandError(f"{raw} 파일이 없습니다.")
+
+    def _jusos(self, paths, encoding):
+        for name, lines in self._sources(paths, encoding):
+            count = skipped = malformed = 0
+            for number, line in enumerate(lines, start=1):
+                try:
+                    juso = to_juso(line.rstrip("\r\n").split("|"))
+                except (ValueError, KeyError) as e:
+                    # 형식이 잘못된 줄(숫자 컬럼에 문자 등)은 건너뛰고 센다. 처음 몇 줄만 출력한다.
+                    malformed += 1
+                    if malformed <= 10:
+                        self.stderr.write(f"{name}:{number}: 형식 오류 ({type(e).__name__}: {e})")
+                    continue
+                if juso is None:
+                    skipped += 1
+                    continue
+                count += 1
+                yield juso
+            self.malformed += malformed
+            self.stdout.write(f"{name}: {count}건 (제외 {skipped}건, 형식 오류 {malformed}건)")
+
+    def handle(self, *args, **options):
+        output = options["output"] or settings.JUSO_INDEX["PATH"]
+        self.malformed = 0
+        total = build_index(self._jusos(options["paths"], options["encoding"]), output)
+        self.stdout.write(self.style.SUCCESS(f"{total}건을 {output} 에 색인했습니다. (형식 오류로 건너뛴 줄 {self.malformed}건)"))
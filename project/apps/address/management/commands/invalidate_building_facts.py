@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from external.address import building_facts
+from external.address.address_manager import AddressManager
+
+
+class Command(BaseCommand):
+    help = "저장된 건축물대장 정보(BuildingFacts)를 지운다. 다음 조회 때 data.go.kr에서 다시 받는다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("addresses", nargs="*", help="도로명 주소")
+        parser.add_argument("--all", action="store_true", help="전체를 지운다.")
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            deleted = building_facts.invalidate_all()
+            self.stdout.write(self.style.SUCCESS(f"{deleted}건 삭제"))
+            return
+        if not options["addresses"]:
+            raise CommandError("도로명 주소 혹은 --all이 필요합니다.")
+
+        for road_addr in options["addresses"]:
+            address = AddressManager(roadAddr=road_addr)
+            address.initialize(research=True)
+            if not address.is_valid():
+                self.stderr.write(f"{road_addr}: 유효하지 않은 주소입니다.")
+                continue
+            key = building_facts.lot_key(address)
+            building_facts.invalidate(key)
+            self.stdout.write(self.style.SUCCESS(f"{road_addr}: {'-'.join(key)} 삭제"))
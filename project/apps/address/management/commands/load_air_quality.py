@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from external.address.air_quality import backfill_years, default_years, load_years
+
+
+class Command(BaseCommand):
+    help = "서울시 자치구별 연평균 대기질(YearlyAverageAirQuality)을 연도마다 한 번씩 받아서 저장한다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--years", type=int, nargs="*", help="받을 연도. 기본값은 올해부터 AIR_QUALITY['YEARS_BACK']년 전까지.")
+        parser.add_argument("--backfill", action="store_true", help="AIR_QUALITY['BACKFILL_SINCE']부터 올해까지 모두 받는다.")
+        parser.add_argument("--since", type=int, help="이 연도부터 올해까지 모두 받는다.")
+
+    def handle(self, *args, **options):
+        # 여러 연도는 동시에 받는다. (AIR_QUALITY['MAX_WORKERS'])
+        if options["backfill"] or options["since"]:
+            years = backfill_years(options["since"])
+        else:
+            years = options["years"] or default_years()
+        errors = {}
+        loaded = load_years(years, errors)
+        for year in sorted(years):
+            if year in loaded:
+                self.stdout.write(self.style.SUCCESS(f"{year}: {loaded[year]}개 자치구"))
+            else:
+                self.stderr.write(f"{year}: 실패 ({errors.get(year)})")
+        if errors:
+            raise CommandError(f"실패 연도: {sorted(errors)}")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from external.address.flood import SEOUL_CTPV_CD, SEOUL_SGG_CDS, prefetch_regions
+
+
+class Command(BaseCommand):
+    help = "서울시 자치구별 침수 이력(InquireAdmCtyFLService_v2) 전체 페이지를 받아서 저장한다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sgg", nargs="*", help="받을 시군구 코드(3자리). 기본값은 서울시 전체 자치구.")
+
+    def handle(self, *args, **options):
+        regions = [(SEOUL_CTPV_CD, sgg_cd) for sgg_cd in (options["sgg"] or SEOUL_SGG_CDS)]
+        errors = {}
+        loaded = prefetch_regions(regions, errors)
+        for region in regions:
+            if region in loaded:
+                self.stdout.write(self.style.SUCCESS(f"{''.join(region)}: {loaded[region]}건"))
+            else:
+                self.stderr.write(f"{''.join(region)}: 실패 ({errors.get(region)})")
+        if errors:
+            raise CommandError(f"실패 자치구: {sorted(''.join(region) for region in errors)}")
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0002_flood_propertybundle_flood'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResolvedAddress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_address', models.CharField(max_length=255, unique=True)),
+                ('road_address', models.CharField(max_length=255)),
+                ('bd_nm', models.CharField(blank=True, default='', max_length=100)),
+                ('adm_cd', models.CharField(blank=True, default='', max_length=10)),
+                ('sgg_nm', models.CharField(blank=True, default='', max_length=100)),
+                ('mt_yn', models.CharField(default='0', max_length=1)),
+                ('lnbr_mnnm', models.CharField(blank=True, default='', max_length=20)),
+                ('lnbr_slno', models.CharField(blank=True, default='', max_length=20)),
+                ('is_valid', models.BooleanField(default=True)),
+                ('error', models.CharField(blank=True, default='', max_length=255)),
+                ('resolved_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,103 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+# 상세 주소를 PropertyBundle로 옮긴다.
+def copy_details_to_bundles(apps, schema_editor):
+    PropertyBundle = apps.get_model("address", "PropertyBundle")
+    for bundle in PropertyBundle.objects.exclude(address=None).select_related("address"):
+        bundle.details = bundle.address.details or ""
+        bundle.save(update_fields=["details"])
+
+
+# 같은 행정구역 코드 + 지번의 Address를 가장 오래된 하나로 합친다.
+# 값이 비어 있는(NULL) 주소는 같은 필지인지 알 수 없으므로 합치지 않는다. (unique 제약에서도 NULL은 서로 다르다)
+def merge_duplicate_addresses(apps, schema_editor):
+    Address = apps.get_model("address", "Address")
+    PropertyBundle = apps.get_model("address", "PropertyBundle")
+    lot_fields = ("adm_cd", "mt_yn", "lnbr_mnnm", "lnbr_slno")
+    complete = Address.objects.filter(**{f"{field}__isnull": False for field in lot_fields})
+
+    duplicates = (complete
+                  .values(*lot_fields)
+                  .annotate(count=models.Count("id"), keep=models.Min("id"))
+                  .filter(count__gt=1))
+    for group in duplicates:
+        lot = {field: group[field] for field in lot_fields}
+        others = complete.filter(**lot).exclude(id=group["keep"])
+        PropertyBundle.objects.filter(address__in=others).update(address_id=group["keep"])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0003_resolvedaddress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertybundle',
+            name='details',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(copy_details_to_bundles, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='propertybundle',
+            name='address',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bundles', to='address.address'),
+        ),
+        migrations.AlterField(
+            model_name='propertybundle',
+            name='air_condition',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bundles', to='address.aircondition'),
+        ),
+        migrations.AlterField(
+            model_name='propertybundle',
+            name='avg_price',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bundles', to='address.avgprice'),
+        ),
+        migrations.AlterField(
+            model_name='propertybundle',
+            name='building_info',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bundles', to='address.buildinginfo'),
+        ),
+        migrations.AlterField(
+            model_name='propertybundle',
+            name='flood',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bundles', to='address.flood'),
+        ),
+        migrations.RunPython(merge_duplicate_addresses, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='address',
+            name='details',
+        ),
+        migrations.AddField(
+            model_name='address',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='avgprice',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='avgprice',
+            name='start_year',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='buildinginfo',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name='address',
+            constraint=models.UniqueConstraint(fields=('adm_cd', 'mt_yn', 'lnbr_mnnm', 'lnbr_slno'), name='unique_address_lot'),
+        ),
+    ]
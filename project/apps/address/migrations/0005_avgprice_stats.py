@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0004_canonical_address'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='avgprice',
+            name='median_month_rent',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='avgprice',
+            name='median_month_security_price',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='avgprice',
+            name='median_year_price',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='avgprice',
+            name='month_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='avgprice',
+            name='month_rent_per_m2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='avgprice',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='avgprice',
+            name='year_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='avgprice',
+            name='year_price_per_m2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0005_avgprice_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuildingFacts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sigungu_cd', models.CharField(max_length=5)),
+                ('bjdong_cd', models.CharField(max_length=5)),
+                ('bun', models.CharField(max_length=4)),
+                ('ji', models.CharField(max_length=4)),
+                ('info', models.JSONField(default=dict)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+                ('refresh_after', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sigungu_cd', 'bjdong_cd', 'bun', 'ji'), name='unique_building_facts_lot')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0006_buildingfacts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AirQualityYearly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('gu_name', models.CharField(max_length=20)),
+                ('data', models.JSONField(default=dict)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('year', 'gu_name'), name='unique_air_quality_year_gu')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0007_airqualityyearly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FloodRegion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ctpv_cd', models.CharField(max_length=2)),
+                ('sgg_cd', models.CharField(max_length=3)),
+                ('total_count', models.IntegerField(default=0)),
+                ('items', models.JSONField(default=list)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ctpv_cd', 'sgg_cd'), name='unique_flood_region')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0008_floodregion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='avgprice',
+            name='coverage',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, IntegrityError
+from django.utils import timezone
 
 from external.address.address_manager import AddressManager
 
@@ -6,7 +10,8 @@ from apps.users.models import User
 
 # Create your models here.
 
-# 임시로 주소를 저장한다.
+# 주소(필지) 정보. 같은 행정구역 코드 + 지번이면 하나의 행만 두고 여러 PropertyBundle이 공유한다.
+# 호수 등 상세 주소는 PropertyBundle.details에 저장한다.
 class Address(models.Model):
     road_address = models.CharField(max_length=255)
     bd_nm = models.CharField(max_length=100, blank=True, null=True)
@@ -15,9 +20,38 @@ class Address(models.Model):
     mt_yn = models.CharField(max_length=1, default='0')
     lnbr_mnnm = models.CharField(max_length=20, blank=True, null=True)
     lnbr_slno = models.CharField(max_length=20, blank=True, null=True)
-    details = models.TextField(blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
 
-    def to_address_manager(self) -> AddressManager:
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["adm_cd", "mt_yn", "lnbr_mnnm", "lnbr_slno"],
+                name="unique_address_lot",
+            ),
+        ]
+
+    # initialize가 끝난 AddressManager로 주소를 찾고, 없으면 만든다.
+    @classmethod
+    def get_or_create_from_manager(cls, address_manager: AddressManager) -> "Address":
+        lot = {
+            "adm_cd": address_manager.admCd,
+            "mt_yn": address_manager.mtYn,
+            "lnbr_mnnm": address_manager.lnbrMnnm,
+            "lnbr_slno": address_manager.lnbrSlno,
+        }
+        defaults = {
+            "road_address": address_manager.roadAddr,
+            "bd_nm": address_manager.bdNm,
+            "sgg_nm": address_manager.sggNm,
+        }
+        try:
+            address, _ = cls.objects.get_or_create(**lot, defaults=defaults)
+        except IntegrityError:
+            # 동시에 같은 주소를 만든 경우.
+            address = cls.objects.get(**lot)
+        return address
+
+    def to_address_manager(self, details: str = "") -> AddressManager:
         return AddressManager(
             roadAddr=self.road_address,
             bdNm=self.bd_nm,
@@ -26,12 +60,53 @@ class Address(models.Model):
             mtYn=self.mt_yn,
             lnbrMnnm=self.lnbr_mnnm,
             lnbrSlno=self.lnbr_slno,
-            details=self.details,
+            details=details or "",
         )
     
     def __str__(self):
         return self.road_address
 
+# 도로명 주소 검색(juso) 결과 캐시. 정규화된 도로명 주소로 찾는다.
+# 검색에 실패한 주소도 is_valid=False로 저장해서 짧은 시간 동안 다시 조회하지 않는다.
+class ResolvedAddress(models.Model):
+    normalized_address = models.CharField(max_length=255, unique=True)
+    road_address = models.CharField(max_length=255)
+    bd_nm = models.CharField(max_length=100, blank=True, default='')
+    adm_cd = models.CharField(max_length=10, blank=True, default='')
+    sgg_nm = models.CharField(max_length=100, blank=True, default='')
+    # juso API 기준 값. (0이면 대지, 1이면 산)
+    mt_yn = models.CharField(max_length=1, default='0')
+    lnbr_mnnm = models.CharField(max_length=20, blank=True, default='')
+    lnbr_slno = models.CharField(max_length=20, blank=True, default='')
+    is_valid = models.BooleanField(default=True)
+    error = models.CharField(max_length=255, blank=True, default='')
+    resolved_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.normalized_address
+
+# 필지(시군구, 법정동, 본번, 부번)별 건축물대장 정리 결과. (external.address.building_facts)
+# refresh_after가 지나면 저장된 값을 주면서 뒤에서 다시 받고, expires_at이 지나면 다시 받을 때까지 기다린다.
+class BuildingFacts(models.Model):
+    sigungu_cd = models.CharField(max_length=5)
+    bjdong_cd = models.CharField(max_length=5)
+    bun = models.CharField(max_length=4)
+    ji = models.CharField(max_length=4)
+    # BuildingInfoManager.makeInfo 결과
+    info = models.JSONField(default=dict)
+    fetched_at = models.DateTimeField(auto_now=True)
+    refresh_after = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["sigungu_cd", "bjdong_cd", "bun", "ji"], name="unique_building_facts_lot"),
+        ]
+
+    def __str__(self):
+        return f"{self.sigungu_cd}{self.bjdong_cd} {self.bun}-{self.ji}"
+
 # 임시로 사용자의 전월세가를 저장한다.
 class UserPrice(models.Model):
     # 전세인가?
@@ -44,11 +119,28 @@ class AvgPrice(models.Model):
     avg_year_price = models.FloatField(default=0.0)
     avg_month_security_price = models.FloatField(default=0.0)
     avg_month_rent = models.FloatField(default=0.0)
+    # 중앙값. (이상치에 덜 민감하다)
+    median_year_price = models.FloatField(blank=True, null=True)
+    median_month_security_price = models.FloatField(blank=True, null=True)
+    median_month_rent = models.FloatField(blank=True, null=True)
+    # 임대면적 ㎡당 보증금(전세) / 월세의 중앙값
+    year_price_per_m2 = models.FloatField(blank=True, null=True)
+    month_rent_per_m2 = models.FloatField(blank=True, null=True)
+    year_count = models.IntegerField(default=0)
+    month_count = models.IntegerField(default=0)
+    # 분위수 등 상세 통계. (external.address.rent_stats)
+    stats = models.JSONField(default=dict, blank=True)
+    # 수집 현황. complete가 아니면(일부 페이지 실패 등) 재사용하지 않는다. (external.address.price)
+    coverage = models.JSONField(default=dict, blank=True)
+    # 평균을 계산한 시작 연도. 같은 주소 / 같은 시작 연도면 재사용한다.
+    start_year = models.IntegerField(blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
     
 # 건축물대장부 저장.
 class BuildingInfo(models.Model):
     # buildingInfo의 string data.
     description = models.JSONField(default=dict)
+    created = models.DateTimeField(auto_now_add=True)
 
 # 등기부등본 저장
 class PropertyRegistry(models.Model):
@@ -61,28 +153,82 @@ class AirCondition(models.Model):
     data = models.JSONField(default=dict)
     created = models.DateTimeField(auto_now_add=True)
 
+# 서울시 자치구별 연평균 대기질(YearlyAverageAirQuality) 한 행. (external.address.air_quality)
+class AirQualityYearly(models.Model):
+    year = models.IntegerField()
+    # 측정소(자치구) 이름. 예) 강남구
+    gu_name = models.CharField(max_length=20)
+    # upstream 행 그대로
+    data = models.JSONField(default=dict)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["year", "gu_name"], name="unique_air_quality_year_gu"),
+        ]
+
+    def __str__(self):
+        return f"{self.year} {self.gu_name}"
+
 # 침수 데이터 저장.
 class Flood(models.Model):
     data = models.JSONField(default=dict)
     created = models.DateTimeField(auto_now_add=True)
 
+# 시도 / 시군구별 침수 이력(InquireAdmCtyFLService_v2) 전체. (external.address.flood)
+class FloodRegion(models.Model):
+    # 시도 코드(2자리) / 시군구 코드(3자리). admCd 앞 5자리를 나눈 값.
+    ctpv_cd = models.CharField(max_length=2)
+    sgg_cd = models.CharField(max_length=3)
+    total_count = models.IntegerField(default=0)
+    # upstream 항목 전체
+    items = models.JSONField(default=list)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["ctpv_cd", "sgg_cd"], name="unique_flood_region"),
+        ]
+
+    def __str__(self):
+        return f"{self.ctpv_cd}{self.sgg_cd} ({self.total_count})"
+
 # 공통 묶음: 같은 주소/시세/건물정보를 한 덩어리로
+# 주소와 건물 단위 정보(시세, 건축물대장, 공기질, 침수)는 여러 묶음이 공유한다.
 class PropertyBundle(models.Model):
-    address = models.OneToOneField(Address, on_delete=models.PROTECT, related_name='bundle',
-                                   null=True, blank=True)
-    avg_price = models.OneToOneField(AvgPrice, on_delete=models.PROTECT, related_name='bundle',
-                                     null=True, blank=True)
-    building_info = models.OneToOneField(BuildingInfo, on_delete=models.PROTECT, related_name='bundle',
-                                         null=True, blank=True)
+    address = models.ForeignKey(Address, on_delete=models.PROTECT, related_name='bundles',
+                                null=True, blank=True)
+    # 상세 주소. 예) 101동 1001호
+    details = models.TextField(blank=True, default='')
+    avg_price = models.ForeignKey(AvgPrice, on_delete=models.PROTECT, related_name='bundles',
+                                  null=True, blank=True)
+    building_info = models.ForeignKey(BuildingInfo, on_delete=models.PROTECT, related_name='bundles',
+                                      null=True, blank=True)
     user_price = models.OneToOneField(UserPrice, on_delete=models.PROTECT, related_name='bundle',
                                       null=True, blank=True)
     property_registry = models.OneToOneField(PropertyRegistry, on_delete=models.PROTECT, related_name='bundle',
                                              null=True, blank=True)
-    air_condition = models.OneToOneField(AirCondition, on_delete=models.PROTECT, related_name='bundle',
-                                         null=True, blank=True)
+    air_condition = models.ForeignKey(AirCondition, on_delete=models.PROTECT, related_name='bundles',
+                                      null=True, blank=True)
 
-    flood = models.OneToOneField(Flood, on_delete=models.PROTECT, related_name='bundle',
-                                         null=True, blank=True)
+    flood = models.ForeignKey(Flood, on_delete=models.PROTECT, related_name='bundles',
+                              null=True, blank=True)
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bundles')
-    created = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created = models.DateTimeField(auto_now_add=True)
+
+    def to_address_manager(self) -> AddressManager:
+        return self.address.to_address_manager(self.details)
+
+
+# settings.BUNDLE_FACT_TTL[name] 초 이내에 만든 정보(BuildingInfo, AvgPrice 등)를 찾는다. 없으면 None.
+# 예) find_recent_fact(AirCondition, "air_condition", bundles__address=address)
+def find_recent_fact(model, name: str, **filters):
+    ttl = getattr(settings, "BUNDLE_FACT_TTL", {}).get(name)
+    if not ttl:
+        return None
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+    return (model.objects
+            .filter(created__gte=cutoff, **filters)
+            .order_by("-created")
+            .first())
@@ -9,6 +9,16 @@ class AddressSearchSerializer(serializers.Serializer):
     size = serializers.IntegerField(required=False, max_value=1000, default=10)
     page = serializers.IntegerField(required = False, min_value=1, default=1)
 
+class AddressAutocompleteSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=20, default=10)
+
+class BatchResolveSerializer(serializers.Serializer):
+    addresses = serializers.ListField(
+        child=serializers.CharField(max_length=200, allow_blank=True),
+        min_length=1, max_length=500,
+    )
+
 class GetPriceSerializer(serializers.Serializer):
     size = serializers.IntegerField(required=False, max_value=1000, default=10)
     year = serializers.IntegerField(required=False, max_value=2100, default=datetime.now().year)
@@ -21,13 +31,19 @@ class GetPropertyRegistrySerializer(serializers.Serializer):
 
 class GetBuildingInfoSerializer(serializers.Serializer):
     roadAddr = serializers.CharField(max_length=200, required=True)
+    # 저장된 건축물대장 정보를 버리고 다시 받는다.
+    refresh = serializers.BooleanField(required=False, default=False)
+
+class RealtimeAirSerializer(serializers.Serializer):
+    # 자치구 이름. 예) 강남구
+    gu = serializers.CharField(max_length=20)
 
 class AddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = ["id", "road_address", "bd_nm", "adm_cd",
-                  "sgg_nm", "mt_yn", "lnbr_mnnm", "lnbr_slno", "details"]
-        read_only_fields = ["id"]
+                  "sgg_nm", "mt_yn", "lnbr_mnnm", "lnbr_slno", "created"]
+        read_only_fields = ["id", "created"]
 
     def create(self, validated_data):
         return UserPrice.objects.create(**validated_data)
@@ -45,8 +61,8 @@ class UserPriceSerializer(serializers.ModelSerializer):
 class BuildingInfoSerializer(serializers.ModelSerializer):
     class Meta:
         model = BuildingInfo
-        fields = ["id", "description"]
-        read_only_fields = ["id"]
+        fields = ["id", "description", "created"]
+        read_only_fields = ["id", "created"]
 
     def create(self, validated_data):
         return BuildingInfo.objects.create(**validated_data)
@@ -54,8 +70,11 @@ class BuildingInfoSerializer(serializers.ModelSerializer):
 class AvgPriceSerializer(serializers.ModelSerializer):
     class Meta:
         model = AvgPrice
-        fields = ["id", "avg_year_price", "avg_month_security_price", "avg_month_rent"]
-        read_only_fields = ["id"]
+        fields = ["id", "avg_year_price", "avg_month_security_price", "avg_month_rent",
+                  "median_year_price", "median_month_security_price", "median_month_rent",
+                  "year_price_per_m2", "month_rent_per_m2", "year_count", "month_count", "stats",
+                  "coverage", "start_year", "created"]
+        read_only_fields = ["id", "start_year", "created"]
 
     def create(self, validated_data):
         return AvgPrice.objects.create(**validated_data)
@@ -107,7 +126,7 @@ class PropertyBundleSerializer(serializers.ModelSerializer):
     class Meta:
         model = PropertyBundle
         fields = [
-            "id", "address", "avg_price", "building_info", "user_price",
+            "id", "address", "details", "avg_price", "building_info", "user_price",
             "property_registry", "air_condition", "flood", "user", "created",
         ]
         read_only_fields = fields
\ No newline at end of file
@@ -1,6 +1,6 @@
 from django.urls import path
-from .views import (AddressSearchView, GetPriceView,
-                    GetPropertyRegistryView, GetBuildingInfoView,
+from .views import (AddressSearchView, AddressAutocompleteView, BatchResolveView, GetPriceView,
+                    GetPropertyRegistryView, GetBuildingInfoView, RealtimeAirView,
                     UserPriceViewSet, BuildingInfoViewSet, AvgPriceViewSet,
                     PropertyRegistryViewSet, AirConditionViewSet, PropertyBundleViewSet,
                     FloodViewSet)
@@ -17,9 +17,12 @@ router.register("property_bundle", PropertyBundleViewSet)
 
 urlpatterns = [
     path("search/", AddressSearchView.as_view(), name="search"),
+    path("autocomplete/", AddressAutocompleteView.as_view(), name="autocomplete"),
+    path("batchResolve/", BatchResolveView.as_view(), name="batch_resolve"),
     path("getPrice/", GetPriceView.as_view(), name="get_price"),
     path("getPropertyRegistry/", GetPropertyRegistryView.as_view(), name="get_property_registry"),
     path("getBuildingInfo/", GetBuildingInfoView.as_view(), name="get_building_info"),
+    path("realtimeAir/", RealtimeAirView.as_view(), name="realtime_air"),
 ]
 
 urlpatterns += router.urls
\ No newline at end of file
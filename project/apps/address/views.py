@@ -9,17 +9,23 @@ from drf_spectacular.utils import (
 )
 
 from django.shortcuts import render
-from io import BytesIO
-from django.http import FileResponse
+from django.http import StreamingHttpResponse
 
 from external.client.business_juso import BusinessJusoClient
 from external.client.seoul_data import DataSeoulClient
 from external.address.building_info import BuildingInfoManager
-from external.address.property_registry import get_property_registry
+from external.address import building_facts
+from external.address.property_registry import open_property_registry_stream
+from external.address.juso_index import search_address_local
+from external.address.autocomplete import autocomplete
+from external.address.batch import resolve_addresses
+from external.address.realtime_air import get_realtime_air, is_enabled as realtime_air_enabled
 
 from external.address.address_manager import AddressManager
-from .serializers import (AddressSearchSerializer, GetPriceSerializer,
-                          GetPropertyRegistrySerializer, GetBuildingInfoSerializer, PropertyRegistrySerializer,
+from apps.rent.warehouse import local_price_page
+from .serializers import (AddressSearchSerializer, AddressAutocompleteSerializer, BatchResolveSerializer, GetPriceSerializer,
+                          GetPropertyRegistrySerializer, GetBuildingInfoSerializer, RealtimeAirSerializer,
+                          PropertyRegistrySerializer,
                           UserPriceSerializer, BuildingInfoSerializer, AvgPriceSerializer,
                           AirConditionSerializer, PropertyBundleSerializer,
                           FloodSerializer)
@@ -31,7 +37,7 @@ from .models import (UserPrice, BuildingInfo, AvgPrice, PropertyRegistry,
 class AddressSearchView(APIView):
     @extend_schema(
         summary="주소 검색",
-        description="장소를 검색합니다.",
+        description="장소를 검색합니다. 로컬 주소 색인에서 먼저 찾고, 결과가 없으면 juso API를 호출합니다.",
         parameters=[AddressSearchSerializer],
         tags=["address_apis"],
         responses={200: OpenApiTypes.OBJECT}
@@ -39,17 +45,60 @@ class AddressSearchView(APIView):
     def get(self, request):
         serializer = AddressSearchSerializer(data=request.query_params)
         serializer.is_valid(raise_exception=True)
+        vd = serializer.validated_data
+
+        data = search_address_local(vd["q"], size=vd["size"], page=vd["page"])
+        if data is not None:
+            return Response(data)
 
         client = BusinessJusoClient()
         data = client.search_address(
-            query = serializer.validated_data["q"],
-            size=serializer.validated_data["size"],
-            page=serializer.validated_data["page"],
+            query = vd["q"],
+            size=vd["size"],
+            page=vd["page"],
         )
         client.close()
 
         return Response(data)
 
+class AddressAutocompleteView(APIView):
+    @extend_schema(
+        summary="주소 자동완성",
+        description="입력 중인 검색어로 도로명 / 건물명 / 시군구를 추천합니다. 자모 단위 부분 입력과 초성 검색(예: ㄷㅂㄹ)을 지원합니다. 목록은 서버 메모리에 올려 두고 찾으므로 요청마다 DB를 조회하지 않습니다.",
+        parameters=[AddressAutocompleteSerializer],
+        tags=["address_apis"],
+        responses={200: OpenApiTypes.OBJECT}
+    )
+    def get(self, request):
+        serializer = AddressAutocompleteSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        vd = serializer.validated_data
+
+        suggestions = autocomplete(vd["q"], limit=vd["limit"])
+        return Response({
+            "query": vd["q"],
+            "suggestions": [s.as_dict() for s in suggestions],
+        })
+
+class BatchResolveView(APIView):
+    @extend_schema(
+        summary="주소 일괄 정리",
+        description="도로명 주소 목록(최대 500개)을 한 번에 검색해서 주소별 결과(as_dict) 혹은 오류를 입력 순서대로 반환합니다. 중복 주소는 한 번만 조회합니다.",
+        request=BatchResolveSerializer,
+        tags=["address_apis"],
+        responses={200: OpenApiTypes.OBJECT}
+    )
+    def post(self, request):
+        serializer = BatchResolveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = resolve_addresses(serializer.validated_data["addresses"])
+        return Response({
+            "count": len(results),
+            "valid": sum(1 for r in results if r["valid"]),
+            "results": results,
+        })
+
 # 전월세가 가져오기 검색 API에서 파싱해서 다시 전달필요함.
 class GetPriceView(APIView):
     @extend_schema(
@@ -70,6 +119,11 @@ class GetPriceView(APIView):
         if not address.is_valid():
             return Response({"error": "유효하지 않은 주소입니다."}, status=400)
         
+        # 로컬에 적재된 연도면 DB에서 바로 응답한다.
+        data = local_price_page(vd["size"], vd["year"], address)
+        if data is not None:
+            return Response(data)
+
         client = DataSeoulClient()
         
         data = client.getPrice(
@@ -98,20 +152,18 @@ class GetPropertyRegistryView(APIView):
         vd = serializer.validated_data
 
         full_addr = vd["roadAddr"] + " " + vd.get("details", "")
-        pdf_bytes = get_property_registry(full_addr=full_addr)
-        return FileResponse(
-            BytesIO(pdf_bytes),
-            as_attachment=True,
-            filename="output.pdf",
-            content_type="application/pdf",
-        )
+        # upstream에서 받는 대로 client에게 흘려보낸다. (PDF 전체를 메모리에 올리지 않음)
+        pdf_stream = open_property_registry_stream(full_addr=full_addr)
+        response = StreamingHttpResponse(pdf_stream, content_type="application/pdf")
+        response["Content-Disposition"] = 'attachment; filename="output.pdf"'
+        return response
 
 # 건물 정보 가져오기.
 class GetBuildingInfoView(APIView):
     serializer_class = GetBuildingInfoSerializer
     @extend_schema(
         summary="건물 정보 확인.",
-        description="건물 정보를 도로명 주소로 조회합니다.",
+        description="건물 정보를 도로명 주소로 조회합니다. 같은 필지의 정보는 저장해 두고 재사용하며, refresh=true이면 다시 받습니다.",
         parameters=[GetBuildingInfoSerializer],
         tags=["address_apis"],
         responses={200: OpenApiTypes.OBJECT},
@@ -127,11 +179,34 @@ class GetBuildingInfoView(APIView):
 
         if not address.is_valid():
             return Response({"error": "유효하지 않은 주소입니다."}, status=400)
-        
+
+        if vd["refresh"]:
+            building_facts.invalidate(building_facts.lot_key(address))
         info = BuildingInfoManager().makeInfo(address)
         
         return Response(info)
 
+# 자치구 실시간 대기질. 백그라운드에서 주기적으로 받아 둔 snapshot에서 찾는다.
+class RealtimeAirView(APIView):
+    @extend_schema(
+        summary="실시간 대기질",
+        description="자치구의 실시간 대기질(RealtimeCityAir)을 조회합니다. 몇 분마다 갱신되는 서버 메모리의 값을 주며, 요청마다 외부 API를 호출하지 않습니다.",
+        parameters=[RealtimeAirSerializer],
+        tags=["address_apis"],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        serializer = RealtimeAirSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        vd = serializer.validated_data
+
+        if not realtime_air_enabled():
+            return Response({"error": "realtime air disabled"}, status=503)
+        data = get_realtime_air(vd["gu"])
+        if data is None:
+            return Response({"error": "realtime air not found"}, status=404)
+        return Response(data)
+
 class UserPriceViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = UserPrice.objects.all().order_by("-id")
     serializer_class = UserPriceSerializer
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+
+class MonitoringPermissionTests(TestCase):
+    urls = (("get", "/monitoring/quota/"), ("get", "/monitoring/metrics/"), ("delete", "/monitoring/metrics/"))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_anonymous_is_rejected(self):
+        for method, url in self.urls:
+            response = getattr(self.client, method)(url)
+            self.assertIn(response.status_code, (401, 403), url)
+
+    def test_non_staff_is_rejected(self):
+        self.client.force_authenticate(get_user_model().objects.create_user("member", password="pw"))
+        for method, url in self.urls:
+            self.assertEqual(getattr(self.client, method)(url).status_code, 403, url)
+
+    def test_staff_is_allowed(self):
+        self.client.force_authenticate(get_user_model().objects.create_user("admin", password="pw", is_staff=True))
+        for method, url in self.urls:
+            self.assertIn(getattr(self.client, method)(url).status_code, (200, 204), url)
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import QuotaUsageView, UpstreamMetricsView
+
+urlpatterns = [
+    path("quota/", QuotaUsageView.as_view(), name="monitoring-quota"),
+    path("metrics/", UpstreamMetricsView.as_view(), name="monitoring-metrics"),
+]
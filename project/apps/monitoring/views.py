@@ -0,0 +1,61 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+
+from drf_spectacular.utils import (
+    extend_schema, OpenApiParameter, OpenApiTypes,
+)
+
+from external.client.metrics import metrics
+from external.client.ratelimit import get_rate_limiter
+from external.client.resilience import breakers_snapshot
+
+# 외부 API 사용량 / 상태 확인용 내부 API. 관리자(staff)만 사용할 수 있다.
+
+class QuotaUsageView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        summary="외부 API 할당량 조회",
+        description="API key 별 rate limit 설정, 오늘 사용량, 일별 호출 수, circuit breaker 상태를 반환합니다.",
+        parameters=[
+            OpenApiParameter(name="day", type=OpenApiTypes.STR, required=False,
+                             description="YYYY-MM-DD (KST). 없으면 전체 기간."),
+        ],
+        tags=["monitoring"],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        limiter = get_rate_limiter()
+        if limiter is None:
+            return Response({"enabled": False, "breakers": breakers_snapshot()})
+
+        return Response({
+            "enabled": True,
+            "limits": limiter.snapshot(),
+            "usage": limiter.usage(request.query_params.get("day")),
+            "breakers": breakers_snapshot(),
+        })
+
+
+class UpstreamMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        summary="외부 API 지연 시간 / 호출 지표",
+        description="upstream / endpoint 별 지연 시간 분위수(p50/p95/p99), 상태코드, timeout, 전송 byte, 캐시 hit 수를 반환합니다. (worker 프로세스 단위)",
+        tags=["monitoring"],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+    @extend_schema(
+        summary="외부 API 지표 초기화",
+        tags=["monitoring"],
+        responses={204: None},
+    )
+    def delete(self, request):
+        metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
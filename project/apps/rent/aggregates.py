@@ -0,0 +1,182 @@
+from __future__ import annotations
+from typing import Iterable, List, Optional, Tuple
+from itertools import product
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+
+from external.address.address_manager import AddressManager
+from external.address.rent_stats import JEONSE, WOLSE, summarize, per_area
+
+from .models import RentTransaction, RentAggregate
+
+
+"""
+자치구 / 법정동 전월세 집계(RentAggregate).
+  - refresh_aggregates: (자치구, 계약연도) 단위로 거래를 한 번 읽어서
+    자치구 / 법정동 × 월 / 연간 × 건물용도 / 전체 조합을 모두 다시 계산한다.
+  - ingest_year는 새 거래가 들어온 (자치구, 계약연도)만 넘기므로 적재 후에는 바뀐 부분만 계산한다.
+  - neighborhood_comparison: 리포트에서 주변 시세를 upstream 조회 없이 집계 행 몇 개로 비교한다.
+"""
+
+VALUE_COLUMNS = ("grfe", "rtfe", "rent_area")
+
+
+# 여러 key 열로 행을 묶어서 그룹별 행 index 배열 목록을 반환한다.
+def group_indices(*columns: np.ndarray) -> List[np.ndarray]:
+    key = np.zeros(len(columns[0]), dtype=np.int64)
+    for column in columns:
+        uniq, inverse = np.unique(column, return_inverse=True)
+        key = key * len(uniq) + inverse
+    _, inverse = np.unique(key, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    return np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+
+
+def _median(values: np.ndarray) -> Optional[float]:
+    stats = summarize(values)
+    return stats["median"] if stats else None
+
+
+# cgg_cd 자치구의 year 계약연도 집계를 계산한다. (저장하지 않는다)
+def compute_gu_year(cgg_cd: str, year: int) -> List[RentAggregate]:
+    rows = list(RentTransaction.objects
+                .filter(cgg_cd=cgg_cd, ctrt_year=year, ctrt_month__gte=1, ctrt_month__lte=12)
+                .values_list("stdg_cd", "stdg_nm", "cgg_nm", "ctrt_month", "bldg_usg", "rent_se", *VALUE_COLUMNS))
+    if not rows:
+        return []
+
+    cgg_nm = rows[0][2]
+    stdg_names = {row[0]: row[1] for row in rows}
+    stdg = np.array([row[0] for row in rows])
+    month = np.array([row[3] for row in rows])
+    usg = np.array([row[4] for row in rows])
+    rent_se = np.array([row[5] for row in rows])
+    values = np.array([row[6:] for row in rows], dtype=float)
+
+    # 각 행을 (법정동 / 자치구) × (월 / 연간) × (용도 / 전체) 8개 조합으로 복제해서 한 번에 묶는다.
+    n = len(rows)
+    blank = np.full(n, "")
+    zeros = np.zeros(n, dtype=month.dtype)
+    parts = [(stdg if by_dong else blank, month if by_month else zeros, usg if by_usg else blank)
+             for by_dong, by_month, by_usg in product((True, False), repeat=3)]
+    stdg_k = np.concatenate([part[0] for part in parts])
+    month_k = np.concatenate([part[1] for part in parts])
+    usg_k = np.concatenate([part[2] for part in parts])
+    rent_se_k = np.tile(rent_se, len(parts))
+    values_k = np.tile(values, (len(parts), 1))
+
+    aggregates = []
+    for idx in group_indices(stdg_k, month_k, usg_k, rent_se_k):
+        first = idx[0]
+        grfe, rtfe, area = values_k[idx, 0], values_k[idx, 1], values_k[idx, 2]
+        grfe_stats, rtfe_stats = summarize(grfe), summarize(rtfe)
+        stdg_cd = str(stdg_k[first])
+        aggregates.append(RentAggregate(
+            level=RentAggregate.LEVEL_DONG if stdg_cd else RentAggregate.LEVEL_GU,
+            cgg_cd=cgg_cd,
+            cgg_nm=cgg_nm,
+            stdg_cd=stdg_cd,
+            stdg_nm=stdg_names.get(stdg_cd, "") if stdg_cd else "",
+            year=year,
+            month=int(month_k[first]),
+            bldg_usg=str(usg_k[first]),
+            rent_se=str(rent_se_k[first]),
+            count=len(idx),
+            avg_grfe=grfe_stats["mean"],
+            median_grfe=grfe_stats["median"],
+            p25_grfe=grfe_stats["p25"],
+            p75_grfe=grfe_stats["p75"],
+            avg_rtfe=rtfe_stats["mean"],
+            median_rtfe=rtfe_stats["median"],
+            median_area=_median(area),
+            grfe_per_m2=_median(per_area(grfe, area)),
+            rtfe_per_m2=_median(per_area(rtfe, area)),
+        ))
+    return aggregates
+
+
+# (자치구 코드, 계약연도) 목록의 집계를 다시 계산해서 바꿔 넣는다. 저장한 행 수를 반환한다.
+def refresh_aggregates(gu_years: Iterable[Tuple[str, int]]) -> int:
+    saved = 0
+    for cgg_cd, year in sorted(set(gu_years)):
+        aggregates = compute_gu_year(cgg_cd, year)
+        with transaction.atomic():
+            RentAggregate.objects.filter(cgg_cd=cgg_cd, year=year).delete()
+            RentAggregate.objects.bulk_create(aggregates, batch_size=500)
+        saved += len(aggregates)
+    return saved
+
+
+# 적재된 거래의 (자치구 코드, 계약연도) 목록. years가 있으면 해당 연도만.
+def all_gu_years(years: Optional[Iterable[int]] = None) -> List[Tuple[str, int]]:
+    qs = RentTransaction.objects.exclude(ctrt_year=None)
+    if years is not None:
+        qs = qs.filter(ctrt_year__in=list(years))
+    return list(qs.values_list("cgg_cd", "ctrt_year").distinct())
+
+
+# 필지의 거래에서 가장 많은 건물용도. 적재된 거래가 없으면 빈 값(전체).
+def housing_type(address_manager: AddressManager) -> str:
+    from .warehouse import lot_transactions
+    row = (lot_transactions(address_manager)
+           .exclude(bldg_usg="")
+           .values("bldg_usg")
+           .annotate(count=Count("id"))
+           .order_by("-count")
+           .first())
+    return row["bldg_usg"] if row else ""
+
+
+# 여러 연도의 연간 집계를 거래 수로 가중해서 합친다. (중앙값은 연도별 중앙값의 가중 평균)
+def _combine(rows: List[RentAggregate]) -> dict:
+    count = sum(row.count for row in rows)
+
+    def weighted(field):
+        values = [(getattr(row, field), row.count) for row in rows if getattr(row, field) is not None]
+        weight = sum(c for _, c in values)
+        return sum(v * c for v, c in values) / weight if weight else None
+
+    return {
+        "count": count,
+        "years": sorted(row.year for row in rows),
+        "avg_grfe": weighted("avg_grfe"),
+        "median_grfe": weighted("median_grfe"),
+        "avg_rtfe": weighted("avg_rtfe"),
+        "median_rtfe": weighted("median_rtfe"),
+        "grfe_per_m2": weighted("grfe_per_m2"),
+        "rtfe_per_m2": weighted("rtfe_per_m2"),
+    }
+
+
+# 주소가 속한 법정동 / 자치구의 years 연간 전월세 집계. 집계가 없으면 None.
+# bldg_usg가 없으면 필지 거래의 건물용도를 쓰고, 해당 용도 집계가 없으면 전체 집계를 쓴다.
+def neighborhood_comparison(address_manager: AddressManager, years: List[int],
+                            bldg_usg: Optional[str] = None) -> Optional[dict]:
+    if bldg_usg is None:
+        bldg_usg = housing_type(address_manager)
+    usages = [bldg_usg, ""] if bldg_usg else [""]
+
+    rows = list(RentAggregate.objects.filter(
+        cgg_cd=address_manager.cggCd,
+        stdg_cd__in=["", address_manager.stdgCd],
+        year__in=years,
+        month=0,
+        bldg_usg__in=usages,
+    ))
+    if not rows:
+        return None
+    usage = bldg_usg if any(row.bldg_usg == bldg_usg for row in rows) else ""
+
+    result = {"bldg_usg": usage or "전체", "years": years}
+    for level, stdg_cd in ((RentAggregate.LEVEL_DONG, address_manager.stdgCd), (RentAggregate.LEVEL_GU, "")):
+        level_rows = [row for row in rows if row.stdg_cd == stdg_cd and row.bldg_usg == usage]
+        if not level_rows:
+            continue
+        result[level] = {
+            "name": level_rows[0].stdg_nm if stdg_cd else level_rows[0].cgg_nm,
+            **{kind: _combine([row for row in level_rows if row.rent_se == kind])
+               for kind in (JEONSE, WOLSE) if any(row.rent_se == kind for row in level_rows)},
+        }
+    return result
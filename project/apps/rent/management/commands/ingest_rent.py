@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.rent.warehouse import ingest_year
+
+
+class Command(BaseCommand):
+    help = "서울시 전월세 데이터(tbLnOpendataRentV)를 연도별로 이어서 적재한다. 매일 밤 실행하는 것을 가정한다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--years", type=int, nargs="*", help="적재할 접수연도. 기본값은 올해와 작년.")
+        parser.add_argument("--since", type=int, help="이 연도부터 올해까지 적재한다.")
+        parser.add_argument("--full", action="store_true", help="high_water를 무시하고 처음부터 다시 받는다. 정정 / 삭제된 행을 반영하려면 주기적으로(예: 매주) 실행한다.")
+        parser.add_argument("--workers", type=int, default=None)
+
+    def handle(self, *args, **options):
+        current_year = datetime.now().year
+        if options["years"]:
+            years = options["years"]
+        elif options["since"]:
+            years = list(range(options["since"], current_year + 1))
+        else:
+            years = [current_year - 1, current_year]
+
+        failed = []
+        for year in years:
+            try:
+                result = ingest_year(year, full=options["full"], max_workers=options["workers"], log=self.stdout.write)
+            except Exception as e:
+                self.stderr.write(f"{year}: 적재 실패 ({type(e).__name__}: {e})")
+                failed.append(year)
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"{year}: {result['received']}건 수신, {result['inserted']}건 추가, {result['updated']}건 갱신, "
+                f"{result['deleted']}건 삭제 "
+                f"(high_water {result['high_water']}/{result['total']}, 집계 {result['aggregates']}행 갱신)"
+            ))
+        if failed:
+            raise CommandError(f"적재 실패 연도: {failed}")
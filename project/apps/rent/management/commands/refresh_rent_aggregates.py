@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.rent.aggregates import all_gu_years, refresh_aggregates
+
+
+class Command(BaseCommand):
+    help = "적재된 전월세 거래로 자치구 / 법정동 집계(RentAggregate)를 다시 계산한다. ingest_rent는 바뀐 부분만 갱신하므로 처음 한 번이나 복구 시에 실행한다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--years", type=int, nargs="*", help="다시 계산할 계약연도. 기본값은 전체.")
+
+    def handle(self, *args, **options):
+        gu_years = all_gu_years(options["years"] or None)
+        saved = refresh_aggregates(gu_years)
+        self.stdout.write(self.style.SUCCESS(f"자치구 / 연도 {len(gu_years)}개, 집계 {saved}행 갱신"))
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentIngestState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(unique=True)),
+                ('high_water', models.IntegerField(default=0)),
+                ('total_count', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RentTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rcpt_yr', models.IntegerField()),
+                ('cgg_cd', models.CharField(max_length=5)),
+                ('cgg_nm', models.CharField(blank=True, default='', max_length=20)),
+                ('stdg_cd', models.CharField(max_length=5)),
+                ('stdg_nm', models.CharField(blank=True, default='', max_length=30)),
+                ('lotno_se', models.CharField(blank=True, default='', max_length=1)),
+                ('mno', models.CharField(blank=True, default='', max_length=4)),
+                ('sno', models.CharField(blank=True, default='', max_length=4)),
+                ('flr', models.IntegerField(blank=True, null=True)),
+                ('ctrt_day', models.CharField(blank=True, default='', max_length=8)),
+                ('ctrt_year', models.IntegerField(blank=True, null=True)),
+                ('ctrt_month', models.IntegerField(blank=True, null=True)),
+                ('rent_se', models.CharField(max_length=10)),
+                ('rent_area', models.FloatField(blank=True, null=True)),
+                ('grfe', models.BigIntegerField(default=0)),
+                ('rtfe', models.BigIntegerField(default=0)),
+                ('bldg_nm', models.CharField(blank=True, default='', max_length=100)),
+                ('arch_yr', models.CharField(blank=True, default='', max_length=4)),
+                ('bldg_usg', models.CharField(blank=True, default='', max_length=30)),
+                ('ctrt_prd', models.CharField(blank=True, default='', max_length=30)),
+                ('new_updt_yn', models.CharField(blank=True, default='', max_length=10)),
+                ('row_hash', models.CharField(max_length=40, unique=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cgg_cd', 'stdg_cd', 'lotno_se', 'mno', 'sno', 'rcpt_yr'], name='rent_lot_year_idx'), models.Index(fields=['cgg_cd', 'stdg_cd', 'ctrt_year', 'ctrt_month'], name='rent_dong_month_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rent', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('gu', '자치구'), ('dong', '법정동')], max_length=4)),
+                ('cgg_cd', models.CharField(max_length=5)),
+                ('cgg_nm', models.CharField(blank=True, default='', max_length=20)),
+                ('stdg_cd', models.CharField(blank=True, default='', max_length=5)),
+                ('stdg_nm', models.CharField(blank=True, default='', max_length=30)),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField(default=0)),
+                ('bldg_usg', models.CharField(blank=True, default='', max_length=30)),
+                ('rent_se', models.CharField(max_length=10)),
+                ('count', models.IntegerField(default=0)),
+                ('avg_grfe', models.FloatField(default=0.0)),
+                ('median_grfe', models.FloatField(default=0.0)),
+                ('p25_grfe', models.FloatField(default=0.0)),
+                ('p75_grfe', models.FloatField(default=0.0)),
+                ('avg_rtfe', models.FloatField(default=0.0)),
+                ('median_rtfe', models.FloatField(default=0.0)),
+                ('median_area', models.FloatField(blank=True, null=True)),
+                ('grfe_per_m2', models.FloatField(blank=True, null=True)),
+                ('rtfe_per_m2', models.FloatField(blank=True, null=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('cgg_cd', 'stdg_cd', 'year', 'month', 'bldg_usg', 'rent_se'), name='unique_rent_aggregate')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+import hashlib, json
+
+from django.db import migrations, models
+
+
+KEY_FIELDS = ("rcpt_yr", "cgg_cd", "stdg_cd", "lotno_se", "mno", "sno", "flr", "ctrt_day", "rent_se", "rent_area", "bldg_nm")
+
+
+# 기존 행의 txn_key / seq를 채운다. 같은 거래는 id 순서대로 seq를 매긴다. (apps.rent.warehouse.transaction_key와 같은 값)
+def fill_transaction_keys(apps, schema_editor):
+    RentTransaction = apps.get_model("rent", "RentTransaction")
+    counts = {}
+    batch = []
+    for transaction in RentTransaction.objects.order_by("id").iterator():
+        key = [getattr(transaction, field) for field in KEY_FIELDS]
+        transaction.txn_key = hashlib.sha1(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+        transaction.seq = counts.get(transaction.txn_key, 0)
+        counts[transaction.txn_key] = transaction.seq + 1
+        batch.append(transaction)
+        if len(batch) >= 1000:
+            RentTransaction.objects.bulk_update(batch, ["txn_key", "seq"])
+            batch = []
+    RentTransaction.objects.bulk_update(batch, ["txn_key", "seq"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rent', '0002_rentaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renttransaction',
+            name='txn_key',
+            field=models.CharField(default='', max_length=40),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='renttransaction',
+            name='seq',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_transaction_keys, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='renttransaction',
+            name='row_hash',
+        ),
+        migrations.AddConstraint(
+            model_name='renttransaction',
+            constraint=models.UniqueConstraint(fields=('txn_key', 'seq'), name='unique_rent_transaction'),
+        ),
+    ]
@@ -0,0 +1,106 @@
+from django.db import models
+
+# Create your models here.
+
+# 서울시 부동산 전월세가 정보(tbLnOpendataRentV) 한 건.
+# 같은 거래(txn_key: 접수연도, 필지, 층, 계약일, 전월세 구분, 면적, 건물명)가 여러 번 있으면 seq(0부터)로 구분한다.
+# 다시 받을 때 같은 (txn_key, seq)는 새로 만들지 않고 값(보증금 등)을 고친다.
+class RentTransaction(models.Model):
+    # 접수연도
+    rcpt_yr = models.IntegerField()
+    # 자치구 코드 / 이름
+    cgg_cd = models.CharField(max_length=5)
+    cgg_nm = models.CharField(max_length=20, blank=True, default='')
+    # 법정동 코드 / 이름
+    stdg_cd = models.CharField(max_length=5)
+    stdg_nm = models.CharField(max_length=30, blank=True, default='')
+    # 지번구분. 1이면 대지, 2가 산.
+    lotno_se = models.CharField(max_length=1, blank=True, default='')
+    # 본번 / 부번 (4자리)
+    mno = models.CharField(max_length=4, blank=True, default='')
+    sno = models.CharField(max_length=4, blank=True, default='')
+    flr = models.IntegerField(blank=True, null=True)
+    # 계약일 (YYYYMMDD)
+    ctrt_day = models.CharField(max_length=8, blank=True, default='')
+    ctrt_year = models.IntegerField(blank=True, null=True)
+    ctrt_month = models.IntegerField(blank=True, null=True)
+    # 전세 / 월세
+    rent_se = models.CharField(max_length=10)
+    # 임대면적(㎡)
+    rent_area = models.FloatField(blank=True, null=True)
+    # 보증금 / 임대료 (만원)
+    grfe = models.BigIntegerField(default=0)
+    rtfe = models.BigIntegerField(default=0)
+    bldg_nm = models.CharField(max_length=100, blank=True, default='')
+    arch_yr = models.CharField(max_length=4, blank=True, default='')
+    bldg_usg = models.CharField(max_length=30, blank=True, default='')
+    ctrt_prd = models.CharField(max_length=30, blank=True, default='')
+    new_updt_yn = models.CharField(max_length=10, blank=True, default='')
+    txn_key = models.CharField(max_length=40)
+    seq = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["txn_key", "seq"], name="unique_rent_transaction"),
+        ]
+        indexes = [
+            models.Index(fields=["cgg_cd", "stdg_cd", "lotno_se", "mno", "sno", "rcpt_yr"], name="rent_lot_year_idx"),
+            models.Index(fields=["cgg_cd", "stdg_cd", "ctrt_year", "ctrt_month"], name="rent_dong_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.cgg_nm} {self.stdg_nm} {self.mno}-{self.sno} {self.rent_se} {self.ctrt_day}"
+
+# 연도(접수연도)별 적재 현황. high_water까지의 행(1부터)을 적재했다.
+# upstream 전체 행 수가 total_count와 달라지면 그 연도를 처음부터 다시 받는다. (apps.rent.warehouse)
+class RentIngestState(models.Model):
+    year = models.IntegerField(unique=True)
+    high_water = models.IntegerField(default=0)
+    # 마지막으로 확인한 upstream 전체 행 수.
+    total_count = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.year}: {self.high_water}/{self.total_count}"
+
+# 자치구 / 법정동 단위 전월세 집계. (계약연월, 건물용도, 전세/월세별)
+# 적재(ingest_rent) 후 새 거래가 들어온 자치구 / 연도만 다시 계산한다. (apps.rent.aggregates)
+class RentAggregate(models.Model):
+    LEVEL_GU = "gu"
+    LEVEL_DONG = "dong"
+    LEVEL_CHOICES = [(LEVEL_GU, "자치구"), (LEVEL_DONG, "법정동")]
+
+    level = models.CharField(max_length=4, choices=LEVEL_CHOICES)
+    cgg_cd = models.CharField(max_length=5)
+    cgg_nm = models.CharField(max_length=20, blank=True, default='')
+    # 자치구 집계면 빈 값.
+    stdg_cd = models.CharField(max_length=5, blank=True, default='')
+    stdg_nm = models.CharField(max_length=30, blank=True, default='')
+    # 계약연도 / 월. month가 0이면 연간 집계.
+    year = models.IntegerField()
+    month = models.IntegerField(default=0)
+    # 건물용도(아파트, 연립다세대 등). 빈 값이면 전체.
+    bldg_usg = models.CharField(max_length=30, blank=True, default='')
+    rent_se = models.CharField(max_length=10)
+    count = models.IntegerField(default=0)
+    # 보증금 / 임대료 (만원)
+    avg_grfe = models.FloatField(default=0.0)
+    median_grfe = models.FloatField(default=0.0)
+    p25_grfe = models.FloatField(default=0.0)
+    p75_grfe = models.FloatField(default=0.0)
+    avg_rtfe = models.FloatField(default=0.0)
+    median_rtfe = models.FloatField(default=0.0)
+    # 임대면적(㎡) 중앙값과 ㎡당 보증금 / 임대료 중앙값
+    median_area = models.FloatField(blank=True, null=True)
+    grfe_per_m2 = models.FloatField(blank=True, null=True)
+    rtfe_per_m2 = models.FloatField(blank=True, null=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cgg_cd", "stdg_cd", "year", "month", "bldg_usg", "rent_se"],
+                                    name="unique_rent_aggregate"),
+        ]
+
+    def __str__(self):
+        return f"{self.cgg_nm} {self.stdg_nm} {self.year}-{self.month} {self.bldg_usg or '전체'} {self.rent_se}"
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from rest_framework import serializers
+
+from .models import RentAggregate
+
+
+class RentAggregateQuerySerializer(serializers.Serializer):
+    # 도로명 주소 혹은 자치구 코드 중 하나는 있어야 한다.
+    roadAddr = serializers.CharField(max_length=200, required=False)
+    cggCd = serializers.CharField(max_length=5, required=False)
+    stdgCd = serializers.CharField(max_length=5, required=False)
+    level = serializers.ChoiceField(choices=RentAggregate.LEVEL_CHOICES, required=False)
+    startYear = serializers.IntegerField(required=False, min_value=2000, max_value=2100, default=datetime.now().year)
+    endYear = serializers.IntegerField(required=False, min_value=2000, max_value=2100)
+    # 0이면 연간 집계. 없으면 전체.
+    month = serializers.IntegerField(required=False, min_value=0, max_value=12)
+    # 건물용도. 빈 값이면 전체 용도 집계.
+    bldgUsg = serializers.CharField(max_length=30, required=False, allow_blank=True, default="")
+    rentSe = serializers.ChoiceField(choices=["전세", "월세"], required=False)
+
+    def validate(self, attrs):
+        if not attrs.get("roadAddr") and not attrs.get("cggCd"):
+            raise serializers.ValidationError("roadAddr 혹은 cggCd가 필요합니다.")
+        if attrs.get("endYear") and attrs["endYear"] < attrs["startYear"]:
+            raise serializers.ValidationError("endYear는 startYear보다 작을 수 없습니다.")
+        return attrs
+
+
+class RentSeriesQuerySerializer(serializers.Serializer):
+    # lot(필지)는 roadAddr가 필요하다. dong(법정동)은 roadAddr 혹은 cggCd + stdgCd.
+    scope = serializers.ChoiceField(choices=["lot", "dong"], required=False, default="lot")
+    roadAddr = serializers.CharField(max_length=200, required=False)
+    cggCd = serializers.CharField(max_length=5, required=False)
+    stdgCd = serializers.CharField(max_length=5, required=False)
+    startYear = serializers.IntegerField(required=False, min_value=2000, max_value=2100, default=datetime.now().year - 4)
+    endYear = serializers.IntegerField(required=False, min_value=2000, max_value=2100, default=datetime.now().year)
+    freq = serializers.ChoiceField(choices=["month", "quarter"], required=False, default="month")
+    # 점 개수 상한. 넘으면 이웃한 기간을 합친다.
+    maxPoints = serializers.IntegerField(required=False, min_value=4, max_value=500)
+    # 법정동 시계열의 건물용도. 빈 값이면 전체.
+    bldgUsg = serializers.CharField(max_length=30, required=False, allow_blank=True, default="")
+
+    def validate(self, attrs):
+        if attrs["scope"] == "lot" and not attrs.get("roadAddr"):
+            raise serializers.ValidationError("scope=lot은 roadAddr가 필요합니다.")
+        if not attrs.get("roadAddr") and not (attrs.get("cggCd") and attrs.get("stdgCd")):
+            raise serializers.ValidationError("roadAddr 혹은 cggCd + stdgCd가 필요합니다.")
+        if attrs["endYear"] < attrs["startYear"]:
+            raise serializers.ValidationError("endYear는 startYear보다 작을 수 없습니다.")
+        return attrs
+
+
+class RentAggregateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RentAggregate
+        exclude = ["id"]
@@ -0,0 +1,152 @@
+from __future__ import annotations
+from typing import Optional
+from math import ceil
+import json, threading, time
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max
+
+from external.address.rent_stats import JEONSE, WOLSE, to_jeonse
+from external.client.cache import CacheEntry, LocMemTier
+
+from .aggregates import group_indices
+from .models import RentTransaction, RentIngestState
+
+
+"""
+전월세 시계열. (필지 / 법정동, 월 / 분기)
+  - 로컬에 적재된 거래(RentTransaction)로 기간별 건수, 평균 / 중앙값 보증금, 월세를 계산한다.
+  - 기간 수가 max_points를 넘으면 이웃한 기간을 합친 더 넓은 구간으로 다시 계산한다.
+    (점을 골라내지 않고 원래 거래로 구간 통계를 구하므로 중앙값이 정확하다)
+  - 결과는 프로세스 내부 LRU에 저장한다. key에 적재 시각이 들어가므로 새로 적재하면 (VERSION_TTL 안에) 자동으로 무효화된다.
+"""
+
+SCOPE_LOT = "lot"
+SCOPE_DONG = "dong"
+FREQ_MONTHS = {"month": 1, "quarter": 3}
+
+_cache: Optional[LocMemTier] = None
+_cache_lock = threading.Lock()
+
+
+def _conf() -> dict:
+    return getattr(settings, "RENT_SERIES", {})
+
+
+def _get_cache() -> LocMemTier:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LocMemTier(max_entries=_conf().get("LOCAL_MAX_ENTRIES", 256))
+    return _cache
+
+
+_version: Optional[tuple] = None
+
+
+# 마지막 적재 시각. 캐시 key에 넣는다. 요청마다 DB를 읽지 않도록 VERSION_TTL(초) 동안 같은 값을 쓴다.
+def data_version() -> str:
+    global _version
+    now = time.monotonic()
+    cached = _version
+    if cached is not None and now < cached[1]:
+        return cached[0]
+    updated = RentIngestState.objects.aggregate(latest=Max("updated"))["latest"]
+    version = updated.isoformat() if updated else ""
+    _version = (version, now + _conf().get("VERSION_TTL", 30))
+    return version
+
+
+def _label(month_index: int, width: int, freq: str) -> str:
+    year, month = divmod(month_index, 12)
+    if width == 1:
+        return f"{year}-{month + 1:02d}"
+    if width == 3 and freq == "quarter":
+        return f"{year}Q{month // 3 + 1}"
+    end_year, end_month = divmod(month_index + width - 1, 12)
+    return f"{year}-{month + 1:02d}~{end_year}-{end_month + 1:02d}"
+
+
+def _kind_stats(grfe: np.ndarray, rtfe: np.ndarray) -> dict:
+    return {
+        "count": int(grfe.size),
+        "avg_grfe": float(grfe.mean()),
+        "median_grfe": float(np.median(grfe)),
+        "avg_rtfe": float(rtfe.mean()),
+        "median_rtfe": float(np.median(rtfe)),
+    }
+
+
+# filters에 맞는 거래로 시계열을 계산한다. (캐시하지 않는다)
+def compute_series(filters: dict, start_year: int, end_year: int, freq: str = "month",
+                   max_points: Optional[int] = None) -> dict:
+    max_points = max_points or _conf().get("MAX_POINTS", 120)
+    base = start_year * 12
+    periods = (end_year - start_year + 1) * 12 // FREQ_MONTHS[freq]
+    # 구간 하나가 몇 개월인지. 기간 수가 max_points 이하가 되도록 기본 주기의 배수로 넓힌다.
+    width = FREQ_MONTHS[freq] * ceil(periods / max_points)
+
+    rows = list(RentTransaction.objects
+                .filter(**filters, ctrt_year__gte=start_year, ctrt_year__lte=end_year,
+                        ctrt_month__gte=1, ctrt_month__lte=12)
+                .values_list("ctrt_year", "ctrt_month", "rent_se", "grfe", "rtfe"))
+    buckets = ceil((end_year - start_year + 1) * 12 / width)
+    points = [{
+        "period": _label(base + i * width, width, freq),
+        "count": 0,
+        JEONSE: None,
+        WOLSE: None,
+        "median_jeonse_equivalent": None,
+    } for i in range(buckets)]
+
+    if rows:
+        month_index = np.array([row[0] * 12 + row[1] - 1 for row in rows])
+        kinds = np.array([row[2] for row in rows])
+        values = np.array([row[3:] for row in rows], dtype=float)
+        bucket = (month_index - base) // width
+        for idx in group_indices(bucket):
+            point = points[int(bucket[idx[0]])]
+            point["count"] = int(idx.size)
+            for kind in (JEONSE, WOLSE):
+                selected = idx[kinds[idx] == kind]
+                if selected.size:
+                    point[kind] = _kind_stats(values[selected, 0], values[selected, 1])
+            # 전세 / 월세를 함께 보기 위한 전세 환산 보증금 중앙값
+            point["median_jeonse_equivalent"] = float(np.median(to_jeonse(values[idx, 0], values[idx, 1])))
+
+    return {
+        "freq": freq,
+        "bucket_months": width,
+        "start_year": start_year,
+        "end_year": end_year,
+        "count": len(rows),
+        "points": points,
+    }
+
+
+# compute_series를 캐시해서 반환한다. 새로 적재되거나 CACHE_TTL이 지나면 다시 계산한다.
+def get_series(scope: str, filters: dict, start_year: int, end_year: int, freq: str = "month",
+               max_points: Optional[int] = None) -> dict:
+    key = json.dumps([scope, sorted(filters.items()), start_year, end_year, freq, max_points, data_version()],
+                     ensure_ascii=False)
+    cache = _get_cache()
+    entry = cache.get(key)
+    if entry is not None and entry.is_fresh(time.time()):
+        return {**entry.value, "cached": True}
+
+    series = {"scope": scope, **compute_series(filters, start_year, end_year, freq, max_points)}
+    expires_at = time.time() + _conf().get("CACHE_TTL", 60 * 60)
+    cache.set(key, CacheEntry(series, expires_at, expires_at), len(json.dumps(series, ensure_ascii=False)))
+    return {**series, "cached": False}
+
+
+# AddressManager(initialize 완료)로 시계열 조회 조건을 만든다.
+def series_filters(scope: str, address_manager, bldg_usg: str = "") -> dict:
+    filters = {"cgg_cd": address_manager.cggCd, "stdg_cd": address_manager.stdgCd}
+    if scope == SCOPE_LOT:
+        filters.update(lotno_se=address_manager.mtYn, mno=address_manager.lnbrMnnm, sno=address_manager.lnbrSlno)
+    elif bldg_usg:
+        filters["bldg_usg"] = bldg_usg
+    return filters
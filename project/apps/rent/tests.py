@@ -0,0 +1,88 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from external.address.rent_stats import (
+    JEONSE, WOLSE, RentSamples, percentile_of, summarize, to_jeonse, trimmed_mean, user_price_position,
+)
+
+
+def row(kind, deposit, rent=0, area=30):
+    return {"RENT_SE": kind, "GRFE": str(deposit), "RTFE": str(rent), "RENT_AREA": str(area)}
+
+
+class SummarizeTests(SimpleTestCase):
+    def test_median_of_odd_and_even_counts(self):
+        self.assertEqual(summarize([3, 1, 2])["median"], 2)
+        self.assertEqual(summarize([4, 1, 3, 2])["median"], 2.5)
+
+    def test_ignores_nan_and_empty(self):
+        self.assertEqual(summarize([np.nan, 5, 1])["count"], 2)
+        self.assertIsNone(summarize([np.nan]))
+        self.assertIsNone(summarize([]))
+
+    def test_percentiles(self):
+        stats = summarize(range(101))
+        self.assertEqual((stats["p10"], stats["p25"], stats["p75"], stats["p90"]), (10, 25, 75, 90))
+        self.assertEqual((stats["min"], stats["max"]), (0, 100))
+
+    def test_trimmed_mean_drops_outliers(self):
+        values = np.array([10.0] * 9 + [1000.0])
+        self.assertEqual(trimmed_mean(values), 10.0)
+        self.assertEqual(trimmed_mean(np.array([1.0, 9.0])), 5.0)
+
+
+class PercentileOfTests(SimpleTestCase):
+    def test_interpolates_on_distinct_grid(self):
+        grid = [0, 10, 20, 30, 40]
+        self.assertEqual(percentile_of(20, grid), 50)
+        self.assertEqual(percentile_of(15, grid), 37.5)
+
+    def test_clamps_outside_grid(self):
+        self.assertEqual(percentile_of(-1, [0, 10]), 0)
+        self.assertEqual(percentile_of(11, [0, 10]), 100)
+
+    def test_repeated_values_use_middle_of_their_range(self):
+        self.assertEqual(percentile_of(5, [5] * 21), 50)
+        # 0 ~ 50 분위가 모두 10이다.
+        grid = [10, 10, 10, 20, 30]
+        self.assertEqual(percentile_of(10, grid), 25)
+        self.assertEqual(percentile_of(15, grid), 62.5)
+
+    def test_empty_grid(self):
+        self.assertIsNone(percentile_of(1, []))
+
+
+class RentSamplesTests(SimpleTestCase):
+    def test_skips_invalid_rows(self):
+        samples = RentSamples()
+        samples.add_rows([row(JEONSE, 100), row(WOLSE, 10, 1), row("기타", 1), row(JEONSE, "없음")])
+        self.assertEqual((samples.count(JEONSE), samples.count(WOLSE), samples.skipped), (1, 1, 2))
+
+    def test_result(self):
+        samples = RentSamples()
+        samples.add_rows([row(JEONSE, 100), row(JEONSE, 300, area=0)])
+        samples.add_rows([row(WOLSE, 10, 1), row(WOLSE, 20, 3), row(WOLSE, 30, 2)])
+        result = samples.result(rate=0.06)
+        self.assertEqual((result["year_count"], result["month_count"]), (2, 3))
+        self.assertEqual(result["median_year_price"], 200)
+        self.assertEqual(result["median_month_security_price"], 20)
+        self.assertEqual(result["median_month_rent"], 2)
+        # 면적이 0인 행은 ㎡당 가격에서 뺀다.
+        self.assertAlmostEqual(result["year_price_per_m2"], 100 / 30)
+        self.assertEqual(len(result["stats"]["jeonse_equivalent_quantiles"]), 21)
+
+    def test_result_without_both_kinds(self):
+        samples = RentSamples()
+        samples.add_rows([row(JEONSE, 100)])
+        self.assertIn("error", samples.result())
+
+    def test_user_price_position(self):
+        samples = RentSamples()
+        samples.add_rows([row(JEONSE, deposit) for deposit in (100, 200, 300)])
+        samples.add_rows([row(WOLSE, 0, 1)])
+        stats = samples.result(rate=0.06)["stats"]
+        self.assertEqual(float(to_jeonse(0, 1, 0.06)), 200)
+        position = user_price_position(200, None, True, stats)
+        self.assertEqual(position["jeonse_equivalent"], 200)
+        self.assertEqual(position["percentile"], 50)
+        self.assertIsNone(user_price_position(None, None, True, stats))
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import RentAggregateView, RentSeriesView
+
+urlpatterns = [
+    path("aggregates/", RentAggregateView.as_view(), name="rent-aggregates"),
+    path("series/", RentSeriesView.as_view(), name="rent-series"),
+]
@@ -0,0 +1,84 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+
+from external.address.address_manager import AddressManager
+
+from .models import RentAggregate
+from .serializers import RentAggregateQuerySerializer, RentAggregateSerializer, RentSeriesQuerySerializer
+from .series import get_series, series_filters
+
+
+class RentAggregateView(APIView):
+    @extend_schema(
+        summary="자치구 / 법정동 전월세 집계 조회",
+        description="적재된 서울시 전월세 거래로 미리 계산한 자치구 / 법정동 단위 계약연월, 건물용도, 전세/월세별 집계(건수, 평균, 중앙값, ㎡당 가격)를 반환합니다. "
+                    "roadAddr를 주면 해당 주소의 법정동과 자치구 집계를 함께 반환합니다. month=0은 연간 집계입니다.",
+        parameters=[RentAggregateQuerySerializer],
+        tags=["rent"],
+        responses={200: RentAggregateSerializer(many=True)},
+    )
+    def get(self, request):
+        serializer = RentAggregateQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        vd = serializer.validated_data
+
+        cgg_cd, stdg_cd = vd.get("cggCd"), vd.get("stdgCd")
+        if vd.get("roadAddr"):
+            address = AddressManager(roadAddr=vd["roadAddr"])
+            address.initialize(research=True)
+            if not address.is_valid():
+                return Response({"error": "유효하지 않은 주소입니다."}, status=status.HTTP_400_BAD_REQUEST)
+            cgg_cd, stdg_cd = address.cggCd, address.stdgCd
+
+        qs = RentAggregate.objects.filter(
+            cgg_cd=cgg_cd,
+            year__gte=vd["startYear"],
+            year__lte=vd.get("endYear") or vd["startYear"],
+            bldg_usg=vd["bldgUsg"],
+        )
+        level = vd.get("level")
+        if level == RentAggregate.LEVEL_GU:
+            qs = qs.filter(stdg_cd="")
+        elif stdg_cd:
+            qs = qs.filter(stdg_cd=stdg_cd) if level == RentAggregate.LEVEL_DONG else qs.filter(stdg_cd__in=["", stdg_cd])
+        elif level == RentAggregate.LEVEL_DONG:
+            qs = qs.exclude(stdg_cd="")
+        if vd.get("month") is not None:
+            qs = qs.filter(month=vd["month"])
+        if vd.get("rentSe"):
+            qs = qs.filter(rent_se=vd["rentSe"])
+
+        rows = qs.order_by("stdg_cd", "year", "month", "rent_se")
+        return Response(RentAggregateSerializer(rows, many=True).data)
+
+
+class RentSeriesView(APIView):
+    @extend_schema(
+        summary="전월세 시계열 조회",
+        description="적재된 전월세 거래로 필지(lot) 혹은 법정동(dong)의 월 / 분기별 건수, 평균 / 중앙값 보증금과 월세를 반환합니다. "
+                    "기간이 길어 점 개수가 maxPoints를 넘으면 이웃한 기간을 합친 구간으로 계산합니다. (bucket_months)",
+        parameters=[RentSeriesQuerySerializer],
+        tags=["rent"],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        serializer = RentSeriesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        vd = serializer.validated_data
+
+        if vd.get("roadAddr"):
+            address = AddressManager(roadAddr=vd["roadAddr"])
+            address.initialize(research=True)
+            if not address.is_valid():
+                return Response({"error": "유효하지 않은 주소입니다."}, status=status.HTTP_400_BAD_REQUEST)
+            filters = series_filters(vd["scope"], address, vd["bldgUsg"])
+        else:
+            filters = {"cgg_cd": vd["cggCd"], "stdg_cd": vd["stdgCd"]}
+            if vd["bldgUsg"]:
+                filters["bldg_usg"] = vd["bldgUsg"]
+
+        series = get_series(vd["scope"], filters, vd["startYear"], vd["endYear"], vd["freq"], vd.get("maxPoints"))
+        return Response(series)
@@ -0,0 +1,293 @@
+from __future__ import annotations
+from typing import Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import hashlib, json
+
+import numpy as np
+
+from django.conf import settings
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from external.address.address_manager import AddressManager
+from external.address.price import parse_price_page
+from external.address.rent_stats import RentSamples
+from external.client.seoul_data import DataSeoulClient, MAX_ROWS_PER_REQUEST
+
+from .aggregates import refresh_aggregates
+from .models import RentTransaction, RentIngestState
+
+
+"""
+서울시 전월세 데이터(tbLnOpendataRentV) 로컬 적재 / 조회.
+  - ingest_year: 연도별 high_water 다음 행부터 받아서 적재한다. (ingest_rent 명령)
+    upstream 전체 행 수가 지난번보다 줄었으면(삭제) 그 연도를 처음부터 다시 받고, 받지 못한 행은 지운다.
+  - 거래는 식별 필드로 만든 txn_key와 같은 거래 안의 순번(seq)으로 구분한다. 정정된 행은 값만 고친다.
+  - 적재가 끝난 연도는 get_avg_price / GetPriceView가 upstream 대신 로컬 DB에서 계산한다.
+  - 새 거래가 들어온 자치구 / 계약연도의 집계(RentAggregate)를 다시 계산한다.
+"""
+
+# upstream 필드 → 모델 필드
+FIELD_MAP = {
+    "RCPT_YR": "rcpt_yr",
+    "CGG_CD": "cgg_cd",
+    "CGG_NM": "cgg_nm",
+    "STDG_CD": "stdg_cd",
+    "STDG_NM": "stdg_nm",
+    "LOTNO_SE": "lotno_se",
+    "MNO": "mno",
+    "SNO": "sno",
+    "FLR": "flr",
+    "CTRT_DAY": "ctrt_day",
+    "RENT_SE": "rent_se",
+    "RENT_AREA": "rent_area",
+    "GRFE": "grfe",
+    "RTFE": "rtfe",
+    "BLDG_NM": "bldg_nm",
+    "ARCH_YR": "arch_yr",
+    "BLDG_USG": "bldg_usg",
+    "CTRT_PRD": "ctrt_prd",
+    "NEW_UPDT_YN": "new_updt_yn",
+}
+
+
+def _conf() -> dict:
+    return getattr(settings, "RENT_WAREHOUSE", {})
+
+
+def is_enabled() -> bool:
+    return _conf().get("ENABLED", True)
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(float(str(value).replace(",", "")))
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+# 거래를 식별하는 필드. 보증금 / 임대료 등 정정될 수 있는 값은 넣지 않는다.
+KEY_FIELDS = ("rcpt_yr", "cgg_cd", "stdg_cd", "lotno_se", "mno", "sno", "flr", "ctrt_day", "rent_se", "rent_area", "bldg_nm")
+# 다시 받을 때 고치는 필드
+UPDATE_FIELDS = [field for field in FIELD_MAP.values() if field not in KEY_FIELDS] + ["ctrt_year", "ctrt_month"]
+
+
+def transaction_key(transaction: RentTransaction) -> str:
+    key = [getattr(transaction, field) for field in KEY_FIELDS]
+    return hashlib.sha1(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+# 계약일(YYYYMMDD)을 날짜로 바꾼다. 형식이 틀리거나 없는 날짜(예: 13월)면 None.
+def _contract_date(ctrt_day: str):
+    try:
+        return datetime.strptime(ctrt_day, "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+# upstream 행 하나를 모델로 바꾼다. 필수 값이 없으면 None.
+def to_transaction(row: dict) -> Optional[RentTransaction]:
+    year = _int(row.get("RCPT_YR"))
+    if year is None or not row.get("CGG_CD") or not row.get("RENT_SE"):
+        return None
+    ctrt_day = str(row.get("CTRT_DAY") or "")[:8]
+    ctrt_date = _contract_date(ctrt_day)
+    return RentTransaction(
+        rcpt_yr=year,
+        cgg_cd=str(row.get("CGG_CD"))[:5],
+        cgg_nm=str(row.get("CGG_NM") or "")[:20],
+        stdg_cd=str(row.get("STDG_CD") or "")[:5],
+        stdg_nm=str(row.get("STDG_NM") or "")[:30],
+        lotno_se=str(row.get("LOTNO_SE") or "")[:1],
+        mno=str(row.get("MNO") or "").zfill(4)[:4],
+        sno=str(row.get("SNO") or "").zfill(4)[:4],
+        flr=_int(row.get("FLR")),
+        ctrt_day=ctrt_day,
+        ctrt_year=ctrt_date.year if ctrt_date else None,
+        ctrt_month=ctrt_date.month if ctrt_date else None,
+        rent_se=str(row.get("RENT_SE"))[:10],
+        rent_area=_float(row.get("RENT_AREA")),
+        grfe=_int(row.get("GRFE")) or 0,
+        rtfe=_int(row.get("RTFE")) or 0,
+        bldg_nm=str(row.get("BLDG_NM") or "")[:100],
+        arch_yr=str(row.get("ARCH_YR") or "")[:4],
+        bldg_usg=str(row.get("BLDG_USG") or "")[:30],
+        ctrt_prd=str(row.get("CTRT_PRD") or "")[:30],
+        new_updt_yn=str(row.get("NEW_UPDT_YN") or "")[:10],
+    )
+
+
+# 모델을 upstream 행 모양으로 되돌린다. (GetPriceView 응답용)
+def to_row(transaction: RentTransaction) -> dict:
+    return {upstream: getattr(transaction, field) for upstream, field in FIELD_MAP.items()}
+
+
+# 같은 txn_key가 이미 seen번 나왔으면 다음 순번을 준다. 처음 보는 key는 base(이전 창까지 DB에 있는 수)에서 시작한다.
+def _assign_seq(transactions: List[RentTransaction], seen: dict, base) -> None:
+    for t in transactions:
+        t.txn_key = transaction_key(t)
+    missing = {t.txn_key for t in transactions} - seen.keys()
+    seen.update(base(missing) if missing else {})
+    for t in transactions:
+        t.seq = seen.get(t.txn_key, 0)
+        seen[t.txn_key] = t.seq + 1
+
+
+# year 연도의 high_water 이후 행을 받아서 적재한다. 전체 행 수가 늘어난 것은 새 행이므로 이어서 받는다.
+# full=True거나 전체 행 수가 지난번(total_count)보다 줄었으면 처음부터 다시 받고, 끝까지 받으면 upstream에 없는 행을 지운다.
+# 창(window)은 순서대로 반영하므로 중간에 실패하면 high_water는 성공한 곳까지만 올라간다.
+# 다시 받는 동안에는 상태를 바꾸지 않는다. (기존 데이터로 계속 응답하고, 실패하면 다음 실행에서 다시 받는다)
+def ingest_year(year: int, full: bool = False, page_size: int = MAX_ROWS_PER_REQUEST,
+                max_workers: Optional[int] = None, log=print) -> dict:
+    max_workers = max_workers or _conf().get("MAX_WORKERS", 4)
+    page_size = min(page_size, MAX_ROWS_PER_REQUEST)
+    client = DataSeoulClient()
+
+    total, _ = parse_price_page(client.getPriceRange(1, 1, year=year))
+    # 전체 행 수를 확인한 다음에 상태를 만든다. (0/0 상태는 데이터가 없는 연도를 뜻한다)
+    state, _ = RentIngestState.objects.get_or_create(year=year)
+    if not full and total < state.total_count:
+        log(f"{year}: 전체 행 수가 {state.total_count} → {total}건으로 줄어 처음부터 다시 받는다.")
+        full = True
+    if not full and state.total_count == 0:
+        # 처음 받는 연도는 끝까지 받기 전까지 적재된 것으로 보지 않는다. (covers)
+        RentIngestState.objects.filter(pk=state.pk).update(total_count=total)
+    start = 1 if full else state.high_water + 1
+    windows = [(s, min(s + page_size - 1, total)) for s in range(start, total + 1, page_size)]
+    log(f"{year}: {total}건 중 {start}번째부터 {len(windows)}회 요청")
+
+    def fetch(window):
+        return parse_price_page(client.getPriceRange(window[0], window[1], year=year))[1]
+
+    def stored_counts(keys) -> dict:
+        # 처음부터 받을 때는 순번도 0부터 다시 매긴다.
+        if full:
+            return {}
+        return dict(RentTransaction.objects.filter(txn_key__in=list(keys))
+                    .values_list("txn_key").annotate(count=Count("id")))
+
+    inserted = updated = received = 0
+    high_water = state.high_water if not full else 0
+    # 이번에 받은 (txn_key, seq). 끝까지 받은 full 적재에서 이 밖의 행을 지운다.
+    seen_keys = set()
+    seq_counts = {}
+    # 거래가 들어오거나 바뀐 (자치구, 계약연도). 적재 후 이 집계만 다시 계산한다.
+    touched = set()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rent-ingest") as pool:
+            for window, rows in zip(windows, pool.map(fetch, windows)):
+                received += len(rows)
+                transactions = [t for t in (to_transaction(row) for row in rows) if t is not None]
+                _assign_seq(transactions, seq_counts, stored_counts)
+                existing = set(RentTransaction.objects
+                               .filter(txn_key__in={t.txn_key for t in transactions})
+                               .values_list("txn_key", "seq"))
+                RentTransaction.objects.bulk_create(
+                    transactions, batch_size=500,
+                    update_conflicts=True, unique_fields=["txn_key", "seq"], update_fields=UPDATE_FIELDS,
+                )
+                keys = {(t.txn_key, t.seq) for t in transactions}
+                seen_keys |= keys
+                updated += len(keys & existing)
+                inserted += len(keys - existing)
+                touched.update((t.cgg_cd, t.ctrt_year) for t in transactions if t.ctrt_year is not None)
+                high_water = max(high_water, window[1])
+                # total_count는 끝까지 받은 뒤에 올린다. (그 전까지 covers는 이전 전체 행 수로 판단한다)
+                if not full:
+                    RentIngestState.objects.filter(pk=state.pk).update(high_water=high_water, updated=timezone.now())
+        deleted = _delete_missing(year, seen_keys, touched) if full else 0
+    finally:
+        client.close()
+        # 중간에 실패해도 반영된 창까지의 집계는 갱신한다.
+        aggregates = refresh_aggregates(touched)
+
+    RentIngestState.objects.filter(pk=state.pk).update(high_water=high_water, total_count=total, updated=timezone.now())
+    return {"year": year, "total": total, "received": received, "inserted": inserted, "updated": updated,
+            "deleted": deleted, "high_water": high_water, "aggregates": aggregates}
+
+
+# year 연도를 처음부터 끝까지 받은 뒤, 이번에 받지 못한 행(upstream에서 삭제 / 정정된 행)을 지운다.
+def _delete_missing(year: int, seen_keys: set, touched: set) -> int:
+    stale = [(pk, cgg_cd, ctrt_year) for pk, txn_key, seq, cgg_cd, ctrt_year in
+             RentTransaction.objects.filter(rcpt_yr=year).values_list("id", "txn_key", "seq", "cgg_cd", "ctrt_year")
+             .iterator() if (txn_key, seq) not in seen_keys]
+    touched.update((cgg_cd, ctrt_year) for _, cgg_cd, ctrt_year in stale if ctrt_year is not None)
+    for i in range(0, len(stale), 500):
+        RentTransaction.objects.filter(id__in=[pk for pk, _, _ in stale[i:i + 500]]).delete()
+    return len(stale)
+
+
+# years 연도가 모두 끝까지 적재되어 있고 MAX_AGE 안에 확인되었으면 True.
+# 새 행을 받는 중에는 high_water가 이전 total_count보다 클 수 있다.
+def covers(years: Iterable[int]) -> bool:
+    if not is_enabled():
+        return False
+    years = set(years)
+    cutoff = timezone.now() - timedelta(seconds=_conf().get("MAX_AGE", 2 * 24 * 60 * 60))
+    fresh = (RentIngestState.objects
+             .filter(year__in=years, updated__gte=cutoff, high_water__gte=F("total_count"))
+             .count())
+    return fresh == len(years)
+
+
+# AddressManager(initialize 완료)의 필지에 해당하는 거래.
+def lot_transactions(address_manager: AddressManager):
+    return RentTransaction.objects.filter(
+        cgg_cd=address_manager.cggCd,
+        stdg_cd=address_manager.stdgCd,
+        lotno_se=address_manager.mtYn,
+        mno=address_manager.lnbrMnnm,
+        sno=address_manager.lnbrSlno,
+    )
+
+
+# 로컬 DB에서 get_avg_price와 같은 값(평균, 중앙값, stats)을 계산한다. 적재되지 않은 연도가 있으면 None.
+def local_avg_price(years: List[int], address_manager: AddressManager) -> Optional[dict]:
+    if not covers(years):
+        return None
+
+    rows = list(lot_transactions(address_manager)
+                .filter(rcpt_yr__in=years)
+                .values_list("rent_se", "grfe", "rtfe", "rent_area"))
+    samples = RentSamples()
+    if rows:
+        kinds = np.array([row[0] for row in rows])
+        values = np.array([row[1:] for row in rows], dtype=float)
+        samples.add_arrays(kinds, values)
+
+    ingested_at = RentIngestState.objects.filter(year__in=years).aggregate(oldest=Min("updated"))["oldest"]
+    result = samples.result()
+    result["coverage"] = {
+        "source": "local",
+        "years": years,
+        "rows": len(rows),
+        "ingested_at": ingested_at.isoformat() if ingested_at else None,
+        "complete": True,
+    }
+    return result
+
+
+# GetPriceView 응답을 로컬 DB로 만든다. upstream 응답과 같은 모양. 적재되지 않은 연도면 None.
+def local_price_page(size: int, year: int, address_manager: AddressManager) -> Optional[dict]:
+    if not covers([year]):
+        return None
+    qs = lot_transactions(address_manager).filter(rcpt_yr=year)
+    total = qs.count()
+    if total == 0:
+        return {"RESULT": {"CODE": "INFO-200", "MESSAGE": "해당하는 데이터가 없습니다."}}
+    rows = [to_row(t) for t in qs.order_by("-ctrt_day", "id")[:size]]
+    return {
+        "tbLnOpendataRentV": {
+            "list_total_count": total,
+            "RESULT": {"CODE": "INFO-000", "MESSAGE": "정상 처리되었습니다"},
+            "row": rows,
+        }
+    }
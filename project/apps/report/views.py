@@ -1,4 +1,4 @@
-from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from django.db import transaction
 from django.db.models import OuterRef, Subquery
 
@@ -19,21 +19,23 @@ from .serializers import (StartReportSerializer, SaveUserPriceDocSerializer, Mak
                            ReportDataSerializer, ReportSerializer, ReportSummarySerializer)
 
 from external.address.building_info import BuildingInfoManager
-from external.address.price import get_avg_price
+from external.address.price import get_avg_price, get_user_price_position
+from apps.rent.aggregates import neighborhood_comparison
+from external.address.air_quality import get_yearly_air_quality, get_air_quality_trend
+from external.address.flood import get_flood_history
 from external.address.address_manager import AddressManager
-from external.address.property_registry import get_property_registry
-from external.client.data_go_kr import DataGoKrClient
+from external.address.property_registry import save_property_registry
 
 from apps.address.serializers import (PropertyRegistrySerializer, AirConditionSerializer,
                                       UserPriceSerializer, BuildingInfoSerializer, AvgPriceSerializer
                                       , FloodSerializer)
 from apps.address.models import (Address, UserPrice, BuildingInfo, AvgPrice, PropertyRegistry,
-                                 AirCondition, PropertyBundle, Flood)
+                                 AirCondition, PropertyBundle, Flood, find_recent_fact)
 
-from external.client.seoul_data import DataSeoulClient
 from external.gpt.gpt_manager import *
 
 import json
+from datetime import datetime
 
 # Create your views here.
 
@@ -63,33 +65,24 @@ class StartReportView(APIView):
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        # 새 property bundle 생성.
-        property_bundle = PropertyBundle.objects.create(user=user)
-
-        # 새 report 객체 생성.
-        report = Report.objects.create(property_bundle=property_bundle)
-
-        # 주소 검색 및 Address 객체 만들기.
+        # 주소 검색. 유효하지 않은 주소면 bundle / report를 만들지 않는다.
         address_manager = AddressManager(roadAddr=vd["road_address"])
         address_manager.initialize(research=True)
         if not address_manager.is_valid():
             return Response({"error": "유효하지 않은 주소입니다."}, status=status.HTTP_400_BAD_REQUEST)
         address_manager.details = vd.get("details", "")
 
-        # 모델 필드명에 맞춰 저장 (road_addr)
-        address = Address.objects.create(
-            road_address=address_manager.roadAddr,
-            bd_nm=address_manager.bdNm,
-            adm_cd=address_manager.admCd,
-            sgg_nm=address_manager.sggNm,
-            mt_yn=address_manager.mtYn,
-            lnbr_mnnm=address_manager.lnbrMnnm,
-            lnbr_slno=address_manager.lnbrSlno,
-            details=address_manager.details,
-        )
-        # address를 property_bundle과 연결.
-        property_bundle.address = address
-        property_bundle.save(update_fields=["address"])
+        # 같은 지번의 Address가 이미 있으면 재사용한다.
+        address = Address.get_or_create_from_manager(address_manager)
+
+        # 새 property bundle, report 생성.
+        with transaction.atomic():
+            property_bundle = PropertyBundle.objects.create(
+                user=user,
+                address=address,
+                details=address_manager.details,
+            )
+            report = Report.objects.create(property_bundle=property_bundle)
 
         # 응답은 원시 타입/딕셔너리만
         return Response(
@@ -149,23 +142,29 @@ class MakeBuildingInfoView(APIView):
         property_bundle = report.property_bundle
 
         # 주소 가져오기.
-        address_manager:AddressManager = property_bundle.address.to_address_manager()
+        address_manager:AddressManager = property_bundle.to_address_manager()
         address_manager.initialize(research=False)
         if not address_manager.is_valid():
             return Response({"error": "유효하지 않은 주소입니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 건축물대장부
+        # 건축물대장부. 필지별 저장소(BuildingFacts)가 캐시와 갱신을 맡는다. (external.address.building_facts)
         try:
             info = BuildingInfoManager().makeInfo(address_manager)
         except Exception as e:
             return Response({"error": "building_info get falied"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        serializer = BuildingInfoSerializer(data={"description": info})
-        serializer.is_valid(raise_exception=True)
-        building_info = serializer.save()
+        # 같은 주소의 최근 BuildingInfo와 내용이 같으면 그 행을 공유한다.
+        building_info = (BuildingInfo.objects
+                         .filter(bundles__address=property_bundle.address)
+                         .order_by("-created")
+                         .first())
+        if building_info is None or building_info.description != info:
+            serializer = BuildingInfoSerializer(data={"description": info})
+            serializer.is_valid(raise_exception=True)
+            building_info = serializer.save()
         property_bundle.building_info = building_info
         property_bundle.save(update_fields=["building_info"])
         
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(BuildingInfoSerializer(building_info).data, status=status.HTTP_201_CREATED)
 
 # 전월세가 평균 계산하기.
 class MakeAvgPriceView(APIView):
@@ -191,28 +190,37 @@ class MakeAvgPriceView(APIView):
         property_bundle = report.property_bundle
 
         # 주소 가져오기.
-        address_manager:AddressManager = property_bundle.address.to_address_manager()
+        address_manager:AddressManager = property_bundle.to_address_manager()
         address_manager.initialize(research=False)
         if not address_manager.is_valid():
             return Response({"error": "유효하지 않은 주소입니다."}, status=status.HTTP_400_BAD_REQUEST)
         
-        # 전월세가분석
-        try:
-            price_info = get_avg_price(
-                startYear=vd.get("start_year", 2024),
-                address_manager=address_manager
-            )
-        except Exception as e:
-            return Response({"error": "avg_price get error."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        serializer = AvgPriceSerializer(data=price_info)
-        serializer.is_valid(raise_exception=True)
-        avg_price = serializer.save()
+        start_year = vd.get("start_year") or 2024
+        # 같은 주소 / 시작 연도로 최근에 계산한 평균이 있으면 재사용한다.
+        # 일부 페이지를 받지 못한 평균은 재사용하지 않고 다시 계산한다.
+        avg_price = find_recent_fact(AvgPrice, "avg_price", bundles__address=property_bundle.address,
+                                     start_year=start_year, coverage__complete=True)
+        if avg_price is None:
+            # 전월세가분석
+            try:
+                price_info = get_avg_price(
+                    startYear=start_year,
+                    address_manager=address_manager
+                )
+            except Exception as e:
+                return Response({"error": "avg_price get error."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            
+            serializer = AvgPriceSerializer(data=price_info)
+            serializer.is_valid(raise_exception=True)
+            avg_price = serializer.save(start_year=start_year)
 
         property_bundle.avg_price = avg_price
         property_bundle.save(update_fields=["avg_price"])
-    
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        data = AvgPriceSerializer(avg_price).data
+        # AvgPrice는 여러 bundle이 공유하므로 사용자 가격의 위치는 저장하지 않고 매번 계산한다.
+        data["user_position"] = get_user_price_position(property_bundle.user_price, avg_price)
+        return Response(data, status=status.HTTP_201_CREATED)
 
 # 등기부등본 조회뷰.
 class MakePropertyRegistryView(APIView):
@@ -234,21 +242,27 @@ class MakePropertyRegistryView(APIView):
         property_bundle = report.property_bundle
 
         # 주소 가져오기.
-        address_manager:AddressManager = property_bundle.address.to_address_manager()
+        address_manager:AddressManager = property_bundle.to_address_manager()
         address_manager.initialize(research=False)
         if not address_manager.is_valid():
             return Response({"error": "유효하지 않은 주소입니다."}, status=status.HTTP_400_BAD_REQUEST)
         
-        # 등기부등본 조회하기.
+        # 등기부등본 조회하기. 임시 파일에 chunk 단위로 받은 뒤 storage로 옮긴다.
         full_addr = address_manager.getFullAddr()
-        try:
-            pdf_bytes = get_property_registry(full_addr=full_addr)
-        except Exception as e:
-            return Response({"error": "property_registry get failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         filename = "등기부등본.pdf"
-        
-        property_registry = PropertyRegistry()
-        property_registry.pdf.save(filename, ContentFile(pdf_bytes), save=True)
+        tmp = TemporaryUploadedFile(filename, "application/pdf", 0, None)
+        try:
+            try:
+                tmp.size = save_property_registry(full_addr=full_addr, dest=tmp)
+            except Exception as e:
+                return Response({"error": "property_registry get failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            tmp.seek(0)
+
+            # FileSystemStorage는 임시 파일을 복사하지 않고 MEDIA_ROOT로 이동한다.
+            property_registry = PropertyRegistry()
+            property_registry.pdf.save(filename, tmp, save=True)
+        finally:
+            tmp.close()
         
         property_bundle.property_registry = property_registry
         property_bundle.save(update_fields=["property_registry"])
@@ -276,25 +290,33 @@ class MakeAirConditionView(APIView):
         property_bundle = report.property_bundle
 
         # 주소 가져오기.
-        address_manager:AddressManager = property_bundle.address.to_address_manager()
+        address_manager:AddressManager = property_bundle.to_address_manager()
         address_manager.initialize(research=False)
         if not address_manager.is_valid():
             return Response({"error": "유효하지 않은 주소입니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            client = DataSeoulClient()
-            response = client.get_yearly_by_gu(2024, address_manager.sggNm)
-        except Exception as e:
-            return Response({"error": "air condition get failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        # db에 임시 저장하기.
-        serializer = AirConditionSerializer(data={"data": response})
-        serializer.is_valid(raise_exception=True)
-        air_condition = serializer.save()
+        # 공기질은 자치구 단위이므로 같은 자치구의 최근 데이터를 재사용한다.
+        air_condition = find_recent_fact(AirCondition, "air_condition",
+                                         bundles__address__sgg_nm=address_manager.sggNm)
+        if air_condition is None:
+            # 미리 받아 둔 자치구별 연평균 표에서 가장 최근 연도를 찾는다.
+            try:
+                response = get_yearly_air_quality(address_manager.sggNm, load_missing=True)
+            except Exception as e:
+                return Response({"error": "air condition get failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            if response is None:
+                return Response({"error": "air condition not found"}, status=status.HTTP_404_NOT_FOUND)
+            # 여러 해의 추세(연간 기울기, 서울 자치구 중 백분위)를 함께 저장한다.
+            response = {**response, "trend": get_air_quality_trend(address_manager.sggNm)}
+
+            # db에 임시 저장하기.
+            serializer = AirConditionSerializer(data={"data": response})
+            serializer.is_valid(raise_exception=True)
+            air_condition = serializer.save()
 
         property_bundle.air_condition = air_condition
         property_bundle.save(update_fields=["air_condition"])
-        return Response(serializer.data)
+        return Response(AirConditionSerializer(air_condition).data)
     
 # 침수 데이터 저장.
 class MakeFloodView(APIView):
@@ -314,27 +336,28 @@ class MakeFloodView(APIView):
         property_bundle = report.property_bundle
 
         # 주소 가져오기.
-        address_manager:AddressManager = property_bundle.address.to_address_manager()
+        address_manager:AddressManager = property_bundle.to_address_manager()
         address_manager.initialize(research=False)
         if not address_manager.is_valid():
             return Response({"error": "유효하지 않은 주소입니다."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            client = DataGoKrClient()
-            data = client.getFloodByAddress(address=address_manager)
-        except Exception as e:
-            return Response({"error": "flood get failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        print(address_manager.roadAddr)
+        # 같은 주소로 최근에 받은 침수 데이터가 있으면 재사용한다.
+        flood = find_recent_fact(Flood, "flood", bundles__address=property_bundle.address)
+        if flood is None:
+            # 미리 받아 둔 자치구별 침수 이력 색인에서 찾는다. (external.address.flood)
+            try:
+                data = get_flood_history(address_manager, load_missing=True)
+            except Exception as e:
+                return Response({"error": "flood get failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # db에 임시 저장하기.
-        serializer = FloodSerializer(data={"data": data})
-        serializer.is_valid(raise_exception=True)
-        flood = serializer.save()
+            # db에 임시 저장하기.
+            serializer = FloodSerializer(data={"data": data})
+            serializer.is_valid(raise_exception=True)
+            flood = serializer.save()
 
         property_bundle.flood = flood
         property_bundle.save(update_fields=["flood"])
-        return Response(serializer.data)
+        return Response(FloodSerializer(flood).data)
 
 # 마지막 레포트 뷰. gpt에게 맡기는 역할만 수행.
 class MakeReportFinalView(APIView):
@@ -356,7 +379,7 @@ class MakeReportFinalView(APIView):
 
         ##### 위험도측정 #####
         # 주소 만들기
-        address_manager:AddressManager = property_bundle.address.to_address_manager()
+        address_manager:AddressManager = property_bundle.to_address_manager()
         address_manager.initialize(research=False)
         if not address_manager.is_valid():
             return Response({"error": "유효하지 않은 주소입니다."}, status=status.HTTP_400_BAD_REQUEST)
@@ -370,6 +393,12 @@ class MakeReportFinalView(APIView):
         # user의 전월세가
         user_price:UserPrice = property_bundle.user_price
         user_price_info = UserPriceSerializer(user_price).data
+        # 주변 전월세 분포에서 user 가격의 위치 (percentile)
+        price_info["user_position"] = get_user_price_position(user_price, avg_price)
+        # 같은 법정동 / 자치구 시세. (미리 계산한 집계)
+        start_year = getattr(avg_price, "start_year", None) or datetime.now().year
+        price_info["neighborhood"] = neighborhood_comparison(
+            address_manager, list(range(start_year, datetime.now().year + 1)))
 
         # 파일을 제외한 dict
         infos = {
@@ -566,7 +595,7 @@ class ReportListByUserView(generics.ListAPIView):
         user_id = self.kwargs["user_id"]
 
         address_sq = (Address.objects
-                      .filter(bundle=OuterRef("property_bundle"))
+                      .filter(bundles=OuterRef("property_bundle"))
                       .order_by("-id")
                     )
 
@@ -0,0 +1,147 @@
+from __future__ import annotations
+from typing import Optional
+from datetime import timedelta
+import logging, re, threading, time, unicodedata
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from external.client.cache import CacheEntry, LocMemTier
+
+
+"""
+도로명 주소 검색 결과 캐시.
+  - 1차: 프로세스 내부 LRU
+  - 2차: DB(ResolvedAddress). worker / 재시작 사이에서 공유된다.
+검색 결과가 없는 주소도 NEGATIVE_TTL 동안 저장해서 같은 주소로 juso API를 반복 호출하지 않는다.
+값은 juso API 응답 그대로의 필드(bdNm, admCd, sggNm, mtYn, lnbrMnnm, lnbrSlno)이거나 {"error": ...} 이다.
+"""
+
+logger = logging.getLogger(__name__)
+
+FIELDS = {
+    "bdNm": "bd_nm",
+    "admCd": "adm_cd",
+    "sggNm": "sgg_nm",
+    "mtYn": "mt_yn",
+    "lnbrMnnm": "lnbr_mnnm",
+    "lnbrSlno": "lnbr_slno",
+}
+
+_local: Optional[LocMemTier] = None
+_local_lock = threading.Lock()
+
+
+def _conf() -> dict:
+    return getattr(settings, "ADDRESS_CACHE", {})
+
+
+def is_enabled() -> bool:
+    return _conf().get("ENABLED", True)
+
+
+def _get_local() -> LocMemTier:
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = LocMemTier(max_entries=_conf().get("LOCAL_MAX_ENTRIES", 4096))
+    return _local
+
+
+# 공백, 유니코드 정규화 차이로 같은 주소가 다른 key가 되지 않도록 한다.
+def normalize_road_address(road_addr: str) -> str:
+    normalized = unicodedata.normalize("NFC", road_addr or "")
+    return re.sub(r"\s+", " ", normalized).strip()[:255]
+
+
+def _remember(key: str, value: dict, expires_at: float):
+    _get_local().set(key, CacheEntry(value, expires_at, expires_at), 1)
+
+
+def _to_value(row) -> dict:
+    if not row.is_valid:
+        return {"error": row.error}
+    return {field: getattr(row, column) for field, column in FIELDS.items()}
+
+
+# 캐시된 검색 결과를 반환한다. 없거나 만료되었으면 None.
+# allow_expired=True이면 만료된 정상 결과도 돌려준다. (juso API 장애 시 대체용)
+def lookup(road_addr: str, allow_expired: bool = False) -> Optional[dict]:
+    if not is_enabled():
+        return None
+    key = normalize_road_address(road_addr)
+    if not key:
+        return None
+
+    entry = _get_local().get(key)
+    if entry is not None and entry.is_fresh(time.time()):
+        return entry.value
+
+    from apps.address.models import ResolvedAddress
+    try:
+        row = ResolvedAddress.objects.filter(normalized_address=key).first()
+    except Exception:
+        logger.warning("address cache read error", exc_info=True)
+        return None
+    if row is None:
+        return None
+
+    if row.expires_at > timezone.now():
+        value = _to_value(row)
+        _remember(key, value, row.expires_at.timestamp())
+        return value
+    if allow_expired and row.is_valid:
+        return _to_value(row)
+    return None
+
+
+# replace_valid=False이면 이미 저장된 정상 결과(만료 포함)는 덮어쓰지 않는다. (allow_expired 대체용으로 남긴다)
+# 이때 실패는 로컬 LRU에만 기억한다.
+def _save(road_addr: str, defaults: dict, ttl: int, replace_valid: bool = True):
+    key = normalize_road_address(road_addr)
+    if not is_enabled() or not key:
+        return
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+
+    from apps.address.models import ResolvedAddress
+    fields = {**defaults, "road_address": road_addr[:255], "expires_at": expires_at}
+    value = _to_value(ResolvedAddress(normalized_address=key, **fields))
+    # update_or_create는 transaction 안에서 select 후 write 하므로 SQLite에서 동시 저장 시 바로 lock 오류가 난다.
+    # 단일 UPDATE / INSERT 문으로 나눠서 busy timeout 동안 기다리도록 한다.
+    try:
+        rows = ResolvedAddress.objects.filter(normalized_address=key)
+        target = rows if replace_valid else rows.filter(is_valid=False)
+        if not target.update(**fields, resolved_at=timezone.now()):
+            if not replace_valid and rows.exists():
+                _remember(key, value, expires_at.timestamp())
+                return
+            try:
+                ResolvedAddress.objects.create(normalized_address=key, **fields)
+            except IntegrityError:
+                target.update(**fields, resolved_at=timezone.now())
+    except Exception:
+        logger.warning("address cache write error", exc_info=True)
+        return
+    _remember(key, value, expires_at.timestamp())
+
+
+# 정상 검색 결과를 저장한다. juso 항목(dict)을 그대로 받는다.
+def store(road_addr: str, juso: dict):
+    defaults = {column: str(juso.get(field) or "")[:255] for field, column in FIELDS.items()}
+    defaults["mt_yn"] = defaults["mt_yn"] or "0"
+    _save(road_addr, {**defaults, "is_valid": True, "error": ""}, _conf().get("TTL", 30 * 24 * 60 * 60))
+
+
+# 검색 결과가 없는 주소를 저장한다.
+def store_failure(road_addr: str, error: str):
+    _save(road_addr, {"is_valid": False, "error": error[:255]}, _conf().get("NEGATIVE_TTL", 60 * 60), replace_valid=False)
+
+
+def invalidate(road_addr: str):
+    key = normalize_road_address(road_addr)
+    _get_local().delete(key)
+
+    from apps.address.models import ResolvedAddress
+    ResolvedAddress.objects.filter(normalized_address=key).delete()
@@ -1,4 +1,9 @@
 from external.client.business_juso import BusinessJusoClient
+from external.client.errors import HTTPError
+from external.address import address_cache
+
+# juso API 오류 중 주소와 무관한 것. (시스템 에러, 승인되지 않은 / 만료된 key) 이 경우는 실패를 캐시하지 않는다.
+TRANSIENT_JUSO_ERRORS = {"-999", "E0001", "E0014"}
 
 # 주소체계 관리 Class
 class AddressManager:
@@ -14,6 +19,8 @@ class AddressManager:
         details:str = ""
         ):
         self.valid = True
+        # initialize 실패 사유.
+        self.error = ""
         self.roadAddr = roadAddr or ""
         # 빌딩 이름. 없는 경우도 있다.
         self.bdNm = bdNm
@@ -35,30 +42,54 @@ class AddressManager:
         self.details = details
         
 
+    # juso API로 도로명 주소를 검색한다. 결과(실패 포함)는 address_cache에 저장한다.
+    def _search(self):
+        client = BusinessJusoClient()
+        response = client.search_address(self.roadAddr)
+        client.close()
+
+        common = response.get("results", {}).get("common", {})
+        if common.get("errorMessage") != "정상":
+            if common.get("errorCode") not in TRANSIENT_JUSO_ERRORS:
+                address_cache.store_failure(self.roadAddr, common.get("errorMessage") or "No results found for the address.")
+            raise ValueError("No results found for the address.")
+
+        juso = response.get("results", {}).get("juso", [])
+        if not juso:
+            address_cache.store_failure(self.roadAddr, "No address information found in the response.")
+            raise ValueError("No address information found in the response.")
+
+        address_cache.store(self.roadAddr, juso[0])
+        return juso[0]
+
+    # 캐시에 없거나 만료된 경우에만 juso API를 호출한다.
+    def _resolve(self):
+        juso = address_cache.lookup(self.roadAddr)
+        if juso is None:
+            try:
+                juso = self._search()
+            except HTTPError:
+                # juso API 장애 시 만료된 검색 결과라도 사용한다.
+                juso = address_cache.lookup(self.roadAddr, allow_expired=True)
+                if juso is None:
+                    raise
+        if juso.get("error"):
+            raise ValueError(juso["error"])
+        return juso
+
     # 도로명 주소로 검색해서 추가 정보를 알아내 저장한다.
     def initialize(self, research=True):
         try:
             if research:
                 # 도로명 주소로 재검색.
-                client = BusinessJusoClient()
-                response = client.search_address(self.roadAddr)
-
-                common = response.get("results", {}).get("common", {})
-                if common.get("errorMessage") != "정상":
-                    raise ValueError("No results found for the address.")
-                
-                juso = response.get("results", {}).get("juso", [])
-                if not juso:
-                    raise ValueError("No address information found in the response.")
-                
-                self.bdNm = juso[0].get("bdNm", "")
-                self.admCd = juso[0].get("admCd", "")
-                self.sggNm = juso[0].get("sggNm", "")
-                self.mtYn = juso[0].get("mtYn", "0")
-                self.lnbrMnnm = juso[0].get("lnbrMnnm", "")
-                self.lnbrSlno = juso[0].get("lnbrSlno", "")
+                juso = self._resolve()
 
-                client.close()
+                self.bdNm = juso.get("bdNm", "")
+                self.admCd = juso.get("admCd", "")
+                self.sggNm = juso.get("sggNm", "")
+                self.mtYn = juso.get("mtYn", "0")
+                self.lnbrMnnm = juso.get("lnbrMnnm", "")
+                self.lnbrSlno = juso.get("lnbrSlno", "")
 
             # 주소 추가 정보 분리 진행.
             # 행정구역 코드. 앞 5자리는 자치구, 뒤 5자리는 법정동 코드.
@@ -81,6 +112,7 @@ class AddressManager:
         except Exception as e:
             print(f"Address initialization error: {e}")
             self.valid = False
+            self.error = str(e)
         
     def is_valid(self):
         return self.valid
@@ -0,0 +1,260 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from external.address.table_loader import TableLoader
+from external.client.seoul_data import DataSeoulClient, service_rows
+
+
+"""
+서울시 자치구별 연평균 대기질(YearlyAverageAirQuality).
+  - load_years: 연도마다 한 번의 요청(1~25행)으로 25개 자치구를 모두 받아서 DB(AirQualityYearly)에 저장한다.
+  - 조회는 메모리의 (연도, 자치구) 표에서 한다. 네트워크 요청이 없다.
+  - 표는 CHECK_INTERVAL마다 DB 변경을 확인해서 다시 읽고, 마지막 수집이 REFRESH_AFTER보다 오래되면 뒤에서 upstream을 다시 받는다.
+  - 연도를 주지 않으면 해당 자치구 데이터가 있는 가장 최근 연도를 쓴다.
+  - 여러 연도(backfill)는 thread pool에서 동시에 받고, 저장은 호출한 thread에서 한다.
+  - 추세(연간 기울기, 서울 자치구 중 백분위)는 표를 만들 때 (자치구, 연도, 항목) 배열 한 번으로 계산한다.
+"""
+
+SERVICE = "YearlyAverageAirQuality"
+# 서울시 자치구 수. 한 번의 요청으로 모두 받는다.
+GU_COUNT = 25
+# 추세를 계산할 항목. (㎍/㎥, ppm)
+POLLUTANTS = ("PM10", "PM25", "NO2", "O3", "CO", "SO2")
+
+
+def _conf() -> dict:
+    return getattr(settings, "AIR_QUALITY", {})
+
+
+# 기본 수집 연도. 올해부터 YEARS_BACK년 전까지. (올해 데이터는 아직 없을 수 있다)
+def default_years() -> List[int]:
+    current_year = datetime.now().year
+    return list(range(current_year - _conf().get("YEARS_BACK", 3), current_year + 1))
+
+
+# year 연도의 전체 자치구 행을 받는다. (저장하지 않는다)
+def fetch_year(year: int, client: DataSeoulClient) -> List[dict]:
+    return service_rows(client.get_yearly_average_air_quality(year=year, start_index=1, end_index=GU_COUNT), SERVICE)
+
+
+def store_year(year: int, rows: List[dict]) -> int:
+    from apps.address.models import AirQualityYearly
+
+    records = [AirQualityYearly(year=year, gu_name=row["MSRSTE_NM"], data=row) for row in rows if row.get("MSRSTE_NM")]
+    AirQualityYearly.objects.bulk_create(
+        records,
+        update_conflicts=True,
+        unique_fields=["year", "gu_name"],
+        update_fields=["data", "fetched_at"],
+    )
+    return len(records)
+
+
+# year 연도의 전체 자치구 행을 받아서 저장한다. 저장한 행 수를 반환한다.
+def load_year(year: int, client: Optional[DataSeoulClient] = None) -> int:
+    own_client = client is None
+    client = client or DataSeoulClient()
+    try:
+        rows = fetch_year(year, client)
+    finally:
+        if own_client:
+            client.close()
+    return store_year(year, rows)
+
+
+# 여러 연도를 동시에 받는다. 연도별 저장 행 수를 반환한다. 실패한 연도는 건너뛰고 오류는 errors에 남긴다.
+# fetched를 주면 받은 행을 {연도: 행 목록}으로 남긴다.
+def load_years(years: Optional[Iterable[int]] = None, errors: Optional[dict] = None,
+               max_workers: Optional[int] = None, fetched: Optional[dict] = None) -> Dict[int, int]:
+    years = list(years or default_years())
+    loaded = {}
+    client = DataSeoulClient()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers or _conf().get("MAX_WORKERS", 4),
+                                thread_name_prefix="air-quality-load") as pool:
+            futures = {pool.submit(fetch_year, year, client): year for year in years}
+            for future in as_completed(futures):
+                year = futures[future]
+                try:
+                    # 저장은 이 thread에서 한다. (worker thread마다 DB 연결을 열지 않는다)
+                    rows = future.result()
+                    loaded[year] = store_year(year, rows)
+                    if fetched is not None:
+                        fetched[year] = rows
+                except Exception as e:
+                    if errors is not None:
+                        errors[year] = type(e).__name__
+                    print(f"air quality load error ({year}): {type(e).__name__}")
+    finally:
+        client.close()
+    return loaded
+
+
+# backfill 연도. since(기본값 BACKFILL_SINCE)부터 올해까지.
+def backfill_years(since: Optional[int] = None) -> List[int]:
+    since = since or _conf().get("BACKFILL_SINCE", 2010)
+    return list(range(since, datetime.now().year + 1))
+
+
+def _float(value) -> float:
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# 자치구별 항목 추세. values는 (자치구, 연도, 항목) 배열이고 없는 값은 nan이다.
+# 기울기는 자치구마다 값이 있는 연도만으로 구한 최소제곱 직선의 연간 변화량이다. (2개 연도 이상)
+# 백분위는 기준 연도 값 / 기울기를 서울 자치구끼리 비교한 것으로, 높을수록 값이 크다(나쁘다).
+def compute_trends(gu_names: List[str], years: List[int], values: np.ndarray, reference_year: int) -> Dict[str, dict]:
+    x = np.asarray(years, dtype=float)[None, :, None]
+    mask = ~np.isnan(values)
+    n = mask.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = (x * mask).sum(axis=1) / n
+        y_mean = np.nansum(values, axis=1) / n
+        dx = np.where(mask, x - x_mean[:, None, :], 0.0)
+        dy = np.where(mask, values - y_mean[:, None, :], 0.0)
+        slope = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+    slope[n < 2] = np.nan
+    latest = values[:, years.index(reference_year), :]
+
+    def percentiles(column: np.ndarray) -> np.ndarray:
+        valid = ~np.isnan(column)
+        count = valid.sum()
+        if count < 2:
+            return np.full(column.shape, np.nan)
+        less = (column[:, None] > column[None, valid]).sum(axis=1)
+        equal = (column[:, None] == column[None, valid]).sum(axis=1)
+        return np.where(valid, (less + (equal - 1) / 2) / (count - 1) * 100, np.nan)
+
+    level_pct = np.stack([percentiles(latest[:, i]) for i in range(len(POLLUTANTS))], axis=1)
+    slope_pct = np.stack([percentiles(slope[:, i]) for i in range(len(POLLUTANTS))], axis=1)
+
+    def number(value):
+        return None if np.isnan(value) else round(float(value), 4)
+
+    trends = {}
+    for g, gu_name in enumerate(gu_names):
+        gu_years = [years[i] for i in np.flatnonzero(mask[g].any(axis=1))]
+        trends[gu_name] = {
+            "reference_year": reference_year,
+            "years": [gu_years[0], gu_years[-1]] if gu_years else None,
+            "pollutants": {
+                pollutant: {
+                    "latest": number(latest[g, i]),
+                    "slope_per_year": number(slope[g, i]),
+                    "years": int(n[g, i]),
+                    "percentile": number(level_pct[g, i]),
+                    "slope_percentile": number(slope_pct[g, i]),
+                }
+                for i, pollutant in enumerate(POLLUTANTS) if n[g, i]
+            },
+        }
+    return trends
+
+
+# (연도, 자치구) → 행. 만든 뒤에는 바꾸지 않는다.
+class AirQualityTable:
+    def __init__(self, rows: Iterable[Tuple[int, str, dict]], fetched_at=None):
+        self.rows: Dict[Tuple[int, str], dict] = {}
+        # 자치구별 데이터가 있는 연도 (내림차순)
+        self.years_by_gu: Dict[str, List[int]] = {}
+        for year, gu_name, data in rows:
+            self.rows[(year, gu_name)] = data
+            self.years_by_gu.setdefault(gu_name, []).append(year)
+        for years in self.years_by_gu.values():
+            years.sort(reverse=True)
+        self.fetched_at = fetched_at
+        self._trends: Optional[Dict[str, dict]] = None
+
+    @classmethod
+    def from_db(cls) -> "AirQualityTable":
+        from apps.address.models import AirQualityYearly
+        qs = AirQualityYearly.objects.all()
+        fetched_at = qs.aggregate(latest=Max("fetched_at"))["latest"]
+        return cls(qs.values_list("year", "gu_name", "data"), fetched_at)
+
+    # 표에 없는 (연도, 자치구) 행만 더한 새 표. 이미 있는 행은 그대로 쓴다.
+    def with_rows(self, fetched: Dict[int, List[dict]]) -> "AirQualityTable":
+        rows = [(year, gu_name, data) for (year, gu_name), data in self.rows.items()]
+        rows += [(year, row["MSRSTE_NM"], row) for year, year_rows in fetched.items() for row in year_rows
+                 if row.get("MSRSTE_NM") and (year, row["MSRSTE_NM"]) not in self.rows]
+        return AirQualityTable(rows, self.fetched_at)
+
+    @property
+    def latest_year(self) -> Optional[int]:
+        return max((year for year, _ in self.rows), default=None)
+
+    def years(self) -> List[int]:
+        return sorted({year for year, _ in self.rows})
+
+    # year가 없으면 gu_name의 가장 최근 연도.
+    def get(self, gu_name: str, year: Optional[int] = None) -> Optional[dict]:
+        if year is None:
+            years = self.years_by_gu.get(gu_name)
+            if not years:
+                return None
+            year = years[0]
+        return self.rows.get((year, gu_name))
+
+    def by_year(self, year: int) -> Dict[str, dict]:
+        return {gu_name: data for (row_year, gu_name), data in self.rows.items() if row_year == year}
+
+    # 전체 자치구의 추세. 처음 조회할 때 한 번 계산한다. (표가 바뀌지 않으므로 동시에 계산해도 결과가 같다)
+    def trends(self) -> Dict[str, dict]:
+        if self._trends is None:
+            gu_names = sorted(self.years_by_gu)
+            years = self.years()
+            values = np.full((len(gu_names), len(years), len(POLLUTANTS)), np.nan)
+            year_index = {year: i for i, year in enumerate(years)}
+            gu_index = {gu_name: i for i, gu_name in enumerate(gu_names)}
+            for (year, gu_name), data in self.rows.items():
+                values[gu_index[gu_name], year_index[year]] = [_float(data.get(pollutant)) for pollutant in POLLUTANTS]
+            self._trends = compute_trends(gu_names, years, values, self.latest_year) if years else {}
+        return self._trends
+
+    def trend(self, gu_name: str) -> Optional[dict]:
+        return self.trends().get(gu_name)
+
+
+# DB 변경 확인용. (행 수, 마지막 수집 시각)
+def _db_version():
+    from apps.address.models import AirQualityYearly
+    return tuple(AirQualityYearly.objects.aggregate(count=Count("id"), latest=Max("fetched_at")).values())
+
+
+# upstream에서 다시 받아서 DB에 저장한다. 다음 확인 때 표에 반영된다.
+def _refresh_upstream() -> bool:
+    return sum(load_years().values()) > 0
+
+
+_loader = TableLoader("air quality", _conf, version=_db_version, build=AirQualityTable.from_db,
+                      empty=lambda: AirQualityTable([]), refresh=_refresh_upstream)
+
+
+def get_air_quality_table() -> AirQualityTable:
+    return _loader.get()
+
+
+# 자치구의 연평균 대기질 행. year가 없으면 가장 최근 연도. 없으면 None. (네트워크 요청 없음)
+# load_missing=True이면 표에 없을 때 upstream에서 한 번 받아서 다시 찾는다. (처음 배포 직후 등)
+def get_yearly_air_quality(gu_name: str, year: Optional[int] = None, load_missing: bool = False) -> Optional[dict]:
+    row = get_air_quality_table().get(gu_name, year)
+    if row is not None or not load_missing:
+        return row
+    fetched = {}
+    load_years([year] if year else None, fetched=fetched)
+    _loader.update(lambda table: table.with_rows(fetched))
+    return get_air_quality_table().get(gu_name, year)
+
+
+# 자치구의 연평균 대기질 추세. 표에 없으면 None. (네트워크 요청 없음)
+def get_air_quality_trend(gu_name: str) -> Optional[dict]:
+    return get_air_quality_table().trend(gu_name)
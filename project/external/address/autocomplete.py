@@ -0,0 +1,242 @@
+"""
+주소 자동완성. 로컬 주소 색인(juso_index) 파일의 suggest 테이블(도로명 / 건물명 / 시군구)을 프로세스 메모리에 올려 두고 prefix로 찾는다.
+  - 한글은 자모 단위로 분해한 key로 찾는다. 예) "도봉" → "ㄷㅗㅂㅗㅇ" 이므로 입력 중인 "도보", "돕"도 찾을 수 있다.
+  - 초성만 입력하면(예: "ㄷㅂㄹ") 초성 key로 찾는다.
+  - 정렬된 key 배열에서 bisect로 범위를 구하고, 범위 안에서 주소 건수(count)가 큰 순으로 top-k를 고른다.
+  - 범위가 큰 짧은 prefix(PRECOMPUTED_PREFIX 글자 이하)는 만들 때 top-k를 미리 계산해 suggest_top에 둔다.
+  - 목록은 처음 조회할 때 읽고, 색인 파일이 바뀌면(import_juso) 뒤에서 다시 읽는다. 요청마다 SQLite를 조회하지 않는다.
+suggest 테이블은 import_juso(색인 생성) 혹은 build_autocomplete 명령이 만든다. 없으면 읽을 때 juso 테이블에서 집계한다.
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from bisect import bisect_left
+import heapq, logging, sqlite3
+
+from django.conf import settings
+
+from external.address.juso_index import get_juso_index
+from external.address.table_loader import TableLoader
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 20
+PRECOMPUTED_PREFIX = 4
+KEY_FIELDS = ("jamo", "initials")
+
+HANGUL_BASE, HANGUL_END = 0xAC00, 0xD7A3
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+JONGSEONG = ("", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ",
+             "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ")
+# 겹모음 / 겹받침은 입력 순서대로 나눈다. (ㅘ는 ㅗ 다음 ㅏ를 입력한다)
+COMPOUND = {
+    "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ", "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ",
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ", "ㄽ": "ㄹㅅ",
+    "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ",
+}
+CONSONANTS = set("ㄱㄲㄳㄴㄵㄶㄷㄸㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅃㅄㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ")
+
+
+def _syllable(ch: str) -> Optional[Tuple[str, str, str]]:
+    code = ord(ch)
+    if not HANGUL_BASE <= code <= HANGUL_END:
+        return None
+    index = code - HANGUL_BASE
+    return CHOSEONG[index // 588], JUNGSEONG[(index % 588) // 28], JONGSEONG[index % 28]
+
+
+# 한글 음절을 자모로 분해한다. 공백은 무시하고 영문은 소문자로 맞춘다.
+def decompose(text: str) -> str:
+    out = []
+    for ch in text.lower():
+        if ch.isspace():
+            continue
+        jamo = _syllable(ch)
+        parts = "".join(jamo) if jamo else ch
+        out.append("".join(COMPOUND.get(p, p) for p in parts))
+    return "".join(out)
+
+
+# 초성 key. 한글이 아닌 글자(숫자 등)는 그대로 둔다.
+def choseong(text: str) -> str:
+    out = []
+    for ch in text.lower():
+        if ch.isspace():
+            continue
+        jamo = _syllable(ch)
+        out.append(jamo[0] if jamo else ch)
+    return "".join(out)
+
+
+def is_choseong_query(text: str) -> bool:
+    stripped = "".join(text.split())
+    return bool(stripped) and all(ch in CONSONANTS for ch in stripped)
+
+
+class Suggestion(NamedTuple):
+    type: str       # road / building / district
+    text: str
+    siNm: str
+    sggNm: str
+    address: str
+    count: int
+
+    def as_dict(self) -> dict:
+        return self._asdict()
+
+
+SUGGEST_COLUMNS = "type, text, siNm, sggNm, address, count"
+SCHEMA = (
+    "DROP TABLE IF EXISTS suggest",
+    "DROP TABLE IF EXISTS suggest_top",
+    "CREATE TABLE suggest (id INTEGER PRIMARY KEY, type TEXT NOT NULL, text TEXT NOT NULL,"
+    " siNm TEXT NOT NULL, sggNm TEXT NOT NULL, address TEXT NOT NULL, count INTEGER NOT NULL,"
+    " context TEXT NOT NULL, jamo TEXT NOT NULL, initials TEXT NOT NULL)",
+    "CREATE INDEX suggest_jamo ON suggest (jamo)",
+    "CREATE INDEX suggest_initials ON suggest (initials)",
+    # 짧은 prefix의 top-k. ids는 suggest.id를 쉼표로 이은 것 (count 내림차순)
+    "CREATE TABLE suggest_top (field TEXT NOT NULL, prefix TEXT NOT NULL, ids TEXT NOT NULL,"
+    " PRIMARY KEY (field, prefix)) WITHOUT ROWID",
+)
+
+
+# juso 테이블에서 도로명 / 건물명 / 시군구 목록과 주소 건수를 읽는다.
+def _collect(conn: sqlite3.Connection) -> List[Suggestion]:
+    suggestions = []
+    for row in conn.execute("SELECT siNm, sggNm, count(*) FROM juso GROUP BY siNm, sggNm"):
+        suggestions.append(Suggestion("district", row[1], row[0], row[1], f"{row[0]} {row[1]}", row[2]))
+    for row in conn.execute("SELECT siNm, sggNm, rn, count(*) FROM juso GROUP BY siNm, sggNm, rn"):
+        suggestions.append(Suggestion("road", row[2], row[0], row[1], f"{row[0]} {row[1]} {row[2]}", row[3]))
+    for row in conn.execute(
+        "SELECT siNm, sggNm, bdNm, min(roadAddrPart1), count(*) FROM juso"
+        " WHERE bdNm != '' GROUP BY siNm, sggNm, bdNm"
+    ):
+        suggestions.append(Suggestion("building", row[2], row[0], row[1], row[3], row[4]))
+    return suggestions
+
+
+# 정렬된 key 배열에서 길이 PRECOMPUTED_PREFIX 이하의 prefix마다 top-k id를 구한다. 같은 prefix는 연속이다.
+def _precompute_top(pairs: List[Tuple[str, int]], weights: Dict[int, int]) -> Dict[str, List[int]]:
+    pairs.sort()
+    keys = [key for key, _ in pairs]
+    ids = [i for _, i in pairs]
+    top = {}
+    for length in range(1, PRECOMPUTED_PREFIX + 1):
+        start = 0
+        while start < len(keys):
+            prefix = keys[start][:length]
+            end = bisect_left(keys, prefix + "\uffff", start)
+            if len(prefix) == length:
+                top[prefix] = heapq.nlargest(MAX_LIMIT, ids[start:end], key=lambda i: (weights[i], -i))
+            start = end
+    return top
+
+
+# 색인 연결(conn)에 suggest / suggest_top 테이블을 다시 만든다. commit은 호출한 쪽에서 한다. 항목 수를 반환한다.
+def build_suggestions(conn: sqlite3.Connection) -> int:
+    for statement in SCHEMA:
+        conn.execute(statement)
+    suggestions = _collect(conn)
+    rows = []
+    for i, s in enumerate(suggestions, start=1):
+        rows.append((i, *s, f"{s.siNm} {s.sggNm} {s.address}", decompose(s.text), choseong(s.text)))
+    conn.executemany(f"INSERT INTO suggest (id, {SUGGEST_COLUMNS}, context, jamo, initials)"
+                     f" VALUES ({', '.join('?' * 10)})", rows)
+
+    weights = {row[0]: row[6] for row in rows}
+    for field, position in (("jamo", 8), ("initials", 9)):
+        top = _precompute_top([(row[position], row[0]) for row in rows], weights)
+        conn.executemany("INSERT INTO suggest_top (field, prefix, ids) VALUES (?, ?, ?)",
+                         ((field, prefix, ",".join(map(str, ids))) for prefix, ids in top.items()))
+    return len(rows)
+
+
+# 메모리 자동완성 목록. field(jamo / initials)마다 정렬된 key 배열과 같은 순서의 id 배열을 둔다. 만든 뒤에는 바꾸지 않는다.
+class SuggestIndex:
+    def __init__(self, rows: Iterable[Tuple[int, Suggestion, str, str]],
+                 top: Optional[Dict[str, Dict[str, List[int]]]] = None):
+        self.suggestions: Dict[int, Suggestion] = {}
+        pairs: Dict[str, List[Tuple[str, int]]] = {field: [] for field in KEY_FIELDS}
+        for i, suggestion, jamo, initials in rows:
+            self.suggestions[i] = suggestion
+            pairs["jamo"].append((jamo, i))
+            pairs["initials"].append((initials, i))
+        if top is None:
+            weights = {i: s.count for i, s in self.suggestions.items()}
+            top = {field: _precompute_top(pairs[field], weights) for field in KEY_FIELDS}
+        self.top = top
+        self.keys: Dict[str, List[str]] = {}
+        self.ids: Dict[str, List[int]] = {}
+        for field in KEY_FIELDS:
+            pairs[field].sort()
+            self.keys[field] = [key for key, _ in pairs[field]]
+            self.ids[field] = [i for _, i in pairs[field]]
+
+    def __len__(self) -> int:
+        return len(self.suggestions)
+
+    def _matches(self, i: int, filters: List[str]) -> bool:
+        s = self.suggestions[i]
+        context = f"{s.siNm} {s.sggNm} {s.address}"
+        return all(word in context for word in filters)
+
+    # 마지막 단어를 prefix로 찾고, 앞 단어들은 시도 / 시군구 / 주소에 포함되어야 한다. 예) "도봉구 도봉"
+    def search(self, query: str, limit: int = 10) -> List[Suggestion]:
+        words = query.split()
+        if not words:
+            return []
+        limit = min(limit, MAX_LIMIT)
+        *filters, last = words
+        field = "initials" if is_choseong_query(last) else "jamo"
+        prefix = decompose(last)
+
+        if not filters:
+            top = self.top.get(field, {}).get(prefix)
+            if top is not None:
+                return [self.suggestions[i] for i in top[:limit] if i in self.suggestions]
+
+        keys, ids = self.keys[field], self.ids[field]
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + "\uffff", start)
+        candidates = (i for i in ids[start:end] if not filters or self._matches(i, filters))
+        best = heapq.nlargest(limit, candidates, key=lambda i: (self.suggestions[i].count, -i))
+        return [self.suggestions[i] for i in best]
+
+
+# 색인 파일에서 자동완성 목록을 읽는다. suggest 테이블이 없으면(예전 색인) juso 테이블에서 집계한다.
+def load_suggest_index() -> SuggestIndex:
+    index = get_juso_index()
+    if index.version() is None:
+        return SuggestIndex([])
+    conn = sqlite3.connect(f"file:{index.path}?mode=ro", uri=True)
+    try:
+        try:
+            rows = conn.execute(f"SELECT id, {SUGGEST_COLUMNS}, jamo, initials FROM suggest").fetchall()
+            top_rows = conn.execute("SELECT field, prefix, ids FROM suggest_top").fetchall()
+        except sqlite3.OperationalError:
+            logger.warning("address autocomplete: no suggest table in %s, collecting from juso "
+                           "(build_autocomplete 명령으로 미리 만들 수 있다)", index.path)
+            suggestions = _collect(conn)
+            return SuggestIndex((i, s, decompose(s.text), choseong(s.text)) for i, s in enumerate(suggestions, start=1))
+    finally:
+        conn.close()
+
+    top: Dict[str, Dict[str, List[int]]] = {field: {} for field in KEY_FIELDS}
+    for field, prefix, ids in top_rows:
+        top.setdefault(field, {})[prefix] = [int(i) for i in ids.split(",")]
+    return SuggestIndex(((row[0], Suggestion(*row[1:7]), row[7], row[8]) for row in rows), top)
+
+
+_loader = TableLoader("address autocomplete", lambda: getattr(settings, "AUTOCOMPLETE", {}),
+                      version=lambda: get_juso_index().version(), build=load_suggest_index,
+                      empty=lambda: SuggestIndex([]))
+
+
+def get_suggest_index() -> SuggestIndex:
+    return _loader.get()
+
+
+# 자동완성 결과를 반환한다. 로컬 주소 색인이 없으면 빈 list.
+def autocomplete(query: str, limit: int = 10) -> List[Suggestion]:
+    return get_suggest_index().search(query, limit)
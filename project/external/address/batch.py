@@ -0,0 +1,77 @@
+from __future__ import annotations
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from external.address import address_cache
+from external.address.address_manager import AddressManager
+
+
+"""
+여러 도로명 주소를 한 번에 AddressManager로 정리한다.
+  - 정규화한 주소 기준으로 중복을 제거한다.
+  - address_cache에 있는 주소는 바로 처리하고, 나머지만 thread pool에서 juso API로 찾는다.
+  - 결과는 입력 순서대로 반환한다.
+"""
+
+
+def _conf() -> dict:
+    return getattr(settings, "ADDRESS_BATCH", {})
+
+
+def _result(road_addr: str, manager: AddressManager, cached: bool) -> dict:
+    return {
+        "roadAddr": road_addr,
+        "valid": manager.is_valid(),
+        "address": manager.as_dict() if manager.is_valid() else None,
+        "error": manager.error or None,
+        "cached": cached,
+    }
+
+
+def _initialize(road_addr: str) -> AddressManager:
+    try:
+        manager = AddressManager(roadAddr=road_addr)
+        manager.initialize(research=True)
+        return manager
+    finally:
+        # worker thread가 연 DB 연결은 요청 thread와 별개이므로 직접 닫는다.
+        connections.close_all()
+
+
+def resolve_addresses(road_addresses: List[str], max_workers: Optional[int] = None) -> List[dict]:
+    max_workers = max_workers or _conf().get("MAX_WORKERS", 8)
+
+    unique: Dict[str, str] = {}
+    for road_addr in road_addresses:
+        unique.setdefault(address_cache.normalize_road_address(road_addr), road_addr)
+
+    managers: Dict[str, AddressManager] = {}
+    cached = set()
+    misses = []
+    for key, road_addr in unique.items():
+        if not key:
+            manager = AddressManager(roadAddr=road_addr)
+            manager.valid, manager.error = False, "Empty address."
+            managers[key] = manager
+        elif address_cache.lookup(road_addr) is not None:
+            # 캐시 hit은 network 없이 끝나므로 현재 thread에서 처리한다.
+            manager = AddressManager(roadAddr=road_addr)
+            manager.initialize(research=True)
+            managers[key] = manager
+            cached.add(key)
+        else:
+            misses.append(key)
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(misses)), thread_name_prefix="address-batch") as pool:
+            for key, manager in zip(misses, pool.map(_initialize, (unique[key] for key in misses))):
+                managers[key] = manager
+
+    results = []
+    for road_addr in road_addresses:
+        key = address_cache.normalize_road_address(road_addr)
+        results.append(_result(road_addr, managers[key], key in cached))
+    return results
@@ -0,0 +1,186 @@
+"""
+필지별 건축물대장 정리 결과(BuildingInfoManager.makeInfo) 저장소.
+  - key: (시군구 코드, 법정동 코드, 본번, 부번)
+  - 1차: 프로세스 내부 LRU (LOCAL_TTL 동안만. 다른 프로세스의 무효화를 늦게까지 놓치지 않도록)
+  - 2차: DB(BuildingFacts)
+REFRESH_AFTER가 지나면 저장된 값을 바로 주고 뒤에서 다시 받는다. TTL이 지나면 다시 받을 때까지 기다린다.
+일부 operation을 받지 못한(partial) 결과는 바로 갱신 대상이 된다.
+"""
+
+from __future__ import annotations
+from typing import Callable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import json, logging, threading, time
+
+from django.conf import settings
+from django.db import IntegrityError, connections
+from django.utils import timezone
+
+from external.address.address_manager import AddressManager
+from external.client.cache import CacheEntry, LocMemTier
+
+logger = logging.getLogger(__name__)
+
+LotKey = Tuple[str, str, str, str]
+
+_local: Optional[LocMemTier] = None
+_local_lock = threading.Lock()
+# 같은 필지를 중복으로 갱신하지 않도록 진행 중인 key를 기록한다.
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="building-facts-refresh")
+
+
+def _conf() -> dict:
+    return getattr(settings, "BUILDING_FACTS", {})
+
+
+def is_enabled() -> bool:
+    return _conf().get("ENABLED", True)
+
+
+def _get_local() -> LocMemTier:
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = LocMemTier(max_entries=_conf().get("LOCAL_MAX_ENTRIES", 1024))
+    return _local
+
+
+# AddressManager(initialize 완료)의 필지 key. 건축물대장 조회 parameter와 같다.
+def lot_key(address: AddressManager) -> LotKey:
+    return (address.cggCd, address.stdgCd, str(address.lnbrMnnm).zfill(4), str(address.lnbrSlno).zfill(4))
+
+
+def _filters(key: LotKey) -> dict:
+    return dict(zip(("sigungu_cd", "bjdong_cd", "bun", "ji"), key))
+
+
+def _local_key(key: LotKey) -> str:
+    return "-".join(key)
+
+
+# entry(fresh_until=refresh_after, stale_until=expires_at)를 LOCAL_TTL 동안 로컬에 둔다.
+def _remember(key: LotKey, entry: CacheEntry):
+    until = min(time.time() + _conf().get("LOCAL_TTL", 5 * 60), entry.stale_until)
+    _get_local().set(_local_key(key), CacheEntry(entry, until, until), len(json.dumps(entry.value, ensure_ascii=False)))
+
+
+# 저장된 값. 없으면 None. 만료 여부는 호출하는 쪽에서 판단한다.
+def lookup(key: LotKey) -> Optional[CacheEntry]:
+    local = _get_local().get(_local_key(key))
+    if local is not None and local.is_fresh(time.time()):
+        return local.value
+
+    from apps.address.models import BuildingFacts
+    try:
+        row = BuildingFacts.objects.filter(**_filters(key)).first()
+    except Exception:
+        logger.warning("building facts read error", exc_info=True)
+        return None
+    if row is None:
+        return None
+    entry = CacheEntry(row.info, row.refresh_after.timestamp(), row.expires_at.timestamp())
+    _remember(key, entry)
+    return entry
+
+
+def store(key: LotKey, info: dict):
+    now = timezone.now()
+    # 일부만 받은 결과는 다음 조회 때 바로 다시 받는다.
+    refresh_after = now if info.get("partial") else now + timedelta(seconds=_conf().get("REFRESH_AFTER", 30 * 24 * 60 * 60))
+    expires_at = now + timedelta(seconds=_conf().get("TTL", 365 * 24 * 60 * 60))
+
+    from apps.address.models import BuildingFacts
+    fields = {"info": info, "refresh_after": refresh_after, "expires_at": expires_at}
+    # address_cache와 같이 단일 UPDATE / INSERT 문으로 나눈다. (SQLite 동시 저장)
+    try:
+        rows = BuildingFacts.objects.filter(**_filters(key))
+        if not rows.update(**fields, fetched_at=now):
+            try:
+                BuildingFacts.objects.create(**_filters(key), **fields)
+            except IntegrityError:
+                rows.update(**fields, fetched_at=now)
+    except Exception:
+        logger.warning("building facts write error", exc_info=True)
+        return
+    _remember(key, CacheEntry(info, refresh_after.timestamp(), expires_at.timestamp()))
+
+
+def invalidate(key: LotKey):
+    _get_local().delete(_local_key(key))
+
+    from apps.address.models import BuildingFacts
+    BuildingFacts.objects.filter(**_filters(key)).delete()
+
+
+def invalidate_all() -> int:
+    _get_local().clear()
+
+    from apps.address.models import BuildingFacts
+    deleted, _ = BuildingFacts.objects.all().delete()
+    return deleted
+
+
+def _claim(key: LotKey) -> bool:
+    with _refreshing_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+        return True
+
+
+def _release(key: LotKey):
+    with _refreshing_lock:
+        _refreshing.discard(key)
+
+
+# 백그라운드 thread에서 다시 받는다. 새 결과가 비어 있거나 partial이면 저장하지 않고 기존 값을 유지한다.
+# (기존 값이 partial이면 refresh_after가 지나 있으므로 다음 조회 때 다시 시도한다)
+def _refresh(key: LotKey, address: AddressManager, fetch: Callable[[AddressManager], dict]):
+    if not _claim(key):
+        return
+
+    def run():
+        try:
+            info = fetch(address)
+            if not info or info.get("partial"):
+                return
+            store(key, info)
+        except Exception as e:
+            # 오류 메시지에는 인증키가 포함된 url이 들어 있으므로 종류만 남긴다.
+            logger.warning("building facts refresh error: %s", type(e).__name__)
+        finally:
+            _release(key)
+            # worker thread가 연 DB 연결은 요청 thread와 별개이므로 직접 닫는다.
+            connections.close_all()
+
+    _executor.submit(run)
+
+
+# 필지의 건축물대장 정리 결과. 저장된 값이 없거나 TTL이 지났으면 fetch(address)로 받아서 저장한다.
+# 다시 받다가 실패하면 만료된 값이라도 돌려준다. 뒤에서 다시 받을 때는 refetch(없으면 fetch)를 쓴다.
+def get_building_facts(address: AddressManager, fetch: Callable[[AddressManager], dict],
+                       refetch: Optional[Callable[[AddressManager], dict]] = None) -> dict:
+    if not is_enabled():
+        return fetch(address)
+
+    key = lot_key(address)
+    now = time.time()
+    entry = lookup(key)
+    if entry is not None and entry.is_fresh(now):
+        return entry.value
+    if entry is not None and entry.is_usable(now):
+        _refresh(key, address, refetch or fetch)
+        return entry.value
+
+    try:
+        info = fetch(address)
+    except Exception:
+        if entry is not None:
+            return entry.value
+        raise
+    store(key, info)
+    return info
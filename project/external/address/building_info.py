@@ -1,54 +1,275 @@
 from external.address.address_manager import AddressManager
 from external.client.data_go_kr import DataGoKrClient
+from external.address.building_facts import get_building_facts
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from math import ceil
+import time
+
+import numpy as np
+from django.conf import settings
+
+# 건축HUB 건축물대장(BldRgstHubService)에서 받아올 operation.
+OPERATIONS = {
+    # 표제부. 동(건물)별 정보.
+    "title": "/getBrTitleInfo",
+    # 총괄표제부. 한 필지에 건물이 여러 개일 때의 합계.
+    "recap": "/getBrRecapTitleInfo",
+    # 층별개요
+    "floors": "/getBrFlrOulnInfo",
+    # 전유공용면적. 호(전유부)별 면적.
+    "units": "/getBrExposPubuseAreaInfo",
+}
+
+# 기존 정보(표제부) 필드. 주 건물의 값을 그대로 쓴다.
+TITLE_FIELDS = (
+    # 주용도코드명
+    "mainPurpsCdNm",
+    # 기타용도
+    "etcPurps",
+    # 지붕코드명 예) 철근 콘크리트
+    "roofCdNm",
+    # 세대수
+    "hhIdCnt",
+    # 가구수
+    "fmlyCnt",
+    # 높이
+    "heit",
+    # 지상층수
+    "grndFlrCnt",
+    # 지하층수
+    "ugrndFlrCnt",
+    # 승용승강기수
+    "rideUseElvtCnt",
+    # 허가일
+    "pmsDay",
+    # 착공일
+    "stcnsDay",
+    # 사용승인일
+    "useAprDay",
+    # 대지면적
+    "platArea",
+    # 건축면적
+    "archArea",
+    # 건폐율
+    "bcRat",
+    # 연면적
+    "totArea",
+    # 용적률산정연면적
+    "vlRatEstmTotArea",
+    # 내진설계적용여부
+    "rserthqkDsgnApplyYn",
+)
+# 동별 요약 필드
+BUILDING_FIELDS = ("dongNm", "mainPurpsCdNm", "strctCdNm", "grndFlrCnt", "ugrndFlrCnt",
+                   "hhldCnt", "fmlyCnt", "totArea", "useAprDay")
+# 총괄표제부 필드
+RECAP_FIELDS = ("mainPurpsCdNm", "platArea", "archArea", "bcRat", "totArea", "vlRat",
+                "hhldCnt", "fmlyCnt", "hoCnt", "mainBldCnt", "atchBldCnt", "totPkngCnt", "useAprDay")
+
+
+def _conf() -> dict:
+    return getattr(settings, "BUILDING_INFO_FETCH", {})
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# 응답에서 (전체 항목 수, 항목 목록)을 꺼낸다. 항목이 하나면 dict, 없으면 빈 문자열로 온다.
+def parse_items(response) -> tuple:
+    body_response = (response or {}).get("response") or {}
+    code = (body_response.get("header") or {}).get("resultCode")
+    if code not in (None, "00", "0", "000"):
+        raise ValueError(f"BldRgstHubService error: {code}")
+    body = body_response.get("body") or {}
+    items = body.get("items")
+    item = items.get("item", []) if isinstance(items, dict) else []
+    if isinstance(item, dict):
+        item = [item]
+    return int(body.get("totalCount") or len(item)), item
+
+
+def _is_residential(purpose: str) -> bool:
+    return "주택" in purpose or purpose in ("아파트", "기숙사")
+
+
+# 여러 동 중 주 건물. (주건축물 중 연면적이 가장 큰 것)
+def _main_item(items: list) -> dict:
+    main = [item for item in items if str(item.get("mainAtchGbCd", "0")) == "0"] or items
+    return max(main, key=lambda item: _float(item.get("totArea")) or 0, default={})
+
+
+def _floors(items: list) -> dict:
+    by_purpose = {}
+    underground = [item for item in items if item.get("flrGbCdNm") == "지하"]
+    for item in items:
+        purpose = item.get("mainPurpsCdNm") or item.get("etcPurps") or ""
+        entry = by_purpose.setdefault(purpose, {"floors": 0, "area": 0.0})
+        entry["floors"] += 1
+        entry["area"] += _float(item.get("area")) or 0
+    return {
+        "count": len(items),
+        "underground_count": len(underground),
+        # 지하층 주거(반지하 등). 침수 / 채광 위험 판단용.
+        "underground_residential": any(_is_residential(item.get("mainPurpsCdNm") or "") for item in underground),
+        "by_purpose": by_purpose,
+    }
+
+
+# 전유부를 호별로 묶어서 호 수, 전유면적 분포, 용도별 호 수로 줄인다.
+def _units(items: list) -> dict:
+    units = {}
+    for item in items:
+        if item.get("exposPubuseGbCdNm") != "전유":
+            continue
+        key = (item.get("dongNm") or "", item.get("hoNm") or "")
+        unit = units.setdefault(key, {"area": 0.0, "purpose": item.get("mainPurpsCdNm") or "",
+                                      "underground": item.get("flrGbCdNm") == "지하"})
+        unit["area"] += _float(item.get("area")) or 0
+
+    by_purpose = {}
+    for unit in units.values():
+        by_purpose[unit["purpose"]] = by_purpose.get(unit["purpose"], 0) + 1
+    areas = np.array([unit["area"] for unit in units.values() if unit["area"] > 0])
+    return {
+        "count": len(units),
+        "underground_count": sum(1 for unit in units.values() if unit["underground"]),
+        "exclusive_area": {
+            "min": float(areas.min()),
+            "median": float(np.median(areas)),
+            "max": float(areas.max()),
+        } if areas.size else None,
+        "by_purpose": by_purpose,
+    }
+
+
+# 건축물대장 operation들을 thread pool에서 동시에 받아온다. 첫 페이지로 전체 항목 수를 알아낸 다음 나머지 페이지를 요청한다.
+# 전체 시간은 timeout(초)을 넘지 않는다. required operation(표제부)을 모두 받은 뒤에는 나머지를 extra_wait(초)만 더 기다린다.
+# (표제부 하나만 받던 때보다 느려지지 않도록) 끝나지 않은 operation은 sources에 "timeout"으로 남긴다.
+# required가 아닌 operation은 extra_max_pages(기본값 첫 페이지)까지만 받는다. (필지마다 요청 수가 늘지 않도록)
+# 반환값은 ({operation: 항목 목록}, {operation: 수집 현황}). required operation이 실패하면 그 오류를 다시 던진다.
+def fetch_operations(address: AddressManager, operations: dict = OPERATIONS, rows: int = None,
+                     max_pages: int = None, max_workers: int = None, timeout: float = None,
+                     required: tuple = ("title",), extra_wait: float = None, extra_max_pages: int = None) -> tuple:
+    rows = rows or _conf().get("ROWS", 100)
+    max_pages = max_pages or _conf().get("MAX_PAGES", 10)
+    max_workers = max_workers or _conf().get("MAX_WORKERS", 4)
+    timeout = timeout or _conf().get("TIMEOUT", 15)
+    extra_wait = extra_wait if extra_wait is not None else _conf().get("EXTRA_WAIT", 0)
+    extra_max_pages = extra_max_pages or _conf().get("EXTRA_MAX_PAGES", 1)
+    deadline = time.monotonic() + timeout
+    client = DataGoKrClient(timeout=timeout)
+
+    def fetch(name, page):
+        return parse_items(client.getBuildingAPI(path=operations[name], address=address, page=page, rows=rows))
+
+    items = {name: [] for name in operations}
+    sources = {name: {"status": "ok", "total": 0, "pages": 0} for name in operations}
+    errors = {}
+    required = [name for name in required if name in operations]
+    page_limits = {name: max_pages if name in required else min(max_pages, extra_max_pages) for name in operations}
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="building-info")
+    pending = {pool.submit(fetch, name, 1): (name, 1) for name in operations}
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, page = pending.pop(future)
+                try:
+                    total, page_items = future.result()
+                except Exception as e:
+                    errors.setdefault(name, e)
+                    # 오류 메시지에는 인증키가 포함된 url이 들어 있으므로 종류만 남긴다.
+                    sources[name].update(status="error", error=type(e).__name__)
+                    continue
+
+                items[name].extend(page_items)
+                sources[name]["pages"] += 1
+                if page == 1:
+                    sources[name]["total"] = total
+                    pages = ceil(total / rows)
+                    if pages > page_limits[name]:
+                        sources[name]["truncated"] = True
+                    for next_page in range(2, min(pages, page_limits[name]) + 1):
+                        pending[pool.submit(fetch, name, next_page)] = (name, next_page)
+
+            # required operation이 실패했으면 나머지를 기다리지 않는다.
+            if any(name in errors for name in required):
+                break
+            # required operation을 모두 받았으면 나머지는 extra_wait만 더 기다린다.
+            if required and not any(name in required for name, _ in pending.values()):
+                deadline = min(deadline, time.monotonic() + extra_wait)
+                required = []
+    finally:
+        # 남은 요청은 기다리지 않는다. (이미 보낸 요청은 client timeout으로 끝난다)
+        for name, _ in pending.values():
+            if sources[name]["status"] == "ok":
+                sources[name]["status"] = "timeout"
+        pool.shutdown(wait=False, cancel_futures=True)
+        client.close()
+
+    for name, source in sources.items():
+        source["items"] = len(items[name])
+    # required는 받은 뒤에 비워지므로 여기 남아 있으면 받지 못한 것이다.
+    failed = [name for name in required if sources[name]["status"] != "ok"]
+    if not failed and all(source["status"] != "ok" for source in sources.values()):
+        failed = list(sources)
+    for name in failed:
+        if name in errors:
+            raise errors[name]
+    if failed:
+        raise TimeoutError("BldRgstHubService timeout")
+    return items, sources
+
+
+# 건축물대장을 받아서 정리한다. (저장소를 거치지 않는다)
+# 기본은 표제부를 받으면 바로 반환하고 나머지는 partial로 남긴다. wait_all=True이면 timeout 안에서 모두 기다린다. (뒤에서 다시 받을 때)
+def fetch_building_info(address: AddressManager, wait_all: bool = False) -> dict:
+    items, sources = fetch_operations(address, extra_wait=_conf().get("TIMEOUT", 15) if wait_all else None)
+    # 표제부가 없으면 정리할 정보가 없다. 빈 값이 저장(BuildingFacts)되지 않도록 오류로 끝낸다.
+    if not items["title"]:
+        raise ValueError("BldRgstHubService: no title items")
+    info = {}
+
+    # 표제부. 기존 필드는 주 건물 값을 쓴다.
+    item = _main_item(items["title"])
+    for field in TITLE_FIELDS:
+        info[field] = item.get(field)
+    # 세대수 필드 이름은 hhldCnt. (기존 key는 유지한다)
+    info["hhIdCnt"] = item.get("hhldCnt", item.get("hhIdCnt"))
+    # 동별 요약
+    info["buildings"] = [{field: title.get(field) for field in BUILDING_FIELDS} for title in items["title"]]
+    # 총괄표제부
+    recap = items["recap"][0] if items["recap"] else None
+    info["recap"] = {field: recap.get(field) for field in RECAP_FIELDS} if recap else None
+    # 층별개요 / 전유부 요약
+    info["floors"] = _floors(items["floors"]) if items["floors"] else None
+    info["units"] = _units(items["units"]) if items["units"] else None
+    # 일부 페이지만 받은 요약은 truncated로 표시한다. (count 등은 받은 항목만 센 값이다)
+    for name in ("floors", "units"):
+        if info[name] is not None:
+            info[name]["truncated"] = sources[name]["items"] < sources[name]["total"]
+
+    info["sources"] = sources
+    # 시간 안에 받지 못했거나 실패한 operation이 있으면 True.
+    info["partial"] = any(source["status"] != "ok" for source in sources.values())
+    return info
+
 
 # building의 정보를 정리한다.
 class BuildingInfoManager:
     def __init__(self):
         self.info = {}
-        
+
+    # 같은 필지를 최근에 받았으면 저장된 값을 쓴다. (external.address.building_facts)
     def makeInfo(self, address:AddressManager):
-        client = DataGoKrClient()
-        
-        # 건축물대장 총괄표제부 조회
-        brTitleInfo = client.getBuildingAPI(path="/getBrTitleInfo", address=address)
-        
-        item = brTitleInfo.get("response").get("body").get("items").get("item")[0]
-        # 주용도코드명
-        self.info["mainPurpsCdNm"] = item.get("mainPurpsCdNm")
-        # 기타용도
-        self.info["etcPurps"] = item.get("etcPurps")
-        # 지붕코드명 예) 철근 콘크리트
-        self.info["roofCdNm"] = item.get("roofCdNm")
-        # 세대수
-        self.info["hhIdCnt"] = item.get("hhIdCnt")
-        # 가구수
-        self.info["fmlyCnt"] = item.get("fmlyCnt")
-        # 높이
-        self.info["heit"] = item.get("heit")
-        # 지상층수
-        self.info["grndFlrCnt"] = item.get("grndFlrCnt")
-        # 지하층수
-        self.info["ugrndFlrCnt"] = item.get("ugrndFlrCnt")
-        # 승용승강기수
-        self.info["rideUseElvtCnt"] = item.get("rideUseElvtCnt")
-        # 허가일
-        self.info["pmsDay"] = item.get("pmsDay")
-        # 착공일
-        self.info["stcnsDay"] = item.get("stcnsDay")
-        # 사용승인일
-        self.info["useAprDay"] = item.get("useAprDay")
-        # 대지면적
-        self.info["platArea"] = item.get("platArea")
-        # 건축면적
-        self.info["archArea"] = item.get("archArea")
-        # 건폐율
-        self.info["bcRat"] = item.get("bcRat")
-        # 연면적
-        self.info["totArea"] = item.get("totArea")
-        # 용적률산정연면적
-        self.info["vlRatEstmTotArea"] = item.get("vlRatEstmTotArea")
-        # 내진설계적용여부
-        self.info["rserthqkDsgnApplyYn"] = item.get("rserthqkDsgnApplyYn")
-        
-        client.close()
+        self.info = dict(get_building_facts(address, fetch_building_info,
+                                            refetch=lambda address: fetch_building_info(address, wait_all=True)))
         return self.info
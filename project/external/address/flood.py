@@ -0,0 +1,264 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from math import ceil
+import re
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from external.address.address_manager import AddressManager
+from external.address.table_loader import TableLoader
+from external.client.data_go_kr import DataGoKrClient
+
+
+"""
+행정구역별 침수 이력(InquireAdmCtyFLService_v2) 로컬 색인.
+  - prefetch_regions: 서울시 25개 자치구의 전체 페이지를 thread pool에서 받아서 자치구마다 DB(FloodRegion)에 통째로 저장한다.
+    모든 페이지를 받은 자치구만 교체하고, 실패한 자치구는 기존 값을 유지한다.
+  - 조회는 메모리의 (시도, 시군구) / (시도, 시군구, 법정동) 색인에서 한다. 네트워크 요청이 없다.
+    결과는 항목 전체가 아니라 연도별 건수와 최근 RECENT_ITEMS개 항목으로 줄인다. (보고서 / GPT 입력에 그대로 들어간다)
+  - 색인은 CHECK_INTERVAL마다 DB 변경을 확인해서 다시 읽고, 마지막 수집이 REFRESH_AFTER보다 오래되면 뒤에서 upstream을 다시 받는다.
+"""
+
+SERVICE = "InquireAdmCtyFLService_v2"
+SEOUL_CTPV_CD = "11"
+# 서울시 자치구 시군구 코드(admCd 3~5번째 자리). 종로구(110) ~ 강동구(740)
+SEOUL_SGG_CDS = ("110", "140", "170", "200", "215", "230", "260", "290", "305", "320",
+                 "350", "380", "410", "440", "470", "500", "530", "545", "560", "590",
+                 "620", "650", "680", "710", "740")
+# 항목의 법정동 코드 필드. 응답에 있는 것만 쓴다.
+DONG_FIELDS = ("stdgEmdCd", "stdgCd", "lgdngCd", "emdCd")
+# 이 이름으로 끝나는 필드를 발생 연도 / 일자로 본다. 예) flodYr, occrYmd
+DATE_FIELD_SUFFIXES = ("yr", "year", "ymd", "dt", "de", "date")
+# 자료 없음. 빈 자치구로 저장한다.
+NODATA_CODES = ("03",)
+
+RegionKey = Tuple[str, str]
+
+
+def _conf() -> dict:
+    return getattr(settings, "FLOOD_INDEX", {})
+
+
+# 응답에서 (전체 항목 수, 항목 목록)을 꺼낸다. 항목이 하나면 dict, 없으면 빈 문자열로 온다.
+def parse_flood_page(response) -> tuple:
+    root = (response or {}).get("response") or response or {}
+    code = (root.get("header") or {}).get("resultCode")
+    if code in NODATA_CODES:
+        return 0, []
+    if code not in (None, "00", "0", "000"):
+        raise ValueError(f"{SERVICE} error: {code}")
+    body = root.get("body") or {}
+    items = body.get("items")
+    if isinstance(items, dict):
+        items = items.get("item", [])
+    if isinstance(items, dict):
+        items = [items]
+    items = items if isinstance(items, list) else []
+    return int(body.get("totalCount") or len(items)), items
+
+
+# AddressManager(initialize 완료)의 (시도, 시군구) key. 침수 이력 조회 parameter와 같다.
+def region_key(address: AddressManager) -> RegionKey:
+    return address.admCd[:2], address.admCd[2:5]
+
+
+# 항목의 법정동 코드. admCd 뒤 5자리(stdgCd)와 같은 형식으로 맞춘다. 없으면 None.
+def item_dong_code(item: dict) -> Optional[str]:
+    for field in DONG_FIELDS:
+        code = str(item.get(field) or "").strip()
+        if not code.isdigit():
+            continue
+        if len(code) >= 10:
+            return code[5:10]
+        if len(code) == 5:
+            return code
+        if len(code) == 3:
+            return code + "00"
+    return None
+
+
+# 항목의 발생 일자 숫자열. 앞 4자리가 연도다. 예) "20220808". 없으면 "".
+def item_date(item: dict) -> str:
+    for field, value in item.items():
+        if not field.lower().endswith(DATE_FIELD_SUFFIXES):
+            continue
+        digits = re.sub(r"\D", "", str(value or ""))
+        if len(digits) >= 4 and 1900 <= int(digits[:4]) <= 2100:
+            return digits
+    return ""
+
+
+# 항목 목록을 연도별 건수와 최근 항목 limit개로 줄인다.
+def summarize_items(items: List[dict], limit: int = None) -> dict:
+    limit = limit if limit is not None else _conf().get("RECENT_ITEMS", 20)
+    dated = sorted(((item_date(item), item) for item in items), key=lambda pair: pair[0], reverse=True)
+    by_year: Dict[str, int] = {}
+    for date, _ in dated:
+        year = date[:4] or "unknown"
+        by_year[year] = by_year.get(year, 0) + 1
+    return {
+        "itemCount": len(dated),
+        "countByYear": dict(sorted(by_year.items())),
+        "recentItems": [item for _, item in dated[:limit]],
+        "truncated": len(dated) > limit,
+    }
+
+
+# 자치구들의 전체 페이지를 동시에 받는다. 첫 페이지로 전체 항목 수를 알아낸 다음 나머지 페이지를 요청한다.
+# 반환값은 ({region: (전체 항목 수, 항목 목록)}, {region: 오류 종류}). 페이지가 하나라도 실패한 자치구는 결과에 넣지 않는다.
+def fetch_regions(regions: Iterable[RegionKey], rows: int = None, max_pages: int = None,
+                  max_workers: int = None) -> tuple:
+    rows = rows or _conf().get("ROWS", 100)
+    max_pages = max_pages or _conf().get("MAX_PAGES", 100)
+    max_workers = max_workers or _conf().get("MAX_WORKERS", 4)
+    client = DataGoKrClient()
+
+    def fetch(region, page):
+        return parse_flood_page(client.getFloodByRegion(*region, page=page, rows=rows))
+
+    totals: Dict[RegionKey, int] = {}
+    items: Dict[RegionKey, List[dict]] = {}
+    errors: Dict[RegionKey, str] = {}
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="flood-prefetch")
+    pending = {pool.submit(fetch, region, 1): (region, 1) for region in regions}
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                region, page = pending.pop(future)
+                if region in errors:
+                    continue
+                try:
+                    total, page_items = future.result()
+                except Exception as e:
+                    # 오류 메시지에는 인증키가 포함된 url이 들어 있으므로 종류만 남긴다.
+                    errors[region] = type(e).__name__
+                    continue
+
+                items.setdefault(region, []).extend(page_items)
+                if page == 1:
+                    totals[region] = total
+                    for next_page in range(2, min(ceil(total / rows), max_pages) + 1):
+                        pending[pool.submit(fetch, region, next_page)] = (region, next_page)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        client.close()
+
+    fetched = {region: (totals[region], region_items) for region, region_items in items.items() if region not in errors}
+    return fetched, errors
+
+
+# 받은 자치구를 저장한다. 항목이 없는 자치구도 저장해서 다시 요청하지 않는다.
+def save_regions(fetched: Dict[RegionKey, tuple]):
+    from apps.address.models import FloodRegion
+
+    records = [FloodRegion(ctpv_cd=ctpv_cd, sgg_cd=sgg_cd, total_count=total, items=region_items)
+               for (ctpv_cd, sgg_cd), (total, region_items) in fetched.items()]
+    FloodRegion.objects.bulk_create(
+        records,
+        update_conflicts=True,
+        unique_fields=["ctpv_cd", "sgg_cd"],
+        update_fields=["total_count", "items", "fetched_at"],
+    )
+
+
+# 자치구를 받아서 저장한다. 기본값은 서울시 전체 자치구. {region: 저장한 항목 수}를 반환하고 오류는 errors에 남긴다.
+def prefetch_regions(regions: Optional[Iterable[RegionKey]] = None, errors: Optional[dict] = None) -> Dict[RegionKey, int]:
+    regions = list(regions or [(SEOUL_CTPV_CD, sgg_cd) for sgg_cd in SEOUL_SGG_CDS])
+    fetched, failed = fetch_regions(regions)
+    for region, error in failed.items():
+        if errors is not None:
+            errors[region] = error
+        print(f"flood prefetch error ({''.join(region)}): {error}")
+    save_regions(fetched)
+    return {region: len(region_items) for region, (_, region_items) in fetched.items()}
+
+
+# (시도, 시군구) / (시도, 시군구, 법정동) → 항목 목록. 만든 뒤에는 바꾸지 않는다.
+class FloodIndex:
+    def __init__(self, regions: Iterable[Tuple[str, str, int, list]], fetched_at=None):
+        self.by_region: Dict[RegionKey, List[dict]] = {}
+        self.totals: Dict[RegionKey, int] = {}
+        self.by_dong: Dict[Tuple[str, str, str], List[dict]] = {}
+        # 법정동 코드가 있는 항목이 하나라도 있는 자치구
+        self.dong_coded: Set[RegionKey] = set()
+        for ctpv_cd, sgg_cd, total, items in regions:
+            self.by_region[(ctpv_cd, sgg_cd)] = items
+            self.totals[(ctpv_cd, sgg_cd)] = total
+            for item in items:
+                dong_cd = item_dong_code(item)
+                if dong_cd:
+                    self.by_dong.setdefault((ctpv_cd, sgg_cd, dong_cd), []).append(item)
+                    self.dong_coded.add((ctpv_cd, sgg_cd))
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def from_db(cls) -> "FloodIndex":
+        from apps.address.models import FloodRegion
+        qs = FloodRegion.objects.all()
+        fetched_at = qs.aggregate(latest=Max("fetched_at"))["latest"]
+        return cls(qs.values_list("ctpv_cd", "sgg_cd", "total_count", "items"), fetched_at)
+
+    def has_region(self, region: RegionKey) -> bool:
+        return region in self.by_region
+
+    # 자치구 일부를 바꾼 새 색인. 나머지 자치구는 그대로 쓴다.
+    def with_regions(self, fetched: Dict[RegionKey, tuple]) -> "FloodIndex":
+        regions = [(*region, self.totals[region], items)
+                   for region, items in self.by_region.items() if region not in fetched]
+        regions += [(*region, total, items) for region, (total, items) in fetched.items()]
+        return FloodIndex(regions, self.fetched_at)
+
+    # 주소의 침수 이력. 자치구 항목에 법정동 코드가 있으면 같은 법정동 항목만 준다. (없으면 빈 결과)
+    # 법정동 코드가 있는 항목이 하나도 없을 때만 자치구 전체를 준다.
+    def get(self, address: AddressManager) -> Optional[dict]:
+        region = region_key(address)
+        if region not in self.by_region:
+            return None
+        dong_cd = address.admCd[5:10]
+        by_dong = region in self.dong_coded
+        return {
+            "stdCtpvCd": region[0],
+            "stdgSggCd": region[1],
+            "stdgCd": dong_cd if by_dong else None,
+            "scope": "dong" if by_dong else "sgg",
+            "totalCount": self.totals[region],
+            **summarize_items(self.by_dong.get((*region, dong_cd), []) if by_dong else self.by_region[region]),
+        }
+
+
+# DB 변경 확인용. (자치구 수, 마지막 수집 시각)
+def _db_version():
+    from apps.address.models import FloodRegion
+    return tuple(FloodRegion.objects.aggregate(count=Count("id"), latest=Max("fetched_at")).values())
+
+
+# upstream에서 다시 받아서 DB에 저장한다. 다음 확인 때 색인에 반영된다.
+def _refresh_upstream() -> bool:
+    return bool(prefetch_regions())
+
+
+_loader = TableLoader("flood index", _conf, version=_db_version, build=FloodIndex.from_db,
+                      empty=lambda: FloodIndex([]), refresh=_refresh_upstream)
+
+
+def get_flood_index() -> FloodIndex:
+    return _loader.get()
+
+
+# 주소의 침수 이력. 색인에 자치구가 없으면 None. (네트워크 요청 없음)
+# load_missing=True이면 색인에 없을 때 그 자치구만 upstream에서 받아서 다시 찾는다. (처음 배포 직후, 서울 외 지역 등)
+def get_flood_history(address: AddressManager, load_missing: bool = False) -> Optional[dict]:
+    history = get_flood_index().get(address)
+    if history is not None or not load_missing:
+        return history
+    region = region_key(address)
+    fetched, errors = fetch_regions([region])
+    if errors:
+        raise RuntimeError(f"{SERVICE} fetch failed: {errors[region]}")
+    save_regions(fetched)
+    _loader.update(lambda index: index.with_regions(fetched))
+    return get_flood_index().get(address)
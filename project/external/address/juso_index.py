@@ -0,0 +1,270 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+import logging, os, re, sqlite3, threading
+
+from django.conf import settings
+
+
+"""
+도로명주소 전체분(business.juso.go.kr 제공 "도로명주소 한글" 파일)으로 만든 로컬 주소 검색 색인.
+  - import_juso 명령으로 SQLite FTS5 파일을 만들고, 완성된 파일을 원자적으로 교체한다.
+  - 검색 결과는 BusinessJusoClient.search_address 와 같은 모양으로 반환한다.
+색인이 없거나 검색 결과가 없으면 None을 반환하고, 호출하는 쪽에서 juso API로 넘어간다.
+"""
+
+logger = logging.getLogger(__name__)
+
+# "도로명주소 한글" 파일 컬럼 순서. (| 구분, cp949)
+COLUMNS = (
+    "bdMgtSn",      # 도로명주소관리번호
+    "admCd",        # 법정동코드
+    "siNm",         # 시도명
+    "sggNm",        # 시군구명
+    "emdNm",        # 법정읍면동명
+    "liNm",         # 법정리명
+    "mtYn",         # 산여부
+    "lnbrMnnm",     # 지번본번
+    "lnbrSlno",     # 지번부번
+    "rnMgtSn",      # 도로명코드
+    "rn",           # 도로명
+    "udrtYn",       # 지하여부
+    "buldMnnm",     # 건물본번
+    "buldSlno",     # 건물부번
+    "hemdCd",       # 행정동코드
+    "hemdNm",       # 행정동명
+    "zipNo",        # 기초구역번호(우편번호)
+    "prevRoadAddr", # 이전도로명주소
+    "effectDate",   # 효력발생일
+    "bdKdcd",       # 공동주택구분
+    "mvRsnCd",      # 이동사유코드
+    "bdrgstNm",     # 건축물대장건물명
+    "sggBdNm",      # 시군구용건물명
+    "remark",       # 비고
+)
+
+# 폐지된 주소의 이동사유코드.
+DELETED_REASON = "63"
+
+# juso API 응답의 juso 항목 필드. 색인 테이블 컬럼과 같다.
+JUSO_FIELDS = (
+    "roadAddr", "roadAddrPart1", "roadAddrPart2", "jibunAddr", "engAddr", "zipNo",
+    "admCd", "rnMgtSn", "bdMgtSn", "detBdNmList", "bdNm", "bdKdcd",
+    "siNm", "sggNm", "emdNm", "liNm", "rn", "udrtYn", "buldMnnm", "buldSlno",
+    "mtYn", "lnbrMnnm", "lnbrSlno", "emdNo", "hstryYn", "relJibun", "hemdNm",
+)
+
+SCHEMA = (
+    "CREATE TABLE juso (id INTEGER PRIMARY KEY, "
+    + ", ".join(f"{field} TEXT NOT NULL DEFAULT ''" for field in JUSO_FIELDS)
+    + ")",
+    "CREATE VIRTUAL TABLE juso_fts USING fts5(search_text, content='', tokenize='unicode61 remove_diacritics 0')",
+    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+)
+
+
+def _number(main: str, sub: str) -> str:
+    main, sub = str(int(main or 0)), str(int(sub or 0))
+    return main if sub == "0" else f"{main}-{sub}"
+
+
+# 파일 한 줄(컬럼 list)을 juso API 항목 모양의 dict로 바꾼다. 폐지된 주소는 None.
+# 번호 컬럼이 숫자가 아니면 ValueError. (import_juso는 그 줄을 건너뛰고 센다)
+def to_juso(values: List[str]) -> Optional[Dict[str, str]]:
+    row = dict(zip(COLUMNS, (v.strip() for v in values)))
+    if len(values) < len(COLUMNS) - 1 or row.get("mvRsnCd") == DELETED_REASON:
+        return None
+
+    bd_nm = row["sggBdNm"] or row["bdrgstNm"]
+    underground = "지하 " if row["udrtYn"] == "1" else ""
+    road_part1 = " ".join(filter(None, (
+        row["siNm"], row["sggNm"], row["rn"], underground + _number(row["buldMnnm"], row["buldSlno"]),
+    )))
+    # 참고항목: 동 지역이면 법정동명, 공동주택이면 건물명.
+    extras = []
+    if row["emdNm"] and not row["liNm"] and row["emdNm"][-1] in "동가로":
+        extras.append(row["emdNm"])
+    if bd_nm and row["bdKdcd"] == "1":
+        extras.append(bd_nm)
+    road_part2 = f"({', '.join(extras)})" if extras else ""
+    mountain = "산 " if row["mtYn"] == "1" else ""
+    jibun = " ".join(filter(None, (
+        row["siNm"], row["sggNm"], row["emdNm"], row["liNm"],
+        mountain + _number(row["lnbrMnnm"], row["lnbrSlno"]), bd_nm,
+    )))
+
+    juso = dict.fromkeys(JUSO_FIELDS, "")
+    juso.update({
+        "roadAddr": f"{road_part1} {road_part2}".strip(),
+        "roadAddrPart1": road_part1,
+        "roadAddrPart2": road_part2,
+        "jibunAddr": jibun,
+        "zipNo": row["zipNo"],
+        "admCd": row["admCd"],
+        "rnMgtSn": row["rnMgtSn"],
+        "bdMgtSn": row["bdMgtSn"],
+        "bdNm": bd_nm,
+        "bdKdcd": row["bdKdcd"] or "0",
+        "siNm": row["siNm"],
+        "sggNm": row["sggNm"],
+        "emdNm": row["emdNm"],
+        "liNm": row["liNm"],
+        "rn": row["rn"],
+        "udrtYn": row["udrtYn"] or "0",
+        "buldMnnm": str(int(row["buldMnnm"] or 0)),
+        "buldSlno": str(int(row["buldSlno"] or 0)),
+        "mtYn": row["mtYn"] or "0",
+        "lnbrMnnm": str(int(row["lnbrMnnm"] or 0)),
+        "lnbrSlno": str(int(row["lnbrSlno"] or 0)),
+        "hstryYn": "0",
+        "hemdNm": row["hemdNm"],
+    })
+    return juso
+
+
+def _search_text(juso: Dict[str, str]) -> str:
+    return " ".join((juso["roadAddr"], juso["jibunAddr"], juso["zipNo"]))
+
+
+# juso 항목들로 색인 파일을 만든다. 임시 파일에 다 쓴 다음 교체하므로 검색 중에도 실행할 수 있다.
+def build_index(jusos: Iterable[Dict[str, str]], path, batch_size: int = 5000) -> int:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    if tmp.exists():
+        tmp.unlink()
+
+    conn = sqlite3.connect(tmp)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+    insert_juso = f"INSERT INTO juso (id, {', '.join(JUSO_FIELDS)}) VALUES (?, {', '.join('?' * len(JUSO_FIELDS))})"
+    insert_fts = "INSERT INTO juso_fts (rowid, search_text) VALUES (?, ?)"
+    count = 0
+    batch: List[Tuple] = []
+    texts: List[Tuple] = []
+    for juso in jusos:
+        count += 1
+        batch.append((count, *(juso[field] for field in JUSO_FIELDS)))
+        texts.append((count, _search_text(juso)))
+        if len(batch) >= batch_size:
+            conn.executemany(insert_juso, batch)
+            conn.executemany(insert_fts, texts)
+            batch, texts = [], []
+    conn.executemany(insert_juso, batch)
+    conn.executemany(insert_fts, texts)
+    conn.execute("INSERT INTO meta (key, value) VALUES ('count', ?)", (str(count),))
+    conn.execute("INSERT INTO juso_fts (juso_fts) VALUES ('optimize')")
+    # 자동완성 목록도 같은 파일에 미리 만든다. (요청 처리 중에 집계하지 않도록)
+    from external.address.autocomplete import build_suggestions
+    build_suggestions(conn)
+    conn.commit()
+    conn.close()
+
+    os.replace(tmp, path)
+    return count
+
+
+# 검색어를 FTS5 prefix query로 바꾼다. 예) "도봉구 도봉로1" → "도봉구"* "도봉로1"*
+def to_match_query(keyword: str) -> str:
+    tokens = re.findall(r"[0-9A-Za-z가-힣]+", keyword or "")
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def response(jusos: List[Dict[str, str]], total: int, size: int, page: int) -> dict:
+    return {
+        "results": {
+            "common": {
+                "errorMessage": "정상",
+                "countPerPage": str(size),
+                "totalCount": str(total),
+                "errorCode": "0",
+                "currentPage": str(page),
+            },
+            "juso": jusos,
+        }
+    }
+
+
+class JusoIndex:
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    # 색인 파일이 바뀌었는지 확인하기 위한 값. 파일이 없으면 None.
+    def version(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    # thread 별 읽기 전용 연결. import로 파일이 바뀌면 다시 연다.
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        version = self.version()
+        if version is None:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.version != version:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.version = version
+        return conn
+
+    def is_available(self) -> bool:
+        return self._conn() is not None
+
+    def query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        conn = self._conn()
+        return conn.execute(sql, params).fetchall() if conn is not None else []
+
+    # (전체 건수, 해당 page의 juso 항목)을 반환한다. 색인이 없으면 None.
+    def search(self, keyword: str, size: int = 10, page: int = 1) -> Optional[Tuple[int, List[Dict[str, str]]]]:
+        query = to_match_query(keyword)
+        conn = self._conn()
+        if conn is None or not query:
+            return None
+
+        total = conn.execute("SELECT count(*) FROM juso_fts WHERE juso_fts MATCH ?", (query,)).fetchone()[0]
+        if total == 0:
+            return 0, []
+        rows = conn.execute(
+            f"SELECT {', '.join(JUSO_FIELDS)} FROM juso WHERE id IN ("
+            " SELECT rowid FROM juso_fts WHERE juso_fts MATCH ? ORDER BY rowid LIMIT ? OFFSET ?"
+            ") ORDER BY id",
+            (query, size, (page - 1) * size),
+        ).fetchall()
+        return total, [dict(row) for row in rows]
+
+
+_index: Optional[JusoIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_juso_index() -> JusoIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = JusoIndex(settings.JUSO_INDEX["PATH"])
+    return _index
+
+
+# 로컬 색인으로 검색한다. 색인이 꺼져 있거나, 없거나, 결과가 없으면 None. (juso API로 넘긴다)
+def search_address_local(query: str, size: int = 10, page: int = 1) -> Optional[dict]:
+    if not getattr(settings, "JUSO_INDEX", {}).get("ENABLED", True):
+        return None
+    try:
+        result = get_juso_index().search(query, size, page)
+    except sqlite3.Error:
+        logger.warning("juso index search error", exc_info=True)
+        return None
+    if result is None or result[0] == 0:
+        return None
+    total, jusos = result
+    return response(jusos, total, size, page)
@@ -1,55 +1,114 @@
 # 전월세가 분석
-from external.client.seoul_data import DataSeoulClient
+from external.client.seoul_data import DataSeoulClient, MAX_ROWS_PER_REQUEST
 from external.address.address_manager import AddressManager
+from external.address.rent_stats import RentSamples, user_price_position
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
+from math import ceil
 
-# startYear부터 현재까지 평균 전월세가를 구해서 dict로 반환한다.
-def get_avg_price(startYear, address_manager:AddressManager):
+from django.conf import settings
+
+SERVICE = "tbLnOpendataRentV"
+
+
+def _conf() -> dict:
+    return getattr(settings, "AVG_PRICE_FETCH", {})
+
+
+# 응답에서 (전체 행 수, 행 목록)을 꺼낸다. 데이터가 없으면 서비스 블록 없이 RESULT만 오므로 (0, [])로 처리한다.
+def parse_price_page(response) -> tuple:
+    block = (response or {}).get(SERVICE)
+    if not block:
+        code = (response or {}).get("RESULT", {}).get("CODE")
+        if code not in (None, "INFO-200"):
+            raise ValueError(f"{SERVICE} error: {code}")
+        return 0, []
+    return int(block.get("list_total_count") or 0), block.get("row", [])
+
+
+# 연도 / 페이지별 전월세 행을 thread pool에서 받아오면서 on_rows로 넘긴다.
+# 각 연도의 첫 페이지로 전체 행 수를 알아낸 다음 나머지 페이지를 추가로 요청한다.
+# 반환값은 수집 현황(coverage). 모든 요청이 실패하면 첫 오류를 다시 던진다.
+def fetch_price_rows(years, address_manager: AddressManager, on_rows, page_size: int = None, max_workers: int = None) -> dict:
+    page_size = min(page_size or _conf().get("PAGE_SIZE", MAX_ROWS_PER_REQUEST), MAX_ROWS_PER_REQUEST)
+    max_workers = max_workers or _conf().get("MAX_WORKERS", 4)
     client = DataSeoulClient()
-    current_year = datetime.now().year
 
-    # 보증금(전세)
-    total_year_security_deposit = 0
-    total_monthly_security_deposit = 0
-    # 월세
-    total_monthly_rent = 0
-    
-    year_count = 0
-    month_count = 0
-
-    for year in range(startYear, current_year + 1):
-        response = client.getPrice(year=year, address=address_manager)
-        rows = response.get("tbLnOpendataRentV").get("row", [])
-
-        for row in rows:
-            # 전세/월세
-            rent_se = row.get("RENT_SE")
-            grfe = int(row.get("GRFE"))
-            rtfe = int(row.get("RTFE"))
-
-            if rent_se == "전세":
-                total_year_security_deposit += grfe
-                year_count += 1
-            elif rent_se == "월세":
-                total_monthly_security_deposit += grfe
-                total_monthly_rent += rtfe
-                month_count += 1      
-
-    if year_count == 0 or month_count == 0:
-        return {
-            'error': "no data found"
-        }
-    avg_year_price = total_year_security_deposit / year_count
-    avg_month_security_price = total_monthly_security_deposit / month_count
-    avg_month_rent = total_monthly_rent / month_count
-   
-    return {
-        "avg_year_price": avg_year_price,
-        "avg_month_security_price": avg_month_security_price,
-        "avg_month_rent": avg_month_rent
+    def fetch(year, page):
+        start = (page - 1) * page_size + 1
+        return parse_price_page(client.getPriceRange(start, start + page_size - 1, year=year, address=address_manager))
+
+    years = list(years)
+    coverage = {
+        "source": "upstream",
+        "years": years,
+        "years_with_data": [],
+        "rows_expected": 0,
+        "rows_received": 0,
+        "pages_fetched": 0,
+        "pages_failed": [],
     }
+    errors = []
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="avg-price") as pool:
+        pending = {pool.submit(fetch, year, 1): (year, 1) for year in years}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                year, page = pending.pop(future)
+                try:
+                    total, rows = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    # 오류 메시지에는 인증키가 포함된 url이 들어 있으므로 종류만 남긴다.
+                    coverage["pages_failed"].append({"year": year, "page": page, "error": type(e).__name__})
+                    continue
+
+                coverage["pages_fetched"] += 1
+                coverage["rows_received"] += len(rows)
+                on_rows(year, rows)
+
+                if page == 1:
+                    coverage["rows_expected"] += total
+                    if total:
+                        coverage["years_with_data"].append(year)
+                    for next_page in range(2, ceil(total / page_size) + 1):
+                        pending[pool.submit(fetch, year, next_page)] = (year, next_page)
+
+    client.close()
+    if errors and coverage["pages_fetched"] == 0:
+        raise errors[0]
+    coverage["years_with_data"].sort()
+    coverage["complete"] = not coverage["pages_failed"] and coverage["rows_received"] >= coverage["rows_expected"]
+    return coverage
+
+
+# startYear부터 현재까지 평균 / 중앙값 전월세가와 분포 통계(stats)를 구해서 dict로 반환한다.
+# 해당 연도들이 로컬에 적재되어 있으면(apps.rent) upstream을 호출하지 않고 DB에서 계산한다.
+def get_avg_price(startYear, address_manager:AddressManager):
+    current_year = datetime.now().year
+    from apps.rent.warehouse import local_avg_price
+    local = local_avg_price(list(range(startYear, current_year + 1)), address_manager)
+    if local is not None:
+        return local
+
+    samples = RentSamples()
 
+    # 페이지 단위로 배열에 모으고, 평균 / 중앙값 / 분위수는 마지막에 한 번에 계산한다.
+    def fold(year, rows):
+        samples.add_rows(rows)
 
+    coverage = fetch_price_rows(range(startYear, current_year + 1), address_manager, fold)
+    coverage["rows_skipped"] = samples.skipped
 
+    result = samples.result()
+    result["coverage"] = coverage
+    return result
 
 
+# UserPrice가 AvgPrice.stats 분포에서 어디쯤인지 계산한다. 둘 중 하나라도 없으면 None.
+def get_user_price_position(user_price, avg_price):
+    if user_price is None or avg_price is None:
+        return None
+    return user_price_position(user_price.security_deposit, user_price.monthly_rent,
+                               user_price.is_year_rent, avg_price.stats)
@@ -1,19 +1,58 @@
+from contextlib import ExitStack
+
 from external.client.a_pick import APickClient
 
+# 등기부 열람을 요청하고 다운로드에 쓸 ic_id를 받는다.
+def request_property_registry(client: APickClient, full_addr: str) -> int:
+    full_addr = (full_addr or "").strip()
+    registry_info = client.view_property_registry(full_addr=full_addr)
+
+    data = registry_info.get("data") or {}
+    if data.get("success") != 1:
+        raise ValueError(f"등기부 생성 미완료: {data!r}")
+
+    ic_id = int(data.get("ic_id") or 0)
+    if not ic_id:
+        raise ValueError("ic_id를 찾을 수 없습니다.")
+    return ic_id
+
 def get_property_registry(full_addr: str) -> bytes:
     client = APickClient()
     try:
-        full_addr = (full_addr or "").strip()
-        registry_info = client.view_property_registry(full_addr=full_addr)
+        ic_id = request_property_registry(client, full_addr)
+        return client.download_property_registry(ic_id=ic_id, stream=False)
+    finally:
+        client.close()
 
-        data = registry_info.get("data") or {}
-        if data.get("success") != 1:
-            raise ValueError(f"등기부 생성 미완료: {data!r}")
+# PDF를 메모리에 모으지 않고 dest 파일에 바로 쓴다. 쓴 byte 수를 반환한다.
+def save_property_registry(full_addr: str, dest) -> int:
+    client = APickClient()
+    try:
+        ic_id = request_property_registry(client, full_addr)
+        return client.download_property_registry(ic_id=ic_id, stream=True, dest=dest)
+    finally:
+        client.close()
 
-        ic_id = int(data.get("ic_id") or 0)
-        if not ic_id:
-            raise ValueError("ic_id를 찾을 수 없습니다.")
 
-        return client.download_property_registry(ic_id=ic_id, stream=False)
-    finally:
-        client.close()
\ No newline at end of file
+# StreamingHttpResponse용 chunk iterator. 응답이 끝나거나 끊기면 close()로 upstream 연결을 정리한다.
+class PropertyRegistryStream:
+    def __init__(self, stack: ExitStack, chunks):
+        self._stack = stack
+        self._chunks = chunks
+
+    def __iter__(self):
+        try:
+            yield from self._chunks
+        finally:
+            self.close()
+
+    def close(self):
+        self._stack.close()
+
+# 열람 요청과 다운로드 연결까지는 미리 해 두어, 실패하면 응답을 시작하기 전에 예외가 나도록 한다.
+def open_property_registry_stream(full_addr: str, chunk_size: int = 64 * 1024) -> PropertyRegistryStream:
+    client = APickClient()
+    ic_id = request_property_registry(client, full_addr)
+    stack = ExitStack()
+    chunks = stack.enter_context(client.stream_property_registry(ic_id, chunk_size=chunk_size))
+    return PropertyRegistryStream(stack, chunks)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+from typing import Dict, List, Optional
+from datetime import datetime, timezone as dt_timezone
+import threading, time
+
+from django.conf import settings
+
+from external.client.seoul_data import DataSeoulClient, service_rows
+
+
+"""
+서울시 실시간 자치구별 대기질(RealtimeCityAir) snapshot.
+  - 백그라운드 thread가 INTERVAL마다 25개 자치구를 한 번에 받아서 새 snapshot을 만들고 참조를 통째로 바꾼다.
+  - snapshot은 만든 뒤에 바꾸지 않으므로 읽을 때 lock이 필요 없다. 요청마다 upstream을 호출하지 않는다.
+  - thread는 처음 조회할 때 시작한다. 아직 snapshot이 없으면 그 조회에서 한 번 받는다.
+  - 받다가 실패하거나 행이 없으면 이전 snapshot을 그대로 두고 RETRY_INTERVAL 뒤에 다시 시도한다.
+    마지막 성공이 MAX_AGE보다 오래되면 응답에 stale=True를 넣는다.
+"""
+
+SERVICE = "RealtimeCityAir"
+# 서울시 자치구 수. 한 번의 요청으로 모두 받는다.
+GU_COUNT = 25
+
+
+def _conf() -> dict:
+    return getattr(settings, "REALTIME_AIR", {})
+
+
+def is_enabled() -> bool:
+    return _conf().get("ENABLED", True)
+
+
+# 한 번 받은 실시간 대기질. 만든 뒤에는 바꾸지 않는다.
+class AirSnapshot:
+    def __init__(self, rows: List[dict], fetched_at: Optional[float] = None):
+        self.by_gu: Dict[str, dict] = {row["MSRSTE_NM"]: row for row in rows if row.get("MSRSTE_NM")}
+        # 측정 시각. 예) 202510181500
+        self.measured_at: Optional[str] = max((row.get("MSRDT") or "" for row in rows), default=None) or None
+        self.fetched_at = fetched_at or time.time()
+
+    def get(self, gu_name: str) -> Optional[dict]:
+        return self.by_gu.get(gu_name)
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class _Poller:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 읽는 쪽은 이 참조만 본다. 교체는 대입 한 번이다.
+        self._snapshot: Optional[AirSnapshot] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_error: Optional[str] = None
+        self.failures = 0
+
+    def poll(self) -> AirSnapshot:
+        client = DataSeoulClient()
+        try:
+            rows = service_rows(client.get_realtime_city_air(start_index=1, end_index=GU_COUNT), SERVICE)
+        finally:
+            client.close()
+        snapshot = AirSnapshot(rows)
+        # 자치구 행이 없으면(INFO-200 등) 실패로 보고 이전 snapshot을 그대로 둔다.
+        if not snapshot.by_gu:
+            raise ValueError(f"{SERVICE} returned no rows")
+        self._snapshot = snapshot
+        self.last_error, self.failures = None, 0
+        return snapshot
+
+    def _poll_safely(self) -> bool:
+        try:
+            self.poll()
+            return True
+        except Exception as e:
+            # 오류 메시지에는 인증키가 포함된 url이 들어 있으므로 종류만 남긴다.
+            self.last_error = type(e).__name__
+            self.failures += 1
+            print(f"realtime air poll error: {self.last_error}")
+            return False
+
+    def _run(self):
+        ok = self._snapshot is not None
+        while not self._stop.wait(_conf().get("INTERVAL", 5 * 60) if ok else _conf().get("RETRY_INTERVAL", 60)):
+            ok = self._poll_safely()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # 처음에는 snapshot을 받을 때까지 기다린다. (동시에 들어온 조회는 lock에서 기다린다)
+            if self._snapshot is None:
+                self._poll_safely()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="realtime-air-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self) -> Optional[AirSnapshot]:
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        return self._snapshot
+
+
+_poller = _Poller()
+
+
+def get_realtime_snapshot() -> Optional[AirSnapshot]:
+    return _poller.snapshot()
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, dt_timezone.utc).isoformat()
+
+
+# 자치구의 실시간 대기질. snapshot이 없거나 자치구가 없으면 None. (네트워크 요청 없음)
+def get_realtime_air(gu_name: str) -> Optional[dict]:
+    snapshot = get_realtime_snapshot()
+    row = snapshot.get(gu_name) if snapshot is not None else None
+    if row is None:
+        return None
+    return {
+        "gu_name": gu_name,
+        "measured_at": row.get("MSRDT"),
+        "fetched_at": _isoformat(snapshot.fetched_at),
+        "stale": snapshot.age() > _conf().get("MAX_AGE", 30 * 60),
+        "data": row,
+    }
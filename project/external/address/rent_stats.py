@@ -0,0 +1,206 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+
+"""
+전월세 통계. (numpy)
+  - 평균 외에 중앙값, 절사평균, 분위수를 구한다. (이상치에 덜 민감하도록)
+  - 임대면적(㎡)당 보증금 / 월세
+  - 전세 ↔ 월세 환산 (settings.RENT_CONVERSION_RATE, 연 이율)
+  - 전세 환산 보증금 분포의 분위수 grid를 저장해 두고, 사용자의 가격이 분포의 어디쯤인지 계산한다.
+금액 단위는 upstream과 같이 만원이다.
+"""
+
+JEONSE, WOLSE = "전세", "월세"
+# 절사평균에서 양쪽 끝에서 버리는 비율.
+TRIM = 0.1
+PERCENTILES = (10, 25, 50, 75, 90)
+# 사용자 위치 계산용 분위수 grid. (0, 5, ..., 100)
+GRID = np.arange(0, 101, 5)
+# 값 배열의 열 순서.
+DEPOSIT, RENT, AREA = 0, 1, 2
+
+
+def conversion_rate() -> float:
+    return float(getattr(settings, "RENT_CONVERSION_RATE", 0.055))
+
+
+# 월세를 전세 보증금으로 환산한다. 보증금 + 월세 × 12 / 전환율
+def to_jeonse(deposit, monthly_rent, rate: Optional[float] = None):
+    rate = rate or conversion_rate()
+    return np.asarray(deposit, dtype=float) + np.asarray(monthly_rent, dtype=float) * 12 / rate
+
+
+# 전세를 보증금 deposit인 월세로 환산한다. (전세 - 보증금) × 전환율 / 12
+def to_wolse(jeonse, deposit, rate: Optional[float] = None):
+    rate = rate or conversion_rate()
+    return np.maximum(np.asarray(jeonse, dtype=float) - np.asarray(deposit, dtype=float), 0) * rate / 12
+
+
+def trimmed_mean(values: np.ndarray, proportion: float = TRIM) -> float:
+    n = values.size
+    k = int(n * proportion)
+    if n - 2 * k <= 0:
+        return float(np.median(values))
+    # 전체 정렬 대신 양쪽 k개만 분리한다.
+    return float(np.partition(values, (k, n - k - 1))[k:n - k].mean())
+
+
+# 값 배열의 요약 통계. 값이 없으면 None.
+def summarize(values) -> Optional[Dict[str, float]]:
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return None
+    p10, p25, p50, p75, p90 = np.percentile(values, PERCENTILES)
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "median": float(p50),
+        "trimmed_mean": trimmed_mean(values),
+        "p10": float(p10),
+        "p25": float(p25),
+        "p75": float(p75),
+        "p90": float(p90),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+
+
+# 면적으로 나눈 값. 면적이 없거나 0이면 제외한다.
+def per_area(values: np.ndarray, areas: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(areas) & (areas > 0)
+    return values[valid] / areas[valid]
+
+
+# value가 분위수 grid에서 몇 percentile인지 (0 ~ 100)
+# 같은 값이 여러 분위에 걸쳐 있으면(예: 보증금이 모두 같은 동네) 그 값은 구간의 가운데, 그 사이 값은 앞 구간의 끝과
+# 뒤 구간의 시작 사이로 보간한다. (중복된 grid를 np.interp에 그대로 넣으면 결과가 한쪽 끝으로 치우친다)
+def percentile_of(value: float, quantiles: List[float]) -> Optional[float]:
+    if not quantiles:
+        return None
+    grid = np.asarray(quantiles, dtype=float)
+    ranks = np.linspace(0, 100, grid.size)
+    xs, first = np.unique(grid, return_index=True)
+    last = np.append(first[1:] - 1, grid.size - 1)
+    i = int(np.searchsorted(xs, value))
+    if i < xs.size and xs[i] == value:
+        return float((ranks[first[i]] + ranks[last[i]]) / 2)
+    if i == 0:
+        return 0.0
+    if i == xs.size:
+        return 100.0
+    return float(np.interp(value, xs[i - 1:i + 1], (ranks[last[i - 1]], ranks[first[i]])))
+
+
+def _number(value) -> float:
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# 전세 / 월세 행을 (보증금, 월세, 면적) 배열 조각으로 모은다. 조각은 마지막에 한 번만 합친다.
+class RentSamples:
+    def __init__(self):
+        self._chunks: Dict[str, List[np.ndarray]] = {JEONSE: [], WOLSE: []}
+        # 금액이 숫자가 아니거나 전세 / 월세가 아닌 행
+        self.skipped = 0
+
+    # upstream 행(dict) 목록을 더한다.
+    def add_rows(self, rows: Iterable[dict]):
+        rows = list(rows)
+        if not rows:
+            return
+        kinds = np.array([row.get("RENT_SE") or "" for row in rows])
+        values = np.array(
+            [(_number(row.get("GRFE")), _number(row.get("RTFE")), _number(row.get("RENT_AREA"))) for row in rows],
+            dtype=float,
+        )
+        self.add_arrays(kinds, values)
+
+    # kinds: 전세 / 월세 배열, values: (n, 3) 보증금 / 월세 / 면적 배열
+    def add_arrays(self, kinds: np.ndarray, values: np.ndarray):
+        if values.size == 0:
+            return
+        valid = ~np.isnan(values[:, DEPOSIT]) & ~np.isnan(values[:, RENT])
+        used = 0
+        for kind in (JEONSE, WOLSE):
+            mask = valid & (kinds == kind)
+            count = int(mask.sum())
+            if count:
+                self._chunks[kind].append(values[mask])
+                used += count
+        self.skipped += len(values) - used
+
+    def values(self, kind: str) -> np.ndarray:
+        chunks = self._chunks[kind]
+        if not chunks:
+            return np.empty((0, 3))
+        if len(chunks) > 1:
+            self._chunks[kind] = chunks = [np.concatenate(chunks)]
+        return chunks[0]
+
+    def count(self, kind: str) -> int:
+        return sum(len(chunk) for chunk in self._chunks[kind])
+
+    # 기존 get_avg_price 반환값(평균)에 중앙값 / 절사평균 / ㎡당 가격 / 환산 분포를 더한 dict.
+    def result(self, rate: Optional[float] = None) -> dict:
+        rate = rate or conversion_rate()
+        jeonse, wolse = self.values(JEONSE), self.values(WOLSE)
+        if len(jeonse) == 0 or len(wolse) == 0:
+            return {
+                'error': "no data found"
+            }
+
+        year_deposit = summarize(jeonse[:, DEPOSIT])
+        month_deposit = summarize(wolse[:, DEPOSIT])
+        month_rent = summarize(wolse[:, RENT])
+        year_per_m2 = summarize(per_area(jeonse[:, DEPOSIT], jeonse[:, AREA]))
+        rent_per_m2 = summarize(per_area(wolse[:, RENT], wolse[:, AREA]))
+        # 전세 + 월세를 전세 보증금으로 환산한 분포.
+        equivalent = np.concatenate([jeonse[:, DEPOSIT], to_jeonse(wolse[:, DEPOSIT], wolse[:, RENT], rate)])
+
+        return {
+            "avg_year_price": year_deposit["mean"],
+            "avg_month_security_price": month_deposit["mean"],
+            "avg_month_rent": month_rent["mean"],
+            "median_year_price": year_deposit["median"],
+            "median_month_security_price": month_deposit["median"],
+            "median_month_rent": month_rent["median"],
+            "year_price_per_m2": year_per_m2["median"] if year_per_m2 else None,
+            "month_rent_per_m2": rent_per_m2["median"] if rent_per_m2 else None,
+            "year_count": len(jeonse),
+            "month_count": len(wolse),
+            "stats": {
+                "conversion_rate": rate,
+                "year_price": year_deposit,
+                "month_security_price": month_deposit,
+                "month_rent": month_rent,
+                "year_price_per_m2": year_per_m2,
+                "month_rent_per_m2": rent_per_m2,
+                "jeonse_equivalent": summarize(equivalent),
+                "jeonse_equivalent_quantiles": np.percentile(equivalent, GRID).tolist(),
+                # 중앙 전세가를 중앙 월세 보증금으로 계약할 때의 월세.
+                "median_jeonse_as_month_rent": float(to_wolse(year_deposit["median"], month_deposit["median"], rate)),
+            },
+        }
+
+
+# 사용자의 전월세가가 전세 환산 분포에서 어디쯤인지. stats는 RentSamples.result()["stats"]
+def user_price_position(security_deposit, monthly_rent, is_year_rent: bool, stats: dict) -> Optional[dict]:
+    quantiles = (stats or {}).get("jeonse_equivalent_quantiles")
+    if not quantiles or security_deposit is None:
+        return None
+    rate = stats.get("conversion_rate") or conversion_rate()
+    deposit = float(security_deposit)
+    rent = 0.0 if is_year_rent else float(monthly_rent or 0)
+    equivalent = float(to_jeonse(deposit, rent, rate))
+    return {
+        "jeonse_equivalent": equivalent,
+        "percentile": percentile_of(equivalent, quantiles),
+        "median": stats.get("jeonse_equivalent", {}).get("median"),
+    }
@@ -0,0 +1,130 @@
+"""
+DB(혹은 파일)에 저장된 데이터를 메모리 표로 올려 두고 쓰는 loader. (air_quality, flood, autocomplete)
+  - CHECK_INTERVAL마다 version()으로 변경을 확인한다. 처음에는 load가 끝날 때까지 기다리고
+    (동시에 들어온 조회도 같이 기다린다), 이후 변경은 백그라운드에서 다시 load 한다.
+  - refresh를 주면 표의 마지막 수집(fetched_at)이 REFRESH_AFTER보다 오래되었을 때 뒤에서 upstream을 다시 받는다.
+    refresh가 실패하거나 저장한 것이 없으면 REFRESH_RETRY부터 두 배씩(최대 REFRESH_AFTER) 기다렸다가 다시 시도한다.
+  - 표는 만든 뒤에 바꾸지 않는다. 일부만 바꿀 때는 update(fn)로 새 표를 만들어 참조를 바꾼다.
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Optional
+from datetime import timedelta
+import logging, threading, time
+
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# 처음 load를 기다리는 최대 시간(초)
+FIRST_LOAD_TIMEOUT = 60
+
+
+class TableLoader:
+    def __init__(self, name: str, conf: Callable[[], dict], version: Callable[[], Any], build: Callable[[], Any],
+                 empty: Callable[[], Any], refresh: Optional[Callable[[], bool]] = None):
+        self.name = name
+        self._conf = conf
+        self._read_version = version
+        self._build = build
+        self._empty = empty
+        # upstream에서 다시 받아서 저장한다. 저장한 것이 있으면 True.
+        self._refresh = refresh
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._current = None
+        self._version = None
+        self._checked = 0.0
+        self._reloading = False
+        self._refreshing = False
+        self._refresh_failures = 0
+        self._next_refresh = 0.0
+
+    def _reload(self, version, background: bool = False):
+        try:
+            table = self._build()
+            with self._lock:
+                self._current, self._version = table, version
+        except Exception as e:
+            logger.exception("%s load error", self.name)
+        finally:
+            with self._lock:
+                self._reloading = False
+            self._loaded.set()
+            if background:
+                # worker thread가 연 DB 연결은 요청 thread와 별개이므로 직접 닫는다.
+                connections.close_all()
+
+    def _refresh_upstream(self):
+        try:
+            stored = self._refresh()
+        except Exception as e:
+            # 오류 메시지에는 인증키가 포함된 url이 들어 있으므로 종류만 남긴다.
+            logger.warning("%s refresh error: %s", self.name, type(e).__name__)
+            stored = False
+        finally:
+            connections.close_all()
+        conf = self._conf()
+        with self._lock:
+            self._refresh_failures = 0 if stored else self._refresh_failures + 1
+            delay = conf.get("CHECK_INTERVAL", 60) if stored else min(
+                conf.get("REFRESH_RETRY", 5 * 60) * 2 ** (self._refresh_failures - 1),
+                conf.get("REFRESH_AFTER", 30 * 24 * 60 * 60),
+            )
+            self._next_refresh = time.monotonic() + delay
+            self._refreshing, self._checked = False, 0.0
+
+    # 다음 조회 때 다시 읽는다.
+    def clear(self):
+        with self._lock:
+            self._current, self._version, self._checked = None, None, 0.0
+            self._loaded.clear()
+
+    # 현재 표를 fn(표)로 바꾼다. (방금 받은 일부만 반영할 때. 전체를 다시 읽지 않는다)
+    def update(self, fn: Callable[[Any], Any]):
+        with self._lock:
+            self._current = fn(self._current if self._current is not None else self._empty())
+
+    def _is_outdated(self, table) -> bool:
+        fetched_at = getattr(table, "fetched_at", None)
+        if fetched_at is None:
+            return True
+        return timezone.now() - fetched_at > timedelta(seconds=self._conf().get("REFRESH_AFTER", 30 * 24 * 60 * 60))
+
+    def _maybe_refresh(self, table):
+        if self._refresh is None or not self._conf().get("AUTO_REFRESH", True) or not self._is_outdated(table):
+            return
+        with self._lock:
+            start = not self._refreshing and time.monotonic() >= self._next_refresh
+            if start:
+                self._refreshing = True
+        if start:
+            threading.Thread(target=self._refresh_upstream, name=f"{self.name}-refresh", daemon=True).start()
+
+    def get(self):
+        now = time.monotonic()
+        if self._current is not None and now - self._checked < self._conf().get("CHECK_INTERVAL", 60):
+            return self._current
+
+        with self._lock:
+            self._checked = now
+            version = self._read_version()
+            first = self._current is None
+            reload = version != self._version and not self._reloading
+            if reload:
+                self._reloading = True
+            waiting = first and not reload and self._reloading
+
+        if reload and first:
+            self._reload(version)
+        elif reload:
+            threading.Thread(target=self._reload, args=(version, True), name=f"{self.name}-reload", daemon=True).start()
+        elif waiting:
+            # 다른 thread가 처음 load 중이다.
+            self._loaded.wait(FIRST_LOAD_TIMEOUT)
+
+        table = self._current if self._current is not None else self._empty()
+        self._maybe_refresh(table)
+        return table
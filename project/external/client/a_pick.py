@@ -1,30 +1,62 @@
-from .base import BaseClient
+from contextlib import contextmanager
+
+from .base import BaseClient, HTTPError
+from .async_base import AsyncBaseClient
 from django.conf import settings
 
+A_PICK_URL = 'https://apick.app/rest/'
+
+def _auth_headers():
+    return {"CL_AUTH_KEY": settings.A_PICK_KEY}
+
+# 등기부 열람 요청 data. None 값은 제거한다.
+def view_property_registry_data(full_addr:str, unique_num=None, type_="집합건물"):
+    data = {
+        "address": full_addr,
+        "unique_num": unique_num,
+        "type": type_,
+    }
+    return {k: v for k, v in data.items() if v is not None}
+
 
 class APickClient(BaseClient):
+    rate_limit_name = "a_pick"
     def __init__(self):
-        super().__init__(base_url='https://apick.app/rest/', timeout=2000)
+        super().__init__(base_url=A_PICK_URL, timeout=2000)
 
     # 주소 검색 함수.
     def view_property_registry(self, full_addr:str, unique_num=None, type_="집합건물"):
-        headers = {"CL_AUTH_KEY": settings.A_PICK_KEY}
-        data = {
-            "address": full_addr,
-            "unique_num": unique_num,
-            "type": type_,
-        }
-        # None 제거.
-        data = {k: v for k, v in data.items() if v is not None}
+        data = view_property_registry_data(full_addr, unique_num, type_)
 
-        response = self.post("iros/1", data=data, headers=headers, is_json=True, multipart=True)
+        response = self.post("iros/1", data=data, headers=_auth_headers(), is_json=True, multipart=True)
 
         return response
 
-    def download_property_registry(self, ic_id:int, *, format="pdf", stream=False):
-        headers = {
-            "CL_AUTH_KEY": settings.A_PICK_KEY,
+    # 등기부 파일을 chunk iterator로 연다. 실패하면 A-Pick은 200 + JSON을 주므로 Content-Type으로 구분한다.
+    @contextmanager
+    def stream_property_registry(self, ic_id:int, *, format="pdf", chunk_size:int = 64 * 1024):
+        data = {
+            "ic_id": ic_id,
+            "format": format,
         }
+        with self.stream_post("iros_download/1", data=data, headers=_auth_headers(), multipart=True) as res:
+            ctype = res.headers.get("Content-Type", "")
+            if "json" in ctype:
+                res.read()
+                raise HTTPError(f"등기부 다운로드 실패: {res.text[:200]}")
+            yield res.iter_bytes(chunk_size)
+
+    # stream=True 이면 dest(쓰기 가능한 파일 객체)에 chunk 단위로 바로 쓰고 쓴 byte 수를 반환한다.
+    def download_property_registry(self, ic_id:int, *, format="pdf", stream=False, dest=None):
+        if stream:
+            if dest is None:
+                raise ValueError("stream=True 에는 dest 파일이 필요합니다.")
+            size = 0
+            with self.stream_property_registry(ic_id, format=format) as chunks:
+                for chunk in chunks:
+                    dest.write(chunk)
+                    size += len(chunk)
+            return size
 
         data = {
             "ic_id": ic_id,
@@ -34,9 +66,28 @@ class APickClient(BaseClient):
         pdf_bytes = self.post(
             "iros_download/1",
             data=data,
-            headers=headers,
+            headers=_auth_headers(),
             is_json=False,
             multipart=True,
+            # 이미 발급된 ic_id를 다시 받는 것이므로 재시도해도 과금되지 않는다.
+            idempotent=True,
         )
 
         return pdf_bytes
+
+
+class AsyncAPickClient(AsyncBaseClient):
+    rate_limit_name = "a_pick"
+    def __init__(self):
+        super().__init__(base_url=A_PICK_URL, timeout=2000)
+
+    async def view_property_registry(self, full_addr:str, unique_num=None, type_="집합건물"):
+        data = view_property_registry_data(full_addr, unique_num, type_)
+        return await self.post("iros/1", data=data, headers=_auth_headers(), is_json=True, multipart=True)
+
+    async def download_property_registry(self, ic_id:int, *, format="pdf"):
+        data = {
+            "ic_id": ic_id,
+            "format": format,
+        }
+        return await self.post("iros_download/1", data=data, headers=_auth_headers(), is_json=False, multipart=True, idempotent=True)
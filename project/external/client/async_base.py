@@ -0,0 +1,155 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+import asyncio, httpx, time
+
+from .errors import HTTPError, CircuitOpenError
+from .base import multipart_files, parse_response
+from .cache import CachePolicy, find_policy, get_response_cache, make_cache_key
+from .pool import get_async_client
+from .resilience import RetryPolicy, get_breaker, is_upstream_failure, make_timeout
+from .metrics import metrics, observe_error, observe_response
+from .ratelimit import get_rate_limiter
+from .singleflight import async_single_flight
+
+
+# BaseClient의 async 버전. get / post의 반환 형태와 HTTPError 처리 방식은 동일하다.
+# ASGI 환경에서 여러 공공데이터 API를 asyncio.gather로 동시에 호출할 때 사용한다.
+class AsyncBaseClient:
+    cache_policies: Dict[str, CachePolicy] = {}
+    retry_options: Dict[str, Any] = {}
+    rate_limit_name: Optional[str] = None
+
+    def __init__(self, base_url:str, timeout: float = 120):
+        self.base_url = base_url
+        self.timeout = timeout
+        self._retry = RetryPolicy.from_settings(**self.retry_options)
+        # circuit breaker는 sync client와 host 단위로 공유한다.
+        self._breaker = get_breaker(base_url)
+
+    # async client는 event loop에 묶이므로 요청 시점의 loop 기준으로 가져온다.
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        return get_async_client(self.base_url, self.timeout)
+
+    def rate_limit_key(self, path: str) -> Optional[str]:
+        return self.rate_limit_name
+
+    # 지표 label. (upstream, endpoint) endpoint에는 인증키가 들어가지 않도록 client별로 재정의한다.
+    def metric_endpoint(self, path: str) -> str:
+        return path.strip("/")
+
+    def metric_labels(self, path: str):
+        return self.rate_limit_key(path) or urlsplit(self.base_url).netloc, self.metric_endpoint(path)
+
+    async def _send(self, method: str, path: str, *, idempotent: bool, **kwargs) -> httpx.Response:
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            # token을 먼저 받는다. (RateLimitExceeded가 half-open probe를 붙잡지 않도록)
+            await self._acquire_rate_limit(path)
+            self._breaker.before_call()
+            sent = time.monotonic()
+            try:
+                res = await self._client.request(method, path, timeout=make_timeout(self.timeout), **kwargs)
+            except httpx.HTTPError as e:
+                observe_error(*self.metric_labels(path), time.monotonic() - sent, e)
+                self._breaker.record_failure()
+                wait = self._retry.next_delay(attempt, started) if self._retry.retry_exception(e, idempotent) else None
+                if wait is None:
+                    raise
+                await asyncio.sleep(wait)
+                continue
+            except BaseException:
+                # upstream 상태와 무관하게 끝났으므로 결과 없이 probe만 놓는다.
+                self._breaker.release()
+                raise
+
+            observe_response(*self.metric_labels(path), time.monotonic() - sent, res)
+            if is_upstream_failure(res):
+                self._breaker.record_failure()
+            else:
+                self._breaker.record_success()
+
+            wait = self._retry.next_delay(attempt, started, res) if self._retry.retry_response(res, idempotent) else None
+            if wait is None:
+                return res
+            await res.aclose()
+            await asyncio.sleep(wait)
+
+    async def _acquire_rate_limit(self, path: str):
+        limiter = get_rate_limiter()
+        name = self.rate_limit_key(path)
+        if limiter is not None and name:
+            await limiter.aacquire(name)
+
+    def is_cacheable(self, data) -> bool:
+        return True
+
+    async def get(self, path:str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        key = make_cache_key(self.base_url, path, params)
+        policy = find_policy(self, path)
+        if policy is None:
+            return await self._coalesced_get(key, path, params)
+
+        cache = get_response_cache()
+        now = time.time()
+        entry = await cache.aget(key)
+        if entry is not None and entry.is_fresh(now):
+            metrics.count_cache(*self.metric_labels(path), "hit")
+            return entry.value
+
+        async def refresh():
+            data = await self._coalesced_get(key, path, params)
+            if not self.is_cacheable(data):
+                raise HTTPError("uncacheable response")
+            return data
+
+        if entry is not None and entry.is_usable(now):
+            metrics.count_cache(*self.metric_labels(path), "stale")
+            cache.arevalidate(key, refresh, policy)
+            return entry.value
+
+        metrics.count_cache(*self.metric_labels(path), "miss")
+        try:
+            data = await self._coalesced_get(key, path, params)
+        except CircuitOpenError:
+            if entry is not None:
+                return entry.value
+            raise
+        if self.is_cacheable(data):
+            await cache.aset(key, data, policy)
+        return data
+
+    async def _coalesced_get(self, key: str, path: str, params: Optional[Dict[str, Any]] = None):
+        return await async_single_flight.do(key, lambda: self._get(path, params))
+
+    async def _get(self, path:str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        try:
+            res = await self._send("GET", path, idempotent=True, params=params)
+            return parse_response(res)
+        except httpx.HTTPError as e:
+            raise HTTPError(str(e)) from e
+
+    async def post(
+        self,
+        path: str,
+        data: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        is_json: bool = True,
+        multipart: bool = False,
+        idempotent: bool = False,
+    ):
+        try:
+            if multipart:
+                res = await self._send("POST", path, idempotent=idempotent, headers=headers, files=multipart_files(data))
+            else:
+                res = await self._send("POST", path, idempotent=idempotent, data=data, headers=headers)
+            return parse_response(res, is_json)
+        except httpx.HTTPError as e:
+            raise HTTPError(str(e)) from e
+
+    # 공유 client는 닫지 않는다. loop 종료 시 pool.aclose_all()을 사용한다.
+    async def close(self):
+        pass
@@ -1,41 +1,160 @@
 from __future__ import annotations
-from typing import Any, Dict, Optional
-import httpx, json, certifi, ssl
+from typing import Any, Dict, Iterator, Optional
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import httpx, json, time
 
+from .errors import HTTPError, CircuitOpenError
+from .pool import get_client
+from .cache import CachePolicy, find_policy, get_response_cache, make_cache_key
+from .resilience import RetryPolicy, get_breaker, is_upstream_failure, make_timeout
+from .metrics import metrics, observe_error, observe_response
+from .ratelimit import get_rate_limiter
+from .singleflight import single_flight
 
-class HTTPError(Exception):
-    pass
+
+# multipart 요청용 files 인자. curl -F와 동일하게 모든 값을 문자열 필드로 보낸다.
+def multipart_files(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {k: (None, str(v)) for k, v in (data or {}).items()}
+
+
+# 응답을 JSON(dict) 혹은 raw bytes로 변환한다. sync / async client가 공유한다.
+def parse_response(res: httpx.Response, is_json: bool = True):
+    res.raise_for_status()
+    if not is_json:
+        return res.content
+    try:
+        return res.json()
+    except ValueError:
+        ctype = res.headers.get("Content-Type", "")
+        raise HTTPError(f"Expected JSON, got '{ctype}'")
 
 # Client를 만드는 기본 클래스 구조.
 class BaseClient:
+    # GET 응답 캐시 정책. path 일부 → CachePolicy. 비어 있으면 캐시하지 않는다.
+    cache_policies: Dict[str, CachePolicy] = {}
+    # 재시도 설정 덮어쓰기. 예) {"max_attempts": 2}
+    retry_options: Dict[str, Any] = {}
+    # rate limit / 일일 할당량을 세는 이름. 같은 API key를 쓰는 요청은 같은 이름을 쓴다. None이면 제한 없음.
+    rate_limit_name: Optional[str] = None
+
     def __init__(self, base_url:str, timeout: float = 120):
         self.base_url = base_url
         self.timeout = timeout
-        
-        ctx = ssl.create_default_context(cafile=certifi.where())
-        try:
-            ctx.set_ciphers("DEFAULT:@SECLEVEL=1")
-        except ssl.SSLError:
-            pass
-        
-        self._client = httpx.Client(
-            base_url=base_url,
-            timeout=timeout,
-            http2=False,
-            verify=ctx,
-            trust_env=False,
-            follow_redirects=True,
-        )
+
+        # base_url 별 공유 client를 사용한다. (keep-alive 연결 재사용)
+        self._client = get_client(base_url, timeout)
+        self._retry = RetryPolicy.from_settings(**self.retry_options)
+        self._breaker = get_breaker(base_url)
+
+    def rate_limit_key(self, path: str) -> Optional[str]:
+        return self.rate_limit_name
+
+    # 지표 label. (upstream, endpoint) endpoint에는 인증키가 들어가지 않도록 client별로 재정의한다.
+    def metric_endpoint(self, path: str) -> str:
+        return path.strip("/")
+
+    def metric_labels(self, path: str):
+        return self.rate_limit_key(path) or urlsplit(self.base_url).netloc, self.metric_endpoint(path)
+
+    # 실제로 네트워크에 나가는 요청마다 token을 하나 쓴다. (캐시 hit은 세지 않는다)
+    def _acquire_rate_limit(self, path: str):
+        limiter = get_rate_limiter()
+        name = self.rate_limit_key(path)
+        if limiter is not None and name:
+            limiter.acquire(name)
+
+    # circuit breaker와 재시도를 거쳐 요청을 보낸다. 최종 응답(상태코드 무관)을 돌려준다.
+    def _send(self, method: str, path: str, *, idempotent: bool, **kwargs) -> httpx.Response:
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            # token을 먼저 받는다. (RateLimitExceeded가 half-open probe를 붙잡지 않도록)
+            self._acquire_rate_limit(path)
+            self._breaker.before_call()
+            sent = time.monotonic()
+            try:
+                res = self._client.request(method, path, timeout=make_timeout(self.timeout), **kwargs)
+            except httpx.HTTPError as e:
+                observe_error(*self.metric_labels(path), time.monotonic() - sent, e)
+                self._breaker.record_failure()
+                wait = self._retry.next_delay(attempt, started) if self._retry.retry_exception(e, idempotent) else None
+                if wait is None:
+                    raise
+                time.sleep(wait)
+                continue
+            except BaseException:
+                # upstream 상태와 무관하게 끝났으므로 결과 없이 probe만 놓는다.
+                self._breaker.release()
+                raise
+
+            observe_response(*self.metric_labels(path), time.monotonic() - sent, res)
+            if is_upstream_failure(res):
+                self._breaker.record_failure()
+            else:
+                self._breaker.record_success()
+
+            wait = self._retry.next_delay(attempt, started, res) if self._retry.retry_response(res, idempotent) else None
+            if wait is None:
+                return res
+            res.close()
+            time.sleep(wait)
+
+    # 오류 응답(200이지만 본문이 에러인 경우)은 캐시하지 않도록 client별로 재정의한다.
+    def is_cacheable(self, data) -> bool:
+        return True
 
     def get(self, path:str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        key = make_cache_key(self.base_url, path, params)
+        policy = find_policy(self, path)
+        if policy is None:
+            return self._coalesced_get(key, path, params)
+
+        cache = get_response_cache()
+        now = time.time()
+        entry = cache.get(key)
+        if entry is not None and entry.is_fresh(now):
+            metrics.count_cache(*self.metric_labels(path), "hit")
+            return entry.value
+
+        def refresh():
+            data = self._coalesced_get(key, path, params)
+            if not self.is_cacheable(data):
+                raise HTTPError("uncacheable response")
+            return data
+
+        # stale 이면 이전 값을 바로 주고 뒤에서 갱신한다.
+        if entry is not None and entry.is_usable(now):
+            metrics.count_cache(*self.metric_labels(path), "stale")
+            cache.revalidate(key, refresh, policy)
+            return entry.value
+
+        # upstream이 죽어 있으면 만료된 값이라도 돌려준다.
+        metrics.count_cache(*self.metric_labels(path), "miss")
+        try:
+            data = self._coalesced_get(key, path, params)
+        except CircuitOpenError:
+            if entry is not None:
+                return entry.value
+            raise
+        if self.is_cacheable(data):
+            cache.set(key, data, policy)
+        return data
+
+    # 같은 요청이 이미 진행 중이면 그 결과를 같이 받는다.
+    def _coalesced_get(self, key: str, path: str, params: Optional[Dict[str, Any]] = None):
+        return single_flight.do(key, lambda: self._get(path, params))
+
+    def _get(self, path:str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         # 메서드 이름 / dict를 반환
         try:
-            res = self._client.get(path, params=params)
-            res.raise_for_status()
-            return res.json()
+            res = self._send("GET", path, idempotent=True, params=params)
+            return parse_response(res)
         except httpx.HTTPError as e:
             raise HTTPError(str(e)) from e
     
+    # idempotent=True 이면 timeout / 5xx 에서도 재시도한다. (같은 요청을 두 번 보내도 되는 경우만)
     def post(
         self,
         path: str,
@@ -43,26 +162,63 @@ class BaseClient:
         headers: Optional[Dict[str, str]] = None,
         is_json: bool = True,
         multipart: bool = False,
+        idempotent: bool = False,
     ):
         try:
             if multipart:
-                files = {k: (None, str(v)) for k, v in (data or {}).items()}  # <= curl -F와 동일
-                res = self._client.post(path, headers=headers, files=files)
+                res = self._send("POST", path, idempotent=idempotent, headers=headers, files=multipart_files(data))
             else:
-                res = self._client.post(path, data=data, headers=headers)
-            res.raise_for_status()
-
-            if is_json:
-                try:
-                    return res.json()
-                except ValueError:
-                    ctype = res.headers.get("Content-Type", "")
-                    raise HTTPError(f"Expected JSON, got '{ctype}'")
-            else:
-                return res.content
+                res = self._send("POST", path, idempotent=idempotent, data=data, headers=headers)
+            return parse_response(res, is_json)
         except httpx.HTTPError as e:
             raise HTTPError(str(e)) from e
     
-    def close(self):
-        self._client.close()
+    # 응답 본문을 메모리에 올리지 않고 읽을 수 있도록 응답 객체를 열어 둔 채로 넘긴다.
+    # with 블록 안에서 res.iter_bytes()로 chunk 단위로 읽는다. 스트림은 재시도하지 않는다.
+    @contextmanager
+    def stream_post(
+        self,
+        path: str,
+        data: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        multipart: bool = False,
+    ) -> Iterator[httpx.Response]:
+        self._acquire_rate_limit(path)
+        self._breaker.before_call()
+        if multipart:
+            kwargs = {"files": multipart_files(data)}
+        else:
+            kwargs = {"data": data}
+        sent = time.monotonic()
+        observed = False
+        # _send와 같이 breaker에 결과를 남긴다. 남기지 못하고 끝나면 probe만 놓는다.
+        recorded = False
+        try:
+            with self._client.stream("POST", path, headers=headers, timeout=make_timeout(self.timeout), **kwargs) as res:
+                if is_upstream_failure(res):
+                    self._breaker.record_failure()
+                else:
+                    self._breaker.record_success()
+                recorded = True
+                try:
+                    res.raise_for_status()
+                    yield res
+                finally:
+                    # 본문을 다 읽은 시점까지를 소요 시간으로 기록한다.
+                    observed = True
+                    observe_response(*self.metric_labels(path), time.monotonic() - sent, res)
+        except httpx.HTTPError as e:
+            if not recorded:
+                # 연결 / 응답 헤더 단계에서 실패했다.
+                self._breaker.record_failure()
+                recorded = True
+            if not observed:
+                observe_error(*self.metric_labels(path), time.monotonic() - sent, e)
+            raise HTTPError(str(e)) from e
+        finally:
+            if not recorded:
+                self._breaker.release()
 
+    # 공유 client는 다른 요청도 사용하므로 닫지 않고 참조만 놓는다.
+    def close(self):
+        pass
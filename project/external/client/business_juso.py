@@ -1,23 +1,63 @@
 # buisiness.juso 사이트의 API 요청을 정리.
 
 from .base import BaseClient
+from .async_base import AsyncBaseClient
+from .cache import CachePolicy
 from django.conf import settings
 
 # 주소 검색 API https://www.vworld.kr/dev/v4dv_search2_s001.do
 
+BUSINESS_JUSO_URL = 'https://business.juso.go.kr/'
+SEARCH_ADDRESS_PATH = 'addrlink/addrLinkApi.do'
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# 주소 체계는 자주 바뀌지 않으므로 하루 동안 캐시한다.
+CACHE_POLICIES = {
+    "addrLinkApi": CachePolicy(ttl=DAY, stale_ttl=7 * DAY),
+}
+
+# 정상 응답만 캐시한다.
+def is_juso_cacheable(data) -> bool:
+    common = (data or {}).get("results", {}).get("common", {})
+    return common.get("errorCode") == "0"
+
+# 주소 검색 parameter. sync / async client가 공유한다.
+def search_address_params(query:str, size:int = 10, page:int = 1):
+    return {
+        "confmKey":settings.BUSINESS_JUSO_KEY,
+        "currentPage":page,
+        "countPerPage":size,
+        "keyword":query,
+        "resultType":"json",
+    }
+
 class BusinessJusoClient(BaseClient):
+    rate_limit_name = "business_juso"
+    cache_policies = CACHE_POLICIES
+
     def __init__(self):
-        super().__init__(base_url='https://business.juso.go.kr/')
+        super().__init__(base_url=BUSINESS_JUSO_URL)
+
+    def is_cacheable(self, data) -> bool:
+        return is_juso_cacheable(data)
 
     # 주소 검색 함수.
     def search_address(self, query:str, size:int = 10, page: int = 1):
-        params = {
-            "confmKey":settings.BUSINESS_JUSO_KEY,
-            "currentPage":page,
-            "countPerPage":size,
-            "keyword":query,
-            "resultType":"json",
-        }
-        response = self.get('addrlink/addrLinkApi.do', params=params)
+        response = self.get(SEARCH_ADDRESS_PATH, params=search_address_params(query, size, page))
         
-        return response
\ No newline at end of file
+        return response
+
+class AsyncBusinessJusoClient(AsyncBaseClient):
+    rate_limit_name = "business_juso"
+    cache_policies = CACHE_POLICIES
+
+    def __init__(self):
+        super().__init__(base_url=BUSINESS_JUSO_URL)
+
+    def is_cacheable(self, data) -> bool:
+        return is_juso_cacheable(data)
+
+    async def search_address(self, query:str, size:int = 10, page: int = 1):
+        return await self.get(SEARCH_ADDRESS_PATH, params=search_address_params(query, size, page))
@@ -0,0 +1,305 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, NamedTuple, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio, copy, hashlib, json, logging, random, sqlite3, threading, time
+
+from django.conf import settings
+
+
+"""
+외부 API GET 응답 캐시.
+  - 1차: 프로세스 내부 LRU (크기 제한)
+  - 2차: 여러 gunicorn worker가 공유하는 저장소 (SQLite 파일 / Django cache)
+  - fresh 기간이 지나도 stale 기간 안이면 이전 값을 바로 돌려주고 뒤에서 갱신한다. (stale-while-revalidate)
+client는 cache_policies 에 path 일부 → CachePolicy 를 선언한 경우에만 캐시를 사용한다.
+저장하거나 돌려주는 값은 복사본이다. (호출한 쪽에서 값을 고쳐도 캐시가 바뀌지 않는다)
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class CachePolicy(NamedTuple):
+    # 이 시간(초) 동안은 upstream 호출 없이 캐시를 그대로 쓴다.
+    ttl: float
+    # ttl 이후 이 시간(초)까지는 캐시를 돌려주면서 백그라운드로 갱신한다.
+    stale_ttl: float = 0
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+    def is_usable(self, now: float) -> bool:
+        return now < self.stale_until
+
+
+# base_url + path + 정렬된 params로 캐시 key를 만든다.
+def make_cache_key(base_url: str, path: str, params: Optional[Dict[str, Any]] = None) -> str:
+    normalized = sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None)
+    raw = json.dumps([base_url.rstrip("/"), "/" + path.lstrip("/"), normalized], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# client의 cache_policies와 settings.HTTP_CACHE["POLICIES"]에서 path에 맞는 정책을 찾는다.
+# settings 쪽은 client 이름(Async 접두어 제외)별로 덮어쓸 수 있다. 예) {"DataSeoulClient": {"tbLnOpendataRentV": [3600, 86400]}}
+def find_policy(client, path: str) -> Optional[CachePolicy]:
+    conf = getattr(settings, "HTTP_CACHE", {})
+    if not conf.get("ENABLED", True):
+        return None
+
+    name = type(client).__name__.removeprefix("Async")
+    policies = {
+        **getattr(client, "cache_policies", {}),
+        **conf.get("POLICIES", {}).get(name, {}),
+    }
+    for fragment, policy in policies.items():
+        if fragment in path:
+            return policy if isinstance(policy, CachePolicy) else CachePolicy(*policy)
+    return None
+
+
+# 프로세스 내부 LRU. 항목 수와 대략적인 byte 크기로 제한한다.
+class LocMemTier:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, tuple[CacheEntry, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key: str, entry: CacheEntry, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (entry, size)
+            self._bytes += size
+            # 오래 안 쓴 것부터 제거한다.
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+
+    def delete(self, key: str):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+
+# 여러 worker가 공유하는 SQLite 파일 저장소.
+class SQLiteTier:
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS http_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " fresh_until REAL NOT NULL, stale_until REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        row = self._conn().execute(
+            "SELECT value, fresh_until, stale_until FROM http_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def set(self, key: str, entry: CacheEntry, encoded: str):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO http_cache (key, value, fresh_until, stale_until) VALUES (?, ?, ?, ?)",
+            (key, encoded, entry.fresh_until, entry.stale_until),
+        )
+        # 가끔씩 만료된 항목을 정리한다.
+        if random.random() < 1 / 256:
+            conn.execute("DELETE FROM http_cache WHERE stale_until < ?", (time.time(),))
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM http_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM http_cache")
+
+
+# settings.CACHES의 alias를 사용하는 저장소. (redis / memcached 등을 설정한 경우)
+class DjangoCacheTier:
+    def __init__(self, alias: str = "default"):
+        self.alias = alias
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raw = self._cache.get(f"http_cache:{key}")
+        return CacheEntry(*raw) if raw is not None else None
+
+    def set(self, key: str, entry: CacheEntry, encoded: str):
+        timeout = max(1, int(entry.stale_until - time.time()))
+        self._cache.set(f"http_cache:{key}", tuple(entry), timeout=timeout)
+
+    def delete(self, key: str):
+        self._cache.delete(f"http_cache:{key}")
+
+    def clear(self):
+        self._cache.clear()
+
+
+class ResponseCache:
+    def __init__(self, local: LocMemTier, shared=None):
+        self.local = local
+        self.shared = shared
+        # 같은 key를 중복으로 갱신하지 않도록 진행 중인 key를 기록한다.
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="http-cache-refresh")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.local.get(key)
+        # 로컬 값이 fresh가 아니면 다른 worker가 이미 갱신했을 수 있으므로 공유 저장소를 확인한다.
+        if self.shared is not None and (entry is None or not entry.is_fresh(time.time())):
+            try:
+                shared = self.shared.get(key)
+            except Exception:
+                logger.warning("http cache read error", exc_info=True)
+                shared = None
+            # 더 새로운 쪽을 쓴다. 공유 저장소 hit은 로컬 LRU로 올린다.
+            if shared is not None and (entry is None or shared.fresh_until > entry.fresh_until):
+                self.local.set(key, shared, len(json.dumps(shared.value, ensure_ascii=False)))
+                entry = shared
+        if entry is None:
+            return None
+        return entry._replace(value=copy.deepcopy(entry.value))
+
+    def set(self, key: str, value: Any, policy: CachePolicy):
+        now = time.time()
+        encoded = json.dumps(value, ensure_ascii=False)
+        entry = CacheEntry(copy.deepcopy(value), now + policy.ttl, now + policy.ttl + policy.stale_ttl)
+        self.local.set(key, entry, len(encoded))
+        if self.shared is not None:
+            try:
+                self.shared.set(key, entry, encoded)
+            except Exception:
+                logger.warning("http cache write error", exc_info=True)
+
+    # async client용. 공유 저장소 I/O는 event loop를 막지 않도록 thread에서 한다.
+    async def aget(self, key: str) -> Optional[CacheEntry]:
+        entry = self.local.get(key)
+        if self.shared is None or (entry is not None and entry.is_fresh(time.time())):
+            return entry._replace(value=copy.deepcopy(entry.value)) if entry is not None else None
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, policy: CachePolicy):
+        if self.shared is None:
+            self.set(key, value, policy)
+        else:
+            await asyncio.to_thread(self.set, key, value, policy)
+
+    def delete(self, key: str):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def _claim(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release(self, key: str):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    # stale 항목을 백그라운드 thread에서 다시 받아온다.
+    def revalidate(self, key: str, fetch: Callable[[], Any], policy: CachePolicy):
+        if not self._claim(key):
+            return
+
+        def run():
+            try:
+                self.set(key, fetch(), policy)
+            except Exception as e:
+                # 오류 메시지에는 인증키가 포함된 url이 들어 있을 수 있으므로 종류만 남긴다.
+                logger.warning("http cache refresh error: %s", type(e).__name__)
+            finally:
+                self._release(key)
+
+        self._executor.submit(run)
+
+    # async client용. 현재 event loop에서 task로 갱신한다.
+    def arevalidate(self, key: str, fetch, policy: CachePolicy):
+        if not self._claim(key):
+            return
+
+        async def run():
+            try:
+                await self.aset(key, await fetch(), policy)
+            except Exception as e:
+                # 오류 메시지에는 인증키가 포함된 url이 들어 있을 수 있으므로 종류만 남긴다.
+                logger.warning("http cache refresh error: %s", type(e).__name__)
+            finally:
+                self._release(key)
+
+        asyncio.get_running_loop().create_task(run())
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+# settings.HTTP_CACHE 설정으로 프로세스 공용 ResponseCache를 만든다.
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                conf = getattr(settings, "HTTP_CACHE", {})
+                local = LocMemTier(
+                    max_entries=conf.get("LOCAL_MAX_ENTRIES", 1024),
+                    max_bytes=conf.get("LOCAL_MAX_BYTES", 64 * 1024 * 1024),
+                )
+                backend = conf.get("SHARED")
+                if backend == "sqlite":
+                    shared = SQLiteTier(conf["SQLITE_PATH"])
+                elif backend == "django":
+                    shared = DjangoCacheTier(conf.get("DJANGO_CACHE_ALIAS", "default"))
+                else:
+                    shared = None
+                _cache = ResponseCache(local, shared)
+    return _cache
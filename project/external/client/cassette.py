@@ -0,0 +1,189 @@
+from __future__ import annotations
+from typing import Optional
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import asyncio, base64, hashlib, json, re, time
+
+import httpx
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .errors import CassetteMissingError
+
+
+"""
+외부 API record / replay transport. (네트워크 없이 부하 테스트하기 위함)
+  - record: 실제로 요청을 보내고 응답을 cassette 파일로 저장한다.
+  - replay: 네트워크에 나가지 않고 저장된 응답을 돌려준다. 지정한 지연 시간을 흉내낸다.
+cassette key에서는 인증키를 지우므로 다른 키(혹은 가짜 키)를 가진 환경에서도 재생할 수 있다.
+"""
+
+OFF, RECORD, REPLAY = "off", "record", "replay"
+MODES = (OFF, RECORD, REPLAY)
+
+# query string에 들어가는 인증키 이름.
+SECRET_PARAMS = {"serviceKey", "confmKey", "ServiceKey"}
+# path 등에 그대로 들어가는 인증키 settings 이름.
+SECRET_SETTINGS = (
+    "SEOUL_DATA_KEY", "AIR_QUALITY_KEY", "BUSINESS_JUSO_KEY",
+    "DATA_GO_KR_ENCODING_KEY", "DATA_GO_KR_DECODING_KEY", "A_PICK_KEY",
+)
+# 재생할 때 다시 계산되어야 하는 헤더.
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def _secret_segments():
+    # 키가 설정되지 않은 환경에서는 path에 "None"이 들어가므로 그것도 지운다.
+    return {str(getattr(settings, name, None)) for name in SECRET_SETTINGS}
+
+
+# 인증키를 지운 URL.
+def redact_url(url: httpx.URL) -> str:
+    parts = urlsplit(str(url))
+    secrets = _secret_segments()
+    path = "/".join("***" if seg in secrets else seg for seg in parts.path.split("/"))
+    query = urlencode([
+        (k, "***" if k in SECRET_PARAMS else v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+    ])
+    return urlunsplit((parts.scheme, parts.netloc, path, query, ""))
+
+
+# multipart boundary는 요청마다 달라지므로 고정값으로 바꿔서 hash 한다.
+def _normalized_body(request: httpx.Request) -> bytes:
+    # multipart 요청은 stream이므로 먼저 읽어 둔다. (읽은 내용은 request에 남아 그대로 전송된다)
+    body = request.read()
+    match = re.search(r"boundary=([^;]+)", request.headers.get("Content-Type", ""))
+    if match:
+        body = body.replace(match.group(1).encode(), b"BOUNDARY")
+    return body
+
+
+def cassette_key(request: httpx.Request) -> str:
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(redact_url(request.url).encode())
+    digest.update(_normalized_body(request))
+    return digest.hexdigest()
+
+
+class _Cassette:
+    def __init__(self, directory, latency=None):
+        self.directory = Path(directory)
+        # 숫자면 모든 요청에 같은 지연, dict면 host 별 지연, None이면 기록된 소요 시간을 그대로 쓴다.
+        self.latency = latency
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def load(self, request: httpx.Request) -> dict:
+        path = self._path(cassette_key(request))
+        if not path.exists():
+            # 네트워크 오류(ConnectError)로 보내면 재시도되고 breaker 실패로 세어지므로 별도 오류로 바로 실패한다.
+            raise CassetteMissingError(f"no cassette for {request.method} {redact_url(request.url)}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save(self, request: httpx.Request, response: httpx.Response, elapsed: float):
+        path = self._path(cassette_key(request))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "request": {"method": request.method, "url": redact_url(request.url)},
+            "response": {
+                "status": response.status_code,
+                "headers": [(k, v) for k, v in response.headers.items() if k.lower() not in DROP_HEADERS],
+                "body": base64.b64encode(response.content).decode("ascii"),
+            },
+            "elapsed": elapsed,
+        }
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+
+    def delay(self, request: httpx.Request, record: dict) -> float:
+        if self.latency is None:
+            return float(record.get("elapsed", 0))
+        if isinstance(self.latency, dict):
+            return float(self.latency.get(request.url.host, self.latency.get("default", 0)))
+        return float(self.latency)
+
+    @staticmethod
+    def to_response(request: httpx.Request, record: dict) -> httpx.Response:
+        res = record["response"]
+        return httpx.Response(
+            res["status"],
+            headers=res["headers"],
+            content=base64.b64decode(res["body"]),
+            request=request,
+        )
+
+
+class CassetteTransport(httpx.BaseTransport):
+    def __init__(self, mode: str, directory, latency=None, inner: Optional[httpx.BaseTransport] = None):
+        self.mode = mode
+        self.cassette = _Cassette(directory, latency)
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == REPLAY:
+            record = self.cassette.load(request)
+            time.sleep(self.cassette.delay(request, record))
+            return self.cassette.to_response(request, record)
+
+        started = time.monotonic()
+        response = self.inner.handle_request(request)
+        response.read()
+        self.cassette.save(request, response, time.monotonic() - started)
+        return response
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    def __init__(self, mode: str, directory, latency=None, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.mode = mode
+        self.cassette = _Cassette(directory, latency)
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        if self.mode == REPLAY:
+            record = self.cassette.load(request)
+            await asyncio.sleep(self.cassette.delay(request, record))
+            return self.cassette.to_response(request, record)
+
+        started = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        await response.aread()
+        self.cassette.save(request, response, time.monotonic() - started)
+        return response
+
+    async def aclose(self):
+        if self.inner is not None:
+            await self.inner.aclose()
+
+
+# 모르는 값이면 record(실제 호출)로 넘어가지 않도록 바로 실패한다. 대소문자는 구분하지 않는다.
+def cassette_mode() -> str:
+    mode = str(getattr(settings, "HTTP_CASSETTE", {}).get("MODE", OFF) or OFF).strip().lower()
+    if mode not in MODES:
+        raise ImproperlyConfigured(f"HTTP_CASSETTE['MODE'] must be one of {MODES}, got {mode!r}")
+    return mode
+
+
+# 설정이 켜져 있으면 cassette transport를, 아니면 None을 반환한다.
+def get_cassette_transport(inner: Optional[httpx.BaseTransport] = None) -> Optional[CassetteTransport]:
+    mode = cassette_mode()
+    if mode == OFF:
+        return None
+    conf = settings.HTTP_CASSETTE
+    return CassetteTransport(mode, conf["DIR"], conf.get("LATENCY"), inner or httpx.HTTPTransport())
+
+
+def get_async_cassette_transport(inner: Optional[httpx.AsyncBaseTransport] = None) -> Optional[AsyncCassetteTransport]:
+    mode = cassette_mode()
+    if mode == OFF:
+        return None
+    conf = settings.HTTP_CASSETTE
+    return AsyncCassetteTransport(mode, conf["DIR"], conf.get("LATENCY"), inner or httpx.AsyncHTTPTransport())
@@ -2,41 +2,108 @@
 from external.address.address_manager import AddressManager
 
 from .base import BaseClient
+from .async_base import AsyncBaseClient
+from .cache import CachePolicy
 from django.conf import settings
 
+DATA_GO_KR_URL = 'https://apis.data.go.kr/'
+
+DAY = 24 * 60 * 60
+
+# 건축물대장과 침수 이력은 거의 바뀌지 않는다.
+CACHE_POLICIES = {
+    "BldRgstHubService": CachePolicy(ttl=7 * DAY, stale_ttl=30 * DAY),
+    "InquireAdmCtyFLService_v2": CachePolicy(ttl=DAY, stale_ttl=30 * DAY),
+}
+
+# header.resultCode가 있으면 정상 코드일 때만 캐시한다.
+def is_data_go_kr_cacheable(data) -> bool:
+    if not isinstance(data, dict):
+        return False
+    header = (data.get("response") or {}).get("header") or {}
+    code = header.get("resultCode")
+    return code is None or code in ("00", "0", "000")
+
+# 건축HUB 건축물대장 조회 요청 (path, params). rows가 있으면 page 번째 페이지를 rows개씩 요청한다.
+def building_request(path:str, address:AddressManager, page:int = 1, rows:int = None):
+    params = {
+        "serviceKey": settings.DATA_GO_KR_DECODING_KEY,
+        "sigunguCd": address.cggCd,
+        "bjdongCd": address.stdgCd,
+        "bun": address.lnbrMnnm,
+        "ji": address.lnbrSlno,
+        "_type": "json",
+    }
+    if rows:
+        params.update(pageNo=str(page), numOfRows=str(rows))
+    return f"1613000/BldRgstHubService{path}", params
+
+# 행정구역 침수 이력 조회 요청 (path, params). admCd 앞 5자리로 시도/시군구를 구분한다.
+def flood_request(path:str, address:AddressManager, page:int = 1, rows:int = 10):
+    return flood_region_request(path, address.admCd[:2], address.admCd[2:5], page, rows)
+
+# 시도 코드(2자리) / 시군구 코드(3자리)로 page 번째 페이지를 rows개씩 요청한다.
+def flood_region_request(path:str, ctpv_cd:str, sgg_cd:str, page:int = 1, rows:int = 10):
+    params = {
+        "serviceKey": settings.DATA_GO_KR_DECODING_KEY,
+        "pageNo": str(page),
+        "numOfRows": str(rows),
+        "stdCtpvCd": ctpv_cd,
+        "stdgSggCd": sgg_cd,
+        "type": "json",
+    }
+    return f"1480964/InquireAdmCtyFLService_v2{path}", params
+
 # 건축물대장 정보 조회 등이 포함됨. address 객체는 이미 search가 끝난 상태라고 가정한다.(initialize.)
 class DataGoKrClient(BaseClient):
-    def __init__(self, ):
-        super().__init__(base_url='https://apis.data.go.kr/')
+    rate_limit_name = "data_go_kr"
+    cache_policies = CACHE_POLICIES
+
+    def __init__(self, timeout: float = 120):
+        super().__init__(base_url=DATA_GO_KR_URL, timeout=timeout)
         self.basic_params = {
             "serviceKey": settings.DATA_GO_KR_DECODING_KEY,
         }
-    # 건축HUB 건축물대장 표제부 조회.
-    def getBuildingAPI(self, path='/getBrTitleInfo', address:AddressManager = None):
-        address = address
-        params = {
-            **self.basic_params,
-            "sigunguCd": address.cggCd,
-            "bjdongCd": address.stdgCd,
-            "bun": address.lnbrMnnm,
-            "ji": address.lnbrSlno,
-            "_type": "json",
-        }
-        response = self.get(f"1613000/BldRgstHubService{path}", params=params)
+
+    def is_cacheable(self, data) -> bool:
+        return is_data_go_kr_cacheable(data)
+
+    # 건축HUB 건축물대장 조회. 기본은 표제부.
+    def getBuildingAPI(self, path='/getBrTitleInfo', address:AddressManager = None, page:int = 1, rows:int = None):
+        url, params = building_request(path, address, page, rows)
+        response = self.get(url, params=params)
         
         return response
     
     def getFloodByAddress(self, path='/get-list_v2', address:AddressManager = None):
-        address = address
-        params = {
-            **self.basic_params,
-            "pageNo": "1",
-            "numOfRows": "10",
-            "stdCtpvCd": address.admCd[:2],
-            "stdgSggCd": address.admCd[2:5],
-            "type": "json",
-        }
-        print(params)
-        response = self.get(f"1480964/InquireAdmCtyFLService_v2{path}", params=params)
+        url, params = flood_request(path, address)
+        response = self.get(url, params=params)
+
+        return response
+
+    # 시도 / 시군구 단위 침수 이력 한 페이지.
+    def getFloodByRegion(self, ctpv_cd:str, sgg_cd:str, page:int = 1, rows:int = 100, path='/get-list_v2'):
+        url, params = flood_region_request(path, ctpv_cd, sgg_cd, page, rows)
+        return self.get(url, params=params)
+
+class AsyncDataGoKrClient(AsyncBaseClient):
+    rate_limit_name = "data_go_kr"
+    cache_policies = CACHE_POLICIES
+
+    def __init__(self):
+        super().__init__(base_url=DATA_GO_KR_URL)
+
+    def is_cacheable(self, data) -> bool:
+        return is_data_go_kr_cacheable(data)
+
+    async def getBuildingAPI(self, path='/getBrTitleInfo', address:AddressManager = None, page:int = 1, rows:int = None):
+        url, params = building_request(path, address, page, rows)
+        return await self.get(url, params=params)
+
+    async def getFloodByAddress(self, path='/get-list_v2', address:AddressManager = None):
+        url, params = flood_request(path, address)
+        return await self.get(url, params=params)
 
-        return response
\ No newline at end of file
+    async def getFloodByRegion(self, ctpv_cd:str, sgg_cd:str, page:int = 1, rows:int = 100, path='/get-list_v2'):
+        url, params = flood_region_request(path, ctpv_cd, sgg_cd, page, rows)
+        return await self.get(url, params=params)
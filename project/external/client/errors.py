@@ -0,0 +1,19 @@
+# external client 계층에서 사용하는 예외.
+
+class HTTPError(Exception):
+    pass
+
+
+# circuit breaker가 열려 있어 upstream을 호출하지 않고 바로 실패한 경우.
+class CircuitOpenError(HTTPError):
+    pass
+
+
+# rate limit 대기 시간이 deadline을 넘거나 일일 할당량을 다 쓴 경우.
+class RateLimitExceeded(HTTPError):
+    pass
+
+
+# replay 모드에서 요청에 맞는 cassette가 없는 경우. 재시도하지 않고 circuit breaker에도 세지 않는다.
+class CassetteMissingError(HTTPError):
+    pass
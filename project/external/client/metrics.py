@@ -0,0 +1,159 @@
+from __future__ import annotations
+from typing import Dict, Optional, Tuple
+from bisect import bisect_left
+from collections import Counter
+import os, threading, time
+
+import httpx
+
+
+"""
+외부 API 호출 지표. (upstream / endpoint 별)
+  - 지연 시간 histogram (ms bucket) → p50 / p95 / p99
+  - 상태코드별 호출 수, timeout 수, 주고받은 byte 수, 캐시 hit 수
+worker 프로세스 단위로 메모리에만 모은다. /monitoring/metrics/ 에서 조회한다.
+"""
+
+# histogram bucket 상한(ms). 마지막 bucket은 그 이상 전부.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    # bucket 안에서는 선형 보간으로 분위수를 추정한다.
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS_MS[i - 1] if i > 0 else 0.0
+                # 관측된 최댓값보다 큰 값을 추정하지 않도록 상한을 max로 자른다.
+                upper = min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+                lower = min(lower, upper)
+                return round(lower + (upper - lower) * (rank - seen) / n, 2)
+            seen += n
+        return round(self.max, 2)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 2) if self.count else None,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max, 2),
+            "buckets": {
+                (f"le_{b}" if i < len(BUCKETS_MS) else "inf"): n
+                for i, (b, n) in enumerate(zip(BUCKETS_MS + (None,), self.counts))
+            },
+        }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = Counter()
+        self.timeouts = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.cache = Counter()
+
+    def as_dict(self) -> dict:
+        return {
+            "latency": self.latency.as_dict(),
+            "statuses": dict(self.statuses),
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "cache": dict(self.cache),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], EndpointStats] = {}
+        self.started = time.time()
+
+    def _get(self, upstream: str, endpoint: str) -> EndpointStats:
+        key = (upstream, endpoint)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats.setdefault(key, EndpointStats())
+        return stats
+
+    # upstream 호출 1회를 기록한다. 응답을 못 받았으면 status=None.
+    def observe(
+        self,
+        upstream: str,
+        endpoint: str,
+        elapsed: float,
+        status: Optional[int] = None,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        timeout: bool = False,
+    ):
+        with self._lock:
+            stats = self._get(upstream, endpoint)
+            stats.latency.observe(elapsed * 1000)
+            stats.statuses[str(status) if status is not None else "error"] += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            if timeout:
+                stats.timeouts += 1
+            if status is None or status >= 500:
+                stats.errors += 1
+
+    # 캐시 결과(hit / stale / miss)를 센다.
+    def count_cache(self, upstream: str, endpoint: str, outcome: str):
+        with self._lock:
+            self._get(upstream, endpoint).cache[outcome] += 1
+
+    # {upstream: {endpoint: {...}}}
+    def snapshot(self) -> dict:
+        with self._lock:
+            result: Dict[str, dict] = {}
+            for (upstream, endpoint), stats in sorted(self._stats.items()):
+                result.setdefault(upstream, {})[endpoint] = stats.as_dict()
+        return {
+            "pid": os.getpid(),
+            "since": self.started,
+            "upstreams": result,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started = time.time()
+
+
+# 프로세스 공용 인스턴스.
+metrics = MetricsRegistry()
+
+
+def observe_response(upstream: str, endpoint: str, elapsed: float, res):
+    metrics.observe(
+        upstream, endpoint, elapsed,
+        status=res.status_code,
+        bytes_sent=int(res.request.headers.get("Content-Length") or 0),
+        bytes_received=res.num_bytes_downloaded,
+    )
+
+
+def observe_error(upstream: str, endpoint: str, elapsed: float, exc: Exception):
+    metrics.observe(upstream, endpoint, elapsed, timeout=isinstance(exc, httpx.TimeoutException))
@@ -0,0 +1,133 @@
+from __future__ import annotations
+from typing import Dict
+import asyncio, os, ssl, threading, weakref
+from functools import lru_cache
+
+import certifi, httpx
+from django.conf import settings
+
+from .cassette import get_async_cassette_transport, get_cassette_transport
+
+
+# base_url 별로 httpx.Client를 하나만 만들어 프로세스 전체에서 공유한다.
+# httpx.Client는 thread-safe 하므로 요청/worker thread 사이에서 keep-alive 연결을 재사용할 수 있다.
+_lock = threading.Lock()
+_clients: Dict[str, httpx.Client] = {}
+# httpx.AsyncClient는 event loop에 묶이므로 loop 별로 따로 보관한다.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+# fork 이후에는 부모의 소켓을 공유하면 안 되므로 pid를 기억해 둔다.
+_pid = os.getpid()
+
+
+# 인증서 로딩은 비싸므로 SSL context는 한 번만 만든다.
+@lru_cache(maxsize=1)
+def get_ssl_context() -> ssl.SSLContext:
+    ctx = ssl.create_default_context(cafile=certifi.where())
+    try:
+        ctx.set_ciphers("DEFAULT:@SECLEVEL=1")
+    except ssl.SSLError:
+        pass
+    return ctx
+
+
+# settings.HTTP_POOL 에서 connection pool 크기를 읽는다.
+def get_pool_limits() -> httpx.Limits:
+    conf = getattr(settings, "HTTP_POOL", {})
+    return httpx.Limits(
+        max_connections=conf.get("MAX_CONNECTIONS", 100),
+        max_keepalive_connections=conf.get("MAX_KEEPALIVE_CONNECTIONS", 20),
+        keepalive_expiry=conf.get("KEEPALIVE_EXPIRY", 30.0),
+    )
+
+
+# sync / async client 공통 옵션.
+def client_options(base_url: str, timeout: float) -> dict:
+    return {
+        "base_url": base_url,
+        "timeout": timeout,
+        "http2": False,
+        "verify": get_ssl_context(),
+        "trust_env": False,
+        "follow_redirects": True,
+        "limits": get_pool_limits(),
+    }
+
+
+# cassette transport 안쪽에서 실제 연결을 맺는 transport 옵션. (client 옵션과 동일한 SSL / pool 설정)
+def transport_options() -> dict:
+    return {
+        "verify": get_ssl_context(),
+        "http2": False,
+        "trust_env": False,
+        "limits": get_pool_limits(),
+    }
+
+
+# record / replay 설정이 켜져 있으면 client에 cassette transport를 끼운다.
+def _sync_options(base_url: str, timeout: float) -> dict:
+    options = client_options(base_url, timeout)
+    transport = get_cassette_transport(httpx.HTTPTransport(**transport_options()))
+    if transport is not None:
+        options["transport"] = transport
+    return options
+
+
+def _async_options(base_url: str, timeout: float) -> dict:
+    options = client_options(base_url, timeout)
+    transport = get_async_cassette_transport(httpx.AsyncHTTPTransport(**transport_options()))
+    if transport is not None:
+        options["transport"] = transport
+    return options
+
+
+def _reset_after_fork():
+    global _pid
+    if _pid != os.getpid():
+        _clients.clear()
+        _async_clients.clear()
+        _pid = os.getpid()
+
+
+# base_url에 해당하는 공유 client를 반환한다. 없거나 닫혀 있으면 새로 만든다.
+def get_client(base_url: str, timeout: float = 120) -> httpx.Client:
+    client = _clients.get(base_url)
+    if client is not None and not client.is_closed and _pid == os.getpid():
+        return client
+
+    with _lock:
+        _reset_after_fork()
+        client = _clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.Client(**_sync_options(base_url, timeout))
+            _clients[base_url] = client
+        return client
+
+
+# 현재 event loop에서 base_url에 해당하는 공유 async client를 반환한다.
+def get_async_client(base_url: str, timeout: float = 120) -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        _reset_after_fork()
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(**_async_options(base_url, timeout))
+            clients[base_url] = client
+        return client
+
+
+# 현재 event loop의 async client를 모두 닫는다. loop 종료 전에 호출한다.
+async def aclose_all():
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.pop(loop, {})
+    for client in clients.values():
+        await client.aclose()
+
+
+# 모든 공유 client를 닫는다. (테스트 / 프로세스 종료용)
+def close_all():
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
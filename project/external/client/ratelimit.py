@@ -0,0 +1,170 @@
+from __future__ import annotations
+from typing import Dict, NamedTuple, Optional
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import asyncio, sqlite3, threading, time
+
+from django.conf import settings
+
+from .errors import RateLimitExceeded
+
+
+"""
+upstream API key 별 token bucket rate limiter.
+  - bucket 상태와 일별 호출 수를 SQLite 파일에 두어 여러 gunicorn worker가 같은 한도를 공유한다.
+  - token이 없으면 deadline(max_wait)까지 기다렸다가 보내고, 그 이상이면 RateLimitExceeded.
+  - 일일 할당량(daily_quota)은 한국 시간 자정 기준으로 센다.
+"""
+
+KST = ZoneInfo("Asia/Seoul")
+
+
+class RateLimit(NamedTuple):
+    # 초당 채워지는 token 수.
+    rate: float
+    # bucket 최대 크기(순간 허용량).
+    burst: float = 1
+    # 하루 최대 호출 수. None이면 제한 없음.
+    daily_quota: Optional[int] = None
+
+
+def today() -> str:
+    return datetime.now(KST).strftime("%Y-%m-%d")
+
+
+class RateLimiter:
+    def __init__(self, path, limits: Dict[str, RateLimit], max_wait: float = 10.0):
+        self.path = str(path)
+        self.limits = limits
+        self.max_wait = max_wait
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_bucket ("
+                " name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_usage ("
+                " name TEXT NOT NULL, day TEXT NOT NULL, count INTEGER NOT NULL,"
+                " PRIMARY KEY (name, day))"
+            )
+            self._local.conn = conn
+        return conn
+
+    # token 하나를 가져온다. 성공하면 0, 아니면 다시 시도하기까지 기다릴 시간(초).
+    def try_acquire(self, name: str) -> float:
+        limit = self.limits.get(name)
+        if limit is None:
+            return 0.0
+
+        conn = self._conn()
+        now = time.time()
+        day = today()
+        # 다른 worker와 동시에 갱신하지 않도록 write lock을 먼저 잡는다.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if limit.daily_quota is not None:
+                row = conn.execute(
+                    "SELECT count FROM rate_usage WHERE name = ? AND day = ?", (name, day)
+                ).fetchone()
+                if row is not None and row[0] >= limit.daily_quota:
+                    raise RateLimitExceeded(f"daily quota exhausted for {name} ({limit.daily_quota})")
+
+            row = conn.execute("SELECT tokens, updated FROM rate_bucket WHERE name = ?", (name,)).fetchone()
+            tokens = limit.burst if row is None else min(limit.burst, row[0] + (now - row[1]) * limit.rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+                conn.execute(
+                    "INSERT INTO rate_usage (name, day, count) VALUES (?, ?, 1)"
+                    " ON CONFLICT (name, day) DO UPDATE SET count = count + 1",
+                    (name, day),
+                )
+            else:
+                wait = (1 - tokens) / limit.rate
+
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_bucket (name, tokens, updated) VALUES (?, ?, ?)",
+                (name, tokens, now),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _deadline(self, max_wait: Optional[float]) -> float:
+        return time.monotonic() + (self.max_wait if max_wait is None else max_wait)
+
+    # token을 얻을 때까지 기다린다. deadline을 넘길 것 같으면 바로 실패한다.
+    def acquire(self, name: str, max_wait: Optional[float] = None):
+        deadline = self._deadline(max_wait)
+        while True:
+            wait = self.try_acquire(name)
+            if wait == 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(f"rate limit wait exceeded for {name}")
+            time.sleep(wait)
+
+    # try_acquire는 SQLite write lock을 기다릴 수 있으므로 event loop 밖(thread)에서 부른다.
+    async def aacquire(self, name: str, max_wait: Optional[float] = None):
+        deadline = self._deadline(max_wait)
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, name)
+            if wait == 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(f"rate limit wait exceeded for {name}")
+            await asyncio.sleep(wait)
+
+    # key 별 일일 호출 수. {name: {day: count}}
+    def usage(self, day: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        sql = "SELECT name, day, count FROM rate_usage"
+        args = ()
+        if day:
+            sql += " WHERE day = ?"
+            args = (day,)
+        result: Dict[str, Dict[str, int]] = {}
+        for name, d, count in self._conn().execute(sql + " ORDER BY day DESC", args):
+            result.setdefault(name, {})[d] = count
+        return result
+
+    # 모니터링용 요약. 오늘 사용량과 남은 할당량.
+    def snapshot(self) -> Dict[str, dict]:
+        used = {name: days.get(today(), 0) for name, days in self.usage(today()).items()}
+        result = {}
+        for name, limit in self.limits.items():
+            count = used.get(name, 0)
+            result[name] = {
+                "rate": limit.rate,
+                "burst": limit.burst,
+                "daily_quota": limit.daily_quota,
+                "used_today": count,
+                "remaining_today": None if limit.daily_quota is None else max(0, limit.daily_quota - count),
+            }
+        return result
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+# settings.HTTP_RATE_LIMITS 로 프로세스 공용 limiter를 만든다. 꺼져 있으면 None.
+def get_rate_limiter() -> Optional[RateLimiter]:
+    global _limiter
+    conf = getattr(settings, "HTTP_RATE_LIMITS", {})
+    if not conf.get("ENABLED", False):
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                limits = {name: RateLimit(**opts) for name, opts in conf.get("LIMITS", {}).items()}
+                _limiter = RateLimiter(conf["PATH"], limits, conf.get("MAX_WAIT", 10.0))
+    return _limiter
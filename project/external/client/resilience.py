@@ -0,0 +1,187 @@
+from __future__ import annotations
+from typing import Dict, Optional
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import random, threading, time
+
+import httpx
+from django.conf import settings
+
+from .errors import CircuitOpenError
+
+
+"""
+외부 API 재시도 / circuit breaker.
+  - RetryPolicy: 일시적인 오류(timeout, 연결 실패, 429/5xx)만 jitter가 들어간 지수 backoff로 재시도한다.
+    POST 처럼 멱등이 아닌 요청은 요청이 전송되지 않은 연결 오류일 때만 재시도한다.
+  - CircuitBreaker: host 별로 연속 실패를 세다가 임계치를 넘으면 일정 시간 바로 실패시킨다.
+    (data.go.kr 이 흔들릴 때 sync worker가 timeout까지 붙잡혀 있지 않도록)
+"""
+
+# 요청이 upstream에 도달하지 않은 것이 확실한 오류. 멱등이 아니어도 재시도할 수 있다.
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# 일시적인 오류.
+TRANSIENT_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+# Retry-After 헤더(초 또는 HTTP-date)를 초 단위로 바꾼다.
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        retry_statuses=(429, 500, 502, 503, 504),
+        # Retry-After가 이보다 길면 기다리지 않고 실패한다.
+        max_retry_after: float = 30.0,
+        # 재시도를 포함한 전체 대기 예산(초).
+        deadline: float = 60.0,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = set(retry_statuses)
+        self.max_retry_after = max_retry_after
+        self.deadline = deadline
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "RetryPolicy":
+        conf = {**getattr(settings, "HTTP_RESILIENCE", {}).get("RETRY", {}), **overrides}
+        return cls(**conf)
+
+    def retry_exception(self, exc: Exception, idempotent: bool) -> bool:
+        if isinstance(exc, NOT_SENT_ERRORS):
+            return True
+        return idempotent and isinstance(exc, TRANSIENT_ERRORS)
+
+    def retry_response(self, res: httpx.Response, idempotent: bool) -> bool:
+        # 429는 처리되지 않은 요청이므로 멱등 여부와 관계없이 재시도한다.
+        if res.status_code == 429:
+            return True
+        return idempotent and res.status_code in self.retry_statuses
+
+    # attempt(1부터)번째 실패 이후 기다릴 시간. 기다리면 안 되는 경우 None.
+    def delay(self, attempt: int, res: Optional[httpx.Response] = None) -> Optional[float]:
+        if res is not None:
+            retry_after = parse_retry_after(res.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_retry_after else None
+        # full jitter
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** (attempt - 1))))
+
+    # 다음 시도를 할지 결정하고, 한다면 기다릴 시간을 돌려준다.
+    def next_delay(self, attempt: int, started: float, res: Optional[httpx.Response] = None) -> Optional[float]:
+        if attempt >= self.max_attempts:
+            return None
+        wait = self.delay(attempt, res)
+        if wait is None or time.monotonic() - started + wait > self.deadline:
+            return None
+        return wait
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 probe_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # 시험 요청(probe)이 결과를 남기지 않고 이 시간(초)이 지나면 실패로 보고 다시 연다.
+        self.probe_timeout = probe_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        # HALF_OPEN에서 진행 중인 probe의 시작 시각. None이면 probe가 없다.
+        self.probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.probe_started = None
+
+    # 호출 전에 확인한다. 열려 있으면 CircuitOpenError.
+    # 호출한 쪽은 끝날 때 record_success / record_failure / release 중 하나를 반드시 부른다.
+    def before_call(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self.probe_started is not None and now - self.probe_started >= self.probe_timeout:
+                    # probe가 끝나지 않았거나 결과를 남기지 않았다.
+                    self._open(now)
+                elif self.probe_started is None:
+                    # 한 번만 시험 삼아 보내본다.
+                    self.probe_started = now
+                    return
+            raise CircuitOpenError(f"circuit open for {self.name}")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open(time.monotonic())
+
+    # upstream 상태를 알 수 없이 끝난 호출. (rate limit, 요청 전 오류 등) probe였다면 다음 호출이 다시 시험한다.
+    def release(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.probe_started = None
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+# upstream host 별 circuit breaker.
+def get_breaker(base_url: str) -> CircuitBreaker:
+    host = urlsplit(base_url).netloc or base_url
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(host)
+            if breaker is None:
+                conf = getattr(settings, "HTTP_RESILIENCE", {}).get("BREAKER", {})
+                breaker = CircuitBreaker(host, **conf)
+                _breakers[host] = breaker
+    return breaker
+
+
+def breakers_snapshot() -> Dict[str, dict]:
+    return {name: breaker.snapshot() for name, breaker in list(_breakers.items())}
+
+
+# upstream 장애로 볼 응답인가. (4xx는 요청 문제이므로 제외)
+def is_upstream_failure(res: httpx.Response) -> bool:
+    return res.status_code >= 500
+
+
+# 연결 단계 timeout은 짧게 두어 죽은 host에서 오래 기다리지 않는다.
+def make_timeout(timeout: float) -> httpx.Timeout:
+    connect = getattr(settings, "HTTP_RESILIENCE", {}).get("CONNECT_TIMEOUT", 5.0)
+    return httpx.Timeout(timeout, connect=min(connect, timeout))
@@ -1,9 +1,11 @@
 from django.conf import settings
 from .base import BaseClient, HTTPError
+from .async_base import AsyncBaseClient
+from .cache import CachePolicy
 
 from external.address.address_manager import AddressManager
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from urllib.parse import quote
 
 
@@ -13,10 +15,99 @@ from urllib.parse import quote
   - 실시간 대기질( RealtimeCityAir )
 """
 
+SEOUL_DATA_URL = "http://openapi.seoul.go.kr:8088"
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# 연도별 대기질은 사실상 고정값이고, 전월세는 하루 단위로 갱신된다.
+# 서울 API는 느리므로 stale 기간을 길게 두고 뒤에서 갱신한다.
+CACHE_POLICIES = {
+    "YearlyAverageAirQuality": CachePolicy(ttl=30 * DAY, stale_ttl=365 * DAY),
+    "tbLnOpendataRentV": CachePolicy(ttl=6 * HOUR, stale_ttl=7 * DAY),
+}
+
+# 전월세와 대기질은 서로 다른 인증키를 쓰므로 할당량도 따로 센다.
+def seoul_rate_limit_key(path: str) -> str:
+    return "seoul_air" if "Air" in path else "seoul_data"
+
+# path 맨 앞이 인증키이므로 지표에는 서비스 이름만 남긴다. 예) /KEY/json/tbLnOpendataRentV/1/10/ → tbLnOpendataRentV
+def seoul_metric_endpoint(path: str) -> str:
+    segs = path.strip("/").split("/")
+    return segs[2] if len(segs) > 2 else "unknown"
+
+# 최상위에 RESULT가 있으면 서비스 블록 없이 오류/안내만 온 경우다. 정상(INFO-000)과 데이터 없음(INFO-200)만 캐시한다.
+def is_seoul_cacheable(data) -> bool:
+    if not isinstance(data, dict):
+        return False
+    result = data.get("RESULT")
+    return result is None or result.get("CODE") in ("INFO-000", "INFO-200")
+
+# 한 번에 받을 수 있는 최대 행 수. (END_INDEX - START_INDEX + 1)
+MAX_ROWS_PER_REQUEST = 1000
+
+# parameter가 아닌 url로 값을 넣는 형태임. 먼저 필수 값들부터 넣는다.
+# url의 두 숫자는 page / size가 아니라 START_INDEX / END_INDEX(1부터, 양 끝 포함)이다.
+def price_path(size:int = 10, page:int = 1, year:int = None, address:AddressManager = None) -> str:
+    return price_range_path(page, size, year, address)
+
+def price_range_path(start_index:int, end_index:int, year:int = None, address:AddressManager = None) -> str:
+    path = f"/{settings.SEOUL_DATA_KEY}/json/tbLnOpendataRentV/{start_index}/{end_index}/"
+
+    path += f"{year}/" if year else "/"
+    if address and address.is_valid(): # ← address가 None이면 AttributeError
+        path += f"{address.cggCd}/{address.sggNm}/{address.stdgCd}/{address.mtYn}/{address.lnbrMnnm}/{address.lnbrSlno}"
+    return path
+
+def yearly_air_quality_path(year:int, start_index:int = 1, end_index:int = 25, gu_name:Optional[str] = None) -> str:
+    segs = [
+        settings.AIR_QUALITY_KEY,
+        "json",
+        "YearlyAverageAirQuality",
+        str(start_index),
+        str(end_index),
+        str(year),
+    ]
+    path = "/" + "/".join(segs) + "/"
+    if gu_name:  # 선택 세그먼트
+        path += quote(gu_name)
+    return path
+
+# 실시간 대기질. 25개 자치구가 한 번에 온다. (캐시 정책이 없으므로 항상 upstream을 호출한다)
+def realtime_city_air_path(start_index:int = 1, end_index:int = 25) -> str:
+    return f"/{settings.AIR_QUALITY_KEY}/json/RealtimeCityAir/{start_index}/{end_index}/"
+
+# 응답에서 service의 행 목록을 꺼낸다. 데이터가 없으면(INFO-200) 빈 list, 그 밖의 오류 코드는 ValueError.
+def service_rows(data, service: str) -> List[dict]:
+    block = (data or {}).get(service)
+    if not block:
+        code = (data or {}).get("RESULT", {}).get("CODE")
+        if code not in (None, "INFO-200"):
+            raise ValueError(f"{service} error: {code}")
+        return []
+    return block.get("row", [])
+
+# YearlyAverageAirQuality 응답에서 첫 row를 꺼낸다.
+def first_yearly_row(data) -> Optional[dict]:
+    block = data.get("YearlyAverageAirQuality", {}) if isinstance(data, dict) else {}
+    rows = block.get("row", [])
+    return rows[0] if rows else None
+
 class DataSeoulClient(BaseClient):
+    cache_policies = CACHE_POLICIES
+
     def __init__(self):
         # 오래 걸리는 작업이라 timeout을 넉넉하게 줌, 8088 포트 http 사용
-        super().__init__(base_url="http://openapi.seoul.go.kr:8088", timeout=120)
+        super().__init__(base_url=SEOUL_DATA_URL, timeout=120)
+
+    def is_cacheable(self, data) -> bool:
+        return is_seoul_cacheable(data)
+
+    def rate_limit_key(self, path: str) -> str:
+        return seoul_rate_limit_key(path)
+
+    def metric_endpoint(self, path: str) -> str:
+        return seoul_metric_endpoint(path)
     
     # 해당 건물 한정으로 가격을 책정한다. 후에 주변 건물의 가격을 평균내는 로직이 필요할 듯. 이건 다른 함수에 작성.
     def getPrice(
@@ -27,16 +118,13 @@ class DataSeoulClient(BaseClient):
         # 자치구 코드, 법정동코드, 지번구분, 본번 부번 등 생각.
         address:AddressManager = None,
         ):
-        # parameter가 아닌 url로 값을 넣는 형태임. 먼저 필수 값들부터 넣는다.
-        path = f"/{settings.SEOUL_DATA_KEY}/json/tbLnOpendataRentV/{page}/{size}/"
-        
-        path += f"{year}/" if year else "/"
-        if address and address.is_valid(): # ← address가 None이면 AttributeError
-            path += f"{address.cggCd}/{address.sggNm}/{address.stdgCd}/{address.mtYn}/{address.lnbrMnnm}/{address.lnbrSlno}"
-
-        response = self.get(path)
+        response = self.get(price_path(size, page, year, address))
         return response
 
+    # start_index ~ end_index 행을 가져온다. (최대 MAX_ROWS_PER_REQUEST 행)
+    def getPriceRange(self, start_index:int, end_index:int, year:int = None, address:AddressManager = None):
+        return self.get(price_range_path(start_index, end_index, year, address))
+
     def get_yearly_average_air_quality(
         self,
         *,
@@ -45,28 +133,53 @@ class DataSeoulClient(BaseClient):
         end_index: int = 25,       # END_INDEX (정수)
         gu_name: Optional[str] = None,  # MSRSTE_NM (선택)
     ) -> Any:
-        segs = [
-            settings.AIR_QUALITY_KEY,
-            "json",
-            "YearlyAverageAirQuality",
-            str(start_index),
-            str(end_index),
-            str(year),
-        ]
-        path = "/" + "/".join(segs) + "/"
-        if gu_name:  # 선택 세그먼트
-            path += quote(gu_name)
-        return self.get(path)
+        return self.get(yearly_air_quality_path(year, start_index, end_index, gu_name))
 
     def get_yearly_by_gu(self, year: int, gu_name: str) -> Optional[dict]:
         data = self.get_yearly_average_air_quality(
             year=year, start_index=1, end_index=1, gu_name=gu_name
         )
-        block = data.get("YearlyAverageAirQuality", {}) if isinstance(data, dict) else {}
-        rows = block.get("row", [])
-        return rows[0] if rows else None
+        return first_yearly_row(data)
+
+    def get_realtime_city_air(self, start_index: int = 1, end_index: int = 25) -> Any:
+        return self.get(realtime_city_air_path(start_index, end_index))
+
+class AsyncDataSeoulClient(AsyncBaseClient):
+    cache_policies = CACHE_POLICIES
+
+    def __init__(self):
+        super().__init__(base_url=SEOUL_DATA_URL, timeout=120)
+
+    def is_cacheable(self, data) -> bool:
+        return is_seoul_cacheable(data)
 
+    def rate_limit_key(self, path: str) -> str:
+        return seoul_rate_limit_key(path)
 
+    def metric_endpoint(self, path: str) -> str:
+        return seoul_metric_endpoint(path)
 
+    async def getPrice(self, size:int = 10, page:int = 1, year:int = None, address:AddressManager = None):
+        return await self.get(price_path(size, page, year, address))
 
+    async def getPriceRange(self, start_index:int, end_index:int, year:int = None, address:AddressManager = None):
+        return await self.get(price_range_path(start_index, end_index, year, address))
+
+    async def get_yearly_average_air_quality(
+        self,
+        *,
+        year: int,
+        start_index: int = 1,
+        end_index: int = 25,
+        gu_name: Optional[str] = None,
+    ) -> Any:
+        return await self.get(yearly_air_quality_path(year, start_index, end_index, gu_name))
+
+    async def get_yearly_by_gu(self, year: int, gu_name: str) -> Optional[dict]:
+        data = await self.get_yearly_average_air_quality(
+            year=year, start_index=1, end_index=1, gu_name=gu_name
+        )
+        return first_yearly_row(data)
 
+    async def get_realtime_city_air(self, start_index: int = 1, end_index: int = 25) -> Any:
+        return await self.get(realtime_city_air_path(start_index, end_index))
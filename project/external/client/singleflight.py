@@ -0,0 +1,106 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, Tuple
+import asyncio, copy, threading
+
+
+"""
+동일한 upstream 호출(같은 client, path, params)이 동시에 여러 개 들어오면
+하나만 실제로 보내고 나머지는 그 결과(또는 예외)를 함께 받는다.
+  - 기다린 쪽은 결과의 복사본을 받는다. (한쪽에서 고쳐도 다른 쪽에 영향이 없도록)
+  - 예외는 기다린 쪽마다 같은 종류의 새 예외로 다시 만들고, 원래 예외를 __cause__로 단다.
+    (여러 thread에서 같은 예외 객체를 raise하면 traceback이 뒤섞인다)
+worker 프로세스 사이의 중복은 응답 캐시의 공유 저장소가 줄여준다.
+"""
+
+
+# 기다린 쪽에서 raise할 예외. 복사할 수 없는 예외는 그대로 쓴다.
+def _waiter_error(error: BaseException) -> BaseException:
+    try:
+        clone = copy.copy(error)
+    except Exception:
+        return error
+    clone.__cause__ = error
+    return clone
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise _waiter_error(call.error)
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        # future는 event loop에 묶이므로 (loop, key)로 구분한다.
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        future = self._calls.get(slot)
+        if future is not None:
+            # 대기 중인 쪽이 취소되어도 실제 호출은 취소되지 않도록 shield 한다.
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                raise
+            except BaseException as e:
+                raise _waiter_error(e)
+            return copy.deepcopy(result)
+
+        future = loop.create_future()
+        self._calls[slot] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # 기다리는 쪽이 없으면 "exception was never retrieved" 경고가 나므로 한 번 읽어 둔다.
+            future.exception()
+            raise
+        finally:
+            self._calls.pop(slot, None)
+
+
+# 프로세스 공용 인스턴스.
+single_flight = SingleFlight()
+async_single_flight = AsyncSingleFlight()
@@ -0,0 +1,201 @@
+from unittest import mock
+import asyncio, os, tempfile, threading, time
+
+import httpx
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from .cache import CachePolicy, LocMemTier, ResponseCache, SQLiteTier
+from .cassette import REPLAY, CassetteTransport, cassette_mode
+from .errors import CassetteMissingError, CircuitOpenError
+from .resilience import CircuitBreaker
+from .singleflight import SingleFlight
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("external.client.resilience.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30, probe_timeout=60)
+
+    def fail(self, times=1):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+
+    def open_then_probe(self):
+        self.fail(2)
+        self.now += 30
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_closed_until_threshold(self):
+        self.fail(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.before_call()
+
+    def test_success_resets_failures(self):
+        self.fail(1)
+        self.breaker.record_success()
+        self.fail(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_opens_at_threshold(self):
+        self.fail(2)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_stays_open_until_reset_timeout(self):
+        self.fail(2)
+        self.now += 29
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_half_open_allows_single_probe(self):
+        self.open_then_probe()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_probe_success_closes(self):
+        self.open_then_probe()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.before_call()
+
+    def test_probe_failure_reopens(self):
+        self.open_then_probe()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.now += 30
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_released_probe_lets_next_call_probe(self):
+        self.open_then_probe()
+        self.breaker.release()
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_abandoned_probe_reopens_after_deadline(self):
+        self.open_then_probe()
+        self.now += 59
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.now += 1
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.now += 30
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_release_when_closed_is_noop(self):
+        self.breaker.before_call()
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class CassetteTests(SimpleTestCase):
+    @override_settings(HTTP_CASSETTE={"MODE": "Replay"})
+    def test_mode_is_case_insensitive(self):
+        self.assertEqual(cassette_mode(), REPLAY)
+
+    @override_settings(HTTP_CASSETTE={"MODE": "replay-only"})
+    def test_unknown_mode_fails(self):
+        with self.assertRaises(ImproperlyConfigured):
+            cassette_mode()
+
+    def test_missing_cassette_is_not_a_network_error(self):
+        transport = CassetteTransport(REPLAY, tempfile.mkdtemp())
+        with httpx.Client(transport=transport) as client:
+            with self.assertRaises(CassetteMissingError):
+                client.get("http://example.test/missing")
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+        self.shared = SQLiteTier(path)
+        self.worker_a = ResponseCache(LocMemTier(), self.shared)
+        self.worker_b = ResponseCache(LocMemTier(), SQLiteTier(path))
+
+    def test_expired_local_entry_falls_through_to_shared(self):
+        with mock.patch("external.client.cache.time.time", return_value=1000.0):
+            self.worker_a.set("k", {"v": 1}, CachePolicy(ttl=10))
+            self.assertEqual(self.worker_b.get("k").value, {"v": 1})
+        with mock.patch("external.client.cache.time.time", return_value=2000.0):
+            self.worker_a.set("k", {"v": 2}, CachePolicy(ttl=10))
+            entry = self.worker_b.get("k")
+        self.assertEqual(entry.value, {"v": 2})
+        self.assertEqual(entry.fresh_until, 2010.0)
+
+    def test_values_are_copies(self):
+        value = {"items": [1]}
+        self.worker_a.set("k", value, CachePolicy(ttl=60))
+        value["items"].append(2)
+        self.worker_a.get("k").value["items"].append(3)
+        self.assertEqual(self.worker_a.get("k").value, {"items": [1]})
+
+    def test_async_access_reads_shared_off_the_event_loop(self):
+        async def run():
+            await self.worker_a.aset("k", {"v": 1}, CachePolicy(ttl=60))
+            with mock.patch("external.client.cache.asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+                entry = await self.worker_b.aget("k")
+                # 로컬 LRU에 fresh 값이 있으면 thread로 넘기지 않는다.
+                await self.worker_b.aget("k")
+            return entry, to_thread.call_count
+
+        entry, calls = asyncio.run(run())
+        self.assertEqual(entry.value, {"v": 1})
+        self.assertEqual(calls, 1)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def run_waiters(self, fn, count=3):
+        flight, results = SingleFlight(), []
+        joined = threading.Event()
+        calls = 0
+
+        def leader():
+            nonlocal calls
+            calls += 1
+            # 나머지 호출이 모두 기다리기 시작할 때까지 끝내지 않는다.
+            joined.wait(5)
+            return fn()
+
+        def call():
+            try:
+                results.append(flight.do("k", leader))
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while getattr(flight._calls.get("k"), "waiters", 0) < count - 1:
+            self.assertLess(time.monotonic(), deadline, "waiters did not join")
+            time.sleep(0.001)
+        joined.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, 1)
+        return results
+
+    def test_waiters_get_copies(self):
+        results = self.run_waiters(lambda: {"items": [1]})
+        self.assertEqual(results, [{"items": [1]}] * 3)
+        self.assertEqual(len({id(result) for result in results}), 3)
+
+    def test_waiters_get_their_own_exception(self):
+        def fail():
+            raise CircuitOpenError("open")
+
+        results = self.run_waiters(fail)
+        self.assertTrue(all(isinstance(result, CircuitOpenError) for result in results))
+        self.assertEqual(len({id(result) for result in results}), 3)
@@ -1,16 +1,31 @@
-from openai import AsyncOpenAI, OpenAI
+from openai import AsyncOpenAI, OpenAI, DefaultHttpxClient
 from openai import Timeout
+from openai import APIError, APIConnectionError, APITimeoutError, RateLimitError, InternalServerError
 from dotenv import load_dotenv
 import os
 import asyncio
 from io import BytesIO
+import time
 from django.conf import settings
 
+from external.client.resilience import RetryPolicy, get_breaker
+from external.client.cassette import get_cassette_transport
+from external.client.errors import CassetteMissingError
+from external.client.metrics import metrics
+
+# record / replay 모드면 cassette transport를 사용한다. 설정 오류(ImproperlyConfigured)는 아래 except에서 삼키지 않고 그대로 올린다.
+_transport = get_cassette_transport()
+
 try:
     load_dotenv()
 
-    # OpenAI API 키 설정
-    CLIENT = OpenAI(api_key=settings.OPENAI_API_KEY)
+    # OpenAI API 키 설정.
+    # 재시도는 _create_response에서 하므로 SDK 자체 재시도(max_retries)는 끈다.
+    if _transport is not None:
+        CLIENT = OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0,
+                        http_client=DefaultHttpxClient(transport=_transport))
+    else:
+        CLIENT = OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
 
     # model
     MODEL = "gpt-4o"
@@ -25,17 +40,40 @@ def create_message(role: str, content):
 
     return message
 
+# OpenAI 호출 지표 기록. (external client와 같은 metrics에 upstream="openai"로 남긴다)
+def _observe_gpt(endpoint: str, sent: float, error=None, bytes_sent: int = 0, bytes_received: int = 0):
+    status = 200 if error is None else getattr(error, "status_code", None)
+    metrics.observe(
+        "openai", endpoint, time.monotonic() - sent,
+        status=status,
+        bytes_sent=bytes_sent,
+        bytes_received=bytes_received,
+        timeout=isinstance(error, APITimeoutError),
+    )
+
 def get_gpt_file_id(file_bytes: bytes, filename: str = "image.jpg", purpose: str = "user_data"):
     buf = BytesIO(file_bytes)
     buf.name = filename                 
-    uploaded = CLIENT.files.create(
-        file=buf,                       
-        purpose=purpose                 
-    )
+    sent = time.monotonic()
+    try:
+        uploaded = CLIENT.files.create(
+            file=buf,                       
+            purpose=purpose                 
+        )
+    except APIError as e:
+        _observe_gpt("files.create", sent, e, bytes_sent=len(file_bytes))
+        raise
+    _observe_gpt("files.create", sent, bytes_sent=len(file_bytes))
     return uploaded.id
 
 def delete_gpt_file(file_id):
-    CLIENT.files.delete(file_id=file_id)
+    sent = time.monotonic()
+    try:
+        CLIENT.files.delete(file_id=file_id)
+    except APIError as e:
+        _observe_gpt("files.delete", sent, e)
+        raise
+    _observe_gpt("files.delete", sent)
 
 # 특정 질문을 gpt에 물어본다. 실패하면 False를 리턴한다.
 def ask_gpt(messages, model=MODEL, max_tokens = 32768):
@@ -78,11 +116,55 @@ def ask_gpt(messages, model=MODEL, max_tokens = 32768):
             "presence_penalty": 0.0,
         }
 
-    response = CLIENT.responses.create(
-        **params,
-    )
+    response = _create_response(params, retries=retries, delay=delay)
 
     return response.output_text
+
+# 일시적인 오류(연결 실패, timeout, 429, 5xx)는 backoff 후 재시도한다.
+RETRYABLE_GPT_ERRORS = (APIConnectionError, APITimeoutError, RateLimitError, InternalServerError)
+
+def _create_response(params, retries, delay):
+    policy = RetryPolicy.from_settings(max_attempts=retries, backoff=delay)
+    breaker = get_breaker("https://api.openai.com")
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        sent = time.monotonic()
+        try:
+            response = CLIENT.responses.create(**params)
+        except RateLimitError as e:
+            _observe_gpt("responses.create", sent, e)
+            # 429는 upstream 장애가 아니므로 실패로 세지 않는다.
+            breaker.release()
+            error = e
+        except RETRYABLE_GPT_ERRORS as e:
+            _observe_gpt("responses.create", sent, e)
+            # SDK는 transport 오류를 APIConnectionError로 감싼다. cassette가 없는 것은 재시도하지 않는다.
+            if isinstance(e.__cause__, CassetteMissingError):
+                breaker.release()
+                raise e.__cause__
+            breaker.record_failure()
+            error = e
+        except APIError as e:
+            _observe_gpt("responses.create", sent, e)
+            # 400 등 upstream이 응답한 오류는 재시도하지 않는다. (upstream은 살아 있다)
+            breaker.record_success()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            _observe_gpt("responses.create", sent, bytes_received=len((response.output_text or "").encode()))
+            breaker.record_success()
+            return response
+
+        # RateLimitError 등은 응답이 있으므로 Retry-After를 따른다.
+        wait = policy.next_delay(attempt, started, getattr(error, "response", None))
+        if wait is None:
+            raise error
+        time.sleep(wait)
     
 
 def test_gpt(question):
@@ -70,6 +70,8 @@ INSTALLED_APPS = [
     'apps.report',
     'apps.contract',
     'apps.testing',
+    'apps.monitoring',
+    'apps.rent',
 ]
 
 INSTALLED_APPS += ["drf_spectacular", "drf_spectacular_sidecar"]
@@ -195,3 +197,182 @@ SPECTACULAR_SETTINGS = {
     ],
     'COMPONENT_SPLIT_REQUEST': True,
 }
+
+
+# 외부 API HTTP connection pool 설정. base_url 별로 공유된다.
+HTTP_POOL = {
+    "MAX_CONNECTIONS": int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", 100)),
+    "MAX_KEEPALIVE_CONNECTIONS": int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", 20)),
+    "KEEPALIVE_EXPIRY": float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", 30)),
+}
+
+# 외부 API GET 응답 캐시. 로컬 LRU + worker 공유 저장소("sqlite" / "django" / None).
+# POLICIES 로 client 별 TTL을 덮어쓸 수 있다. 예) {"DataSeoulClient": {"tbLnOpendataRentV": [3600, 86400]}}
+HTTP_CACHE = {
+    "ENABLED": os.getenv("HTTP_CACHE_ENABLED", "1") == "1",
+    "LOCAL_MAX_ENTRIES": int(os.getenv("HTTP_CACHE_LOCAL_MAX_ENTRIES", 1024)),
+    "LOCAL_MAX_BYTES": int(os.getenv("HTTP_CACHE_LOCAL_MAX_BYTES", 64 * 1024 * 1024)),
+    "SHARED": os.getenv("HTTP_CACHE_SHARED", "sqlite") or None,
+    "SQLITE_PATH": BASE_DIR / "db" / "http_cache.sqlite3",
+    "DJANGO_CACHE_ALIAS": "default",
+    "POLICIES": {},
+}
+
+# 외부 API 재시도 / circuit breaker 설정.
+HTTP_RESILIENCE = {
+    "CONNECT_TIMEOUT": float(os.getenv("HTTP_CONNECT_TIMEOUT", 5)),
+    "RETRY": {
+        "max_attempts": int(os.getenv("HTTP_RETRY_MAX_ATTEMPTS", 3)),
+        "backoff": 0.5,
+        "max_backoff": 8.0,
+        "max_retry_after": 30.0,
+        "deadline": 60.0,
+    },
+    "BREAKER": {
+        "failure_threshold": int(os.getenv("HTTP_BREAKER_THRESHOLD", 5)),
+        "reset_timeout": float(os.getenv("HTTP_BREAKER_RESET", 30)),
+        "probe_timeout": float(os.getenv("HTTP_BREAKER_PROBE_TIMEOUT", 60)),
+    },
+}
+
+# upstream API key 별 rate limit / 일일 할당량. 상태는 SQLite 파일로 worker 간 공유된다.
+HTTP_RATE_LIMITS = {
+    "ENABLED": os.getenv("HTTP_RATE_LIMIT_ENABLED", "1") == "1",
+    "PATH": BASE_DIR / "db" / "ratelimit.sqlite3",
+    # token을 기다리는 최대 시간(초).
+    "MAX_WAIT": float(os.getenv("HTTP_RATE_LIMIT_MAX_WAIT", 10)),
+    "LIMITS": {
+        "business_juso": {"rate": 10, "burst": 20},
+        "data_go_kr": {"rate": 20, "burst": 30, "daily_quota": int(os.getenv("DATA_GO_KR_DAILY_QUOTA", 10000))},
+        "seoul_data": {"rate": 5, "burst": 10},
+        "seoul_air": {"rate": 5, "burst": 10},
+        # 등기부 열람은 유료이므로 보수적으로 잡는다.
+        "a_pick": {"rate": 1, "burst": 2, "daily_quota": int(os.getenv("A_PICK_DAILY_QUOTA", 200))},
+    },
+}
+
+# 외부 API record / replay (부하 테스트용). MODE: off / record / replay
+# LATENCY: 숫자(초) 혹은 {"host": 초, "default": 초}. 비우면 기록된 소요 시간을 그대로 재현한다.
+HTTP_CASSETTE = {
+    "MODE": os.getenv("HTTP_CASSETTE_MODE", "off"),
+    "DIR": Path(os.getenv("HTTP_CASSETTE_DIR", BASE_DIR / "cassettes")),
+    "LATENCY": float(os.environ["HTTP_CASSETTE_LATENCY"]) if os.getenv("HTTP_CASSETTE_LATENCY") else None,
+}
+
+# 도로명 주소 검색 결과 캐시(ResolvedAddress). TTL은 초 단위.
+# NEGATIVE_TTL: 검색 결과가 없는 주소를 다시 조회하지 않는 시간.
+ADDRESS_CACHE = {
+    "ENABLED": os.getenv("ADDRESS_CACHE_ENABLED", "1") == "1",
+    "TTL": int(os.getenv("ADDRESS_CACHE_TTL", 30 * 24 * 60 * 60)),
+    "NEGATIVE_TTL": int(os.getenv("ADDRESS_CACHE_NEGATIVE_TTL", 60 * 60)),
+    "LOCAL_MAX_ENTRIES": int(os.getenv("ADDRESS_CACHE_LOCAL_MAX_ENTRIES", 4096)),
+}
+
+# 도로명주소 전체분으로 만든 로컬 주소 검색 색인. (python manage.py import_juso <파일/폴더/zip>)
+JUSO_INDEX = {
+    "ENABLED": os.getenv("JUSO_INDEX_ENABLED", "1") == "1",
+    "PATH": Path(os.getenv("JUSO_INDEX_PATH", BASE_DIR / "db" / "juso_index.sqlite3")),
+}
+
+# 주소 자동완성 목록. worker마다 색인 파일의 suggest 테이블을 메모리에 올리고, CHECK_INTERVAL(초)마다 파일이 바뀌었는지 확인한다.
+AUTOCOMPLETE = {
+    "CHECK_INTERVAL": int(os.getenv("AUTOCOMPLETE_CHECK_INTERVAL", 60)),
+}
+
+# 주소 일괄 정리(/address/batchResolve/)에서 juso API를 동시에 호출하는 최대 thread 수.
+ADDRESS_BATCH = {
+    "MAX_WORKERS": int(os.getenv("ADDRESS_BATCH_MAX_WORKERS", 8)),
+}
+
+# 같은 주소의 보고서끼리 재사용하는 정보의 유효 시간(초). 0이면 항상 새로 가져온다.
+# 건축물대장은 필지별 저장소(BUILDING_FACTS)가 맡는다.
+BUNDLE_FACT_TTL = {
+    "avg_price": int(os.getenv("BUNDLE_FACT_TTL_AVG_PRICE", 24 * 60 * 60)),
+    "air_condition": int(os.getenv("BUNDLE_FACT_TTL_AIR_CONDITION", 7 * 24 * 60 * 60)),
+    "flood": int(os.getenv("BUNDLE_FACT_TTL_FLOOD", 30 * 24 * 60 * 60)),
+}
+
+# 평균 전월세가 계산 시 서울 전월세 API 조회 설정. PAGE_SIZE는 최대 1000.
+AVG_PRICE_FETCH = {
+    "PAGE_SIZE": int(os.getenv("AVG_PRICE_PAGE_SIZE", 1000)),
+    "MAX_WORKERS": int(os.getenv("AVG_PRICE_MAX_WORKERS", 4)),
+}
+
+# 서울시 전월세 데이터 로컬 적재(apps.rent). MAX_AGE(초) 안에 적재된 연도만 로컬 DB로 계산한다.
+RENT_WAREHOUSE = {
+    "ENABLED": os.getenv("RENT_WAREHOUSE_ENABLED", "1") == "1",
+    "MAX_AGE": int(os.getenv("RENT_WAREHOUSE_MAX_AGE", 2 * 24 * 60 * 60)),
+    "MAX_WORKERS": int(os.getenv("RENT_WAREHOUSE_MAX_WORKERS", 4)),
+}
+
+# 전세 ↔ 월세 환산에 쓰는 전월세 전환율(연). 전월세 분포 / 사용자 가격 위치 계산에 쓴다.
+RENT_CONVERSION_RATE = float(os.getenv("RENT_CONVERSION_RATE", 0.055))
+
+# 전월세 시계열(apps.rent.series). 점 개수가 MAX_POINTS를 넘으면 구간을 넓힌다. CACHE_TTL(초) 동안 결과를 재사용한다.
+# 적재 시각(캐시 key)은 VERSION_TTL(초)마다 다시 읽는다.
+RENT_SERIES = {
+    "MAX_POINTS": int(os.getenv("RENT_SERIES_MAX_POINTS", 120)),
+    "CACHE_TTL": int(os.getenv("RENT_SERIES_CACHE_TTL", 60 * 60)),
+    "VERSION_TTL": int(os.getenv("RENT_SERIES_VERSION_TTL", 30)),
+    "LOCAL_MAX_ENTRIES": int(os.getenv("RENT_SERIES_LOCAL_MAX_ENTRIES", 256)),
+}
+
+# 건축물대장(표제부, 총괄표제부, 층별개요, 전유공용면적) 동시 조회. TIMEOUT(초) 안에 못 받은 operation은 빼고 반환한다.
+BUILDING_INFO_FETCH = {
+    "TIMEOUT": float(os.getenv("BUILDING_INFO_TIMEOUT", 15)),
+    "MAX_WORKERS": int(os.getenv("BUILDING_INFO_MAX_WORKERS", 4)),
+    "ROWS": int(os.getenv("BUILDING_INFO_ROWS", 100)),
+    "MAX_PAGES": int(os.getenv("BUILDING_INFO_MAX_PAGES", 10)),
+    # 표제부를 받은 뒤 나머지 operation을 더 기다리는 시간(초). 0이면 표제부만 받고 바로 반환한다. (나머지는 뒤에서 다시 받는다)
+    "EXTRA_WAIT": float(os.getenv("BUILDING_INFO_EXTRA_WAIT", 0)),
+    # 표제부가 아닌 operation(층별개요, 전유공용면적 등)의 최대 페이지 수
+    "EXTRA_MAX_PAGES": int(os.getenv("BUILDING_INFO_EXTRA_MAX_PAGES", 1)),
+}
+
+# 필지별 건축물대장 정보 저장소(BuildingFacts). REFRESH_AFTER(초)가 지나면 저장된 값을 주면서 뒤에서 다시 받고,
+# TTL(초)이 지나면 다시 받는다. LOCAL_TTL(초)은 프로세스 내부 LRU 유지 시간.
+BUILDING_FACTS = {
+    "ENABLED": os.getenv("BUILDING_FACTS_ENABLED", "1") == "1",
+    "REFRESH_AFTER": int(os.getenv("BUILDING_FACTS_REFRESH_AFTER", 30 * 24 * 60 * 60)),
+    "TTL": int(os.getenv("BUILDING_FACTS_TTL", 365 * 24 * 60 * 60)),
+    "LOCAL_TTL": int(os.getenv("BUILDING_FACTS_LOCAL_TTL", 5 * 60)),
+    "LOCAL_MAX_ENTRIES": int(os.getenv("BUILDING_FACTS_LOCAL_MAX_ENTRIES", 1024)),
+}
+
+# 자치구별 연평균 대기질 표(AirQualityYearly). 메모리 표는 CHECK_INTERVAL(초)마다 DB 변경을 확인하고,
+# 마지막 수집이 REFRESH_AFTER(초)보다 오래되면 뒤에서 최근 YEARS_BACK년을 다시 받는다.
+AIR_QUALITY = {
+    "YEARS_BACK": int(os.getenv("AIR_QUALITY_YEARS_BACK", 3)),
+    "CHECK_INTERVAL": int(os.getenv("AIR_QUALITY_CHECK_INTERVAL", 60)),
+    "REFRESH_AFTER": int(os.getenv("AIR_QUALITY_REFRESH_AFTER", 30 * 24 * 60 * 60)),
+    "AUTO_REFRESH": os.getenv("AIR_QUALITY_AUTO_REFRESH", "1") == "1",
+    # 다시 받기가 실패하거나 받은 것이 없을 때 처음 기다리는 시간(초). 실패할 때마다 두 배씩 늘린다. (최대 REFRESH_AFTER)
+    "REFRESH_RETRY": int(os.getenv("AIR_QUALITY_REFRESH_RETRY", 5 * 60)),
+    # 여러 연도를 받을 때 동시 요청 수 / backfill 시작 연도
+    "MAX_WORKERS": int(os.getenv("AIR_QUALITY_MAX_WORKERS", 4)),
+    "BACKFILL_SINCE": int(os.getenv("AIR_QUALITY_BACKFILL_SINCE", 2010)),
+}
+
+# 자치구별 침수 이력 색인(FloodRegion). ROWS는 페이지당 항목 수, MAX_PAGES는 자치구당 최대 페이지 수.
+# 메모리 색인은 CHECK_INTERVAL(초)마다 DB 변경을 확인하고, 마지막 수집이 REFRESH_AFTER(초)보다 오래되면 뒤에서 다시 받는다.
+FLOOD_INDEX = {
+    "ROWS": int(os.getenv("FLOOD_INDEX_ROWS", 100)),
+    "MAX_PAGES": int(os.getenv("FLOOD_INDEX_MAX_PAGES", 100)),
+    "MAX_WORKERS": int(os.getenv("FLOOD_INDEX_MAX_WORKERS", 4)),
+    "CHECK_INTERVAL": int(os.getenv("FLOOD_INDEX_CHECK_INTERVAL", 60)),
+    "REFRESH_AFTER": int(os.getenv("FLOOD_INDEX_REFRESH_AFTER", 30 * 24 * 60 * 60)),
+    "AUTO_REFRESH": os.getenv("FLOOD_INDEX_AUTO_REFRESH", "1") == "1",
+    # 다시 받기가 실패하거나 받은 것이 없을 때 처음 기다리는 시간(초). 실패할 때마다 두 배씩 늘린다. (최대 REFRESH_AFTER)
+    "REFRESH_RETRY": int(os.getenv("FLOOD_INDEX_REFRESH_RETRY", 5 * 60)),
+    # 조회 결과에 넣는 최근 항목 수. 나머지는 연도별 건수로만 준다.
+    "RECENT_ITEMS": int(os.getenv("FLOOD_INDEX_RECENT_ITEMS", 20)),
+}
+
+# 자치구별 실시간 대기질(RealtimeCityAir) snapshot. INTERVAL(초)마다 뒤에서 다시 받고, 실패하면 RETRY_INTERVAL(초) 뒤에 다시 시도한다.
+# 마지막 성공이 MAX_AGE(초)보다 오래되면 응답에 stale을 표시한다.
+REALTIME_AIR = {
+    "ENABLED": os.getenv("REALTIME_AIR_ENABLED", "1") == "1",
+    "INTERVAL": int(os.getenv("REALTIME_AIR_INTERVAL", 5 * 60)),
+    "RETRY_INTERVAL": int(os.getenv("REALTIME_AIR_RETRY_INTERVAL", 60)),
+    "MAX_AGE": int(os.getenv("REALTIME_AIR_MAX_AGE", 30 * 60)),
+}
@@ -34,6 +34,8 @@ urlpatterns = [
     path('gpt/', include('apps.gpt.urls')),
     path('report/', include('apps.report.urls')),
     path('contract/', include('apps.contract.urls')),
+    path('monitoring/', include('apps.monitoring.urls')),
+    path('rent/', include('apps.rent.urls')),
 ]
 
 